@@ -0,0 +1,224 @@
+"""
+Offline benchmarks of the SDK against a local eth-tester chain, see localchain.py
+Usage: python benchmarking.py [--repeat 200] [--output results.json] [--baseline results.json]
+"""
+
+from walletika import engine, tools, abis
+from walletika.data import loader
+from localchain import LocalChain
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import statistics
+
+
+def measure(name: str, func, repeat: int) -> dict:
+    # Warm up, then count the RPC requests of the measured calls only
+    func()
+    engine.metrics.RPCMetrics.reset()
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+
+    requests = sum(i['count'] for i in engine.metrics.RPCMetrics.snapshot().values())
+    latencies.sort()
+
+    return {
+        'name': name,
+        'repeat': repeat,
+        'opsPerSecond': repeat / sum(latencies),
+        'mean': statistics.mean(latencies) * 1000,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'max': latencies[-1] * 1000,
+        'rpcRequests': requests / repeat
+    }
+
+
+def provider_benchmarks(chain: LocalChain) -> dict:
+    provider = engine.provider.MainProvider
+    addresses = chain.accounts[:10]
+    tx = provider.build_transaction(
+        chain.accounts[0], chain.accounts[1], tools.interface.EtherAmount(1, decimals=18)
+    )
+
+    def batch_balances():
+        with provider.batch() as batch:
+            for address in addresses:
+                batch.balance_of(address)
+
+    return {
+        'provider.balance_of': lambda: provider.balance_of(addresses[0]),
+        'provider.block_number': provider.block_number,
+        'provider.batch(balance_of x10)': batch_balances,
+        'provider.gas_price': provider.gas_price,
+        'provider.add_gas': lambda: provider.add_gas(tx)
+    }
+
+
+def engine_benchmarks(chain: LocalChain) -> dict:
+    sender, recipient = chain.accounts[:2]
+    amount = tools.interface.EtherAmount(1, decimals=18)
+
+    token_contract = chain.deploy_stub(abis.tokenABI, {
+        'name': "Walletika", 'symbol': "WTK", 'decimals': 18,
+        'totalSupply': 10 ** 27, 'balanceOf': 10 ** 21
+    })
+    token = tools.interface.Token(contract=token_contract, symbol="WTK", decimals=18)
+    token_engine = engine.token.TokenEngine(token, sender=sender)
+
+    stake_contract = chain.deploy_stub(abis.stakeABI, {
+        'rewardPerBlock': 10 ** 18, 'totalSupply': 10 ** 24, 'stakedToken': token_contract.value(),
+        'rewardToken': token_contract.value()
+    })
+    stake = tools.interface.Stake(
+        contract=stake_contract, stake_token=token, reward_token=token,
+        stake_website='', reward_website='', start_block=0, end_block=10 ** 9,
+        start_time=0, end_time=86400 * 365
+    )
+    stake_engine = engine.stake.StakeEngine(stake, sender=sender)
+
+    engine.provider.WNSProvider.connect(chain.network())
+    engine.provider.WNSProvider.set_contract(chain.deploy_stub(abis.wnsABI))
+    wns_engine = engine.wns.WNSEngine(sender=sender)
+
+    return {
+        'token.name': token_engine.name,
+        'token.balance_of': lambda: token_engine.balance_of(recipient),
+        'token.details': token_engine.details,
+        'token._build_transaction': lambda: token_engine.transfer(recipient, amount),
+        'stake.get_apr': stake_engine.get_apr,
+        'stake._build_transaction': lambda: stake_engine.deposit(amount),
+        'wns.get_by_name': lambda: wns_engine.get_by_name("walletika"),
+        'wns._build_transaction': lambda: wns_engine.new_record("walletika")
+    }
+
+
+def data_benchmarks(chain: LocalChain, rows: int) -> dict:
+    # A scratch store, the user stores are never touched
+    db = loader.loader(file_name='benchmark')
+    if db.count_column() == 0:
+        db.create_table(['rpc', 'address', 'interface'])
+
+    transaction = sample_transaction(chain)
+    address = chain.accounts[0].value()
+
+    def insert():
+        db.clear()
+        for index in range(rows):
+            db.insert(row_index=index, rpc=chain.uri(), address=address, interface=transaction)
+
+    def select():
+        return [row['interface'] for _, row in db.select(rpc=chain.uri(), address=address)]
+
+    insert()
+    return {
+        'data.insert(x{})'.format(rows): insert,
+        'data.select(x{})'.format(rows): select,
+        'data.dump(x{})'.format(rows): db.dump
+    }, db
+
+
+def interface_benchmarks(chain: LocalChain) -> dict:
+    address = chain.accounts[0].value()
+    wei = tools.interface.WeiAmount(value=123456789 * 10 ** 15, decimals=18)
+    transaction = sample_transaction(chain)
+    amounts = tools.interface.WeiAmountArray([123456789 * 10 ** 15 + i for i in range(1000)], 18)
+
+    return {
+        'interface.Address': lambda: tools.interface.Address(address),
+        'interface.Address.many(x100)': lambda: tools.interface.Address.many([address] * 100),
+        'interface.WeiAmount': lambda: tools.interface.WeiAmount(value=123456789 * 10 ** 15, decimals=18),
+        'interface.WeiAmount.to_ether_string': wei.to_ether_string,
+        'interface.WeiAmountArray.sum(x1000)': amounts.sum,
+        'interface.WeiAmountArray.to_ether_string(x1000)': amounts.to_ether_string,
+        'interface.EtherAmount.to_wei': lambda: tools.interface.EtherAmount('1,234.5678', 18).to_wei(),
+        'interface.Transaction pickle': lambda: pickle.loads(pickle.dumps(transaction))
+    }
+
+
+def sample_transaction(chain: LocalChain) -> tools.interface.Transaction:
+    return tools.interface.Transaction(
+        tx_hash=tools.interface.TXHash('0x' + 'ab' * 32),
+        function='transfer',
+        from_address=chain.accounts[0],
+        to_address=chain.accounts[1],
+        amount=tools.interface.WeiAmount(value=10 ** 18, decimals=18),
+        symbol='ETH',
+        date_created='2022-01-01 00:00:00',
+        status=tools.interface.Transaction.Status.SUCCESS
+    )
+
+
+def report(results: list, baseline: dict):
+    print("{:<40} {:>12} {:>10} {:>10} {:>10} {:>8} {:>9}".format(
+        'benchmark', 'ops/s', 'mean ms', 'p50 ms', 'p95 ms', 'rpc/op', 'vs base'
+    ))
+
+    for result in results:
+        change = ''
+        if result['name'] in baseline:
+            change = '{:+.1f}%'.format((result['mean'] / baseline[result['name']]['mean'] - 1) * 100)
+
+        print("{:<40} {:>12.1f} {:>10.3f} {:>10.3f} {:>10.3f} {:>8.2f} {:>9}".format(
+            result['name'], result['opsPerSecond'], result['mean'], result['p50'], result['p95'],
+            result['rpcRequests'], change
+        ))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Walletika SDK offline benchmarks")
+    parser.add_argument('--repeat', type=int, default=200, help="Calls per benchmark")
+    parser.add_argument('--rows', type=int, default=1000, help="Rows of the data store benchmarks")
+    parser.add_argument('--output', help="Save the results as JSON")
+    parser.add_argument('--baseline', help="Compare with the JSON results of an earlier run")
+    parser.add_argument('--filter', default='', help="Run the benchmarks whose name contains it")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {i['name']: i for i in json.load(file)['results']}
+
+    with LocalChain() as chain:
+        engine.provider.MainProvider.connect(chain.network())
+
+        benchmarks = {}
+        benchmarks.update(provider_benchmarks(chain))
+        benchmarks.update(engine_benchmarks(chain))
+        data, db = data_benchmarks(chain, args.rows)
+        benchmarks.update(data)
+        benchmarks.update(interface_benchmarks(chain))
+
+        results = []
+        try:
+            for name, func in benchmarks.items():
+                if args.filter in name:
+                    repeat = args.repeat if not name.startswith('data.') else max(args.repeat // 20, 5)
+                    results.append(measure(name, func, repeat))
+        finally:
+            db.clear()
+            db.dump()
+
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'results': results
+            }, file, indent=4)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
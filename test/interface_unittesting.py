@@ -0,0 +1,330 @@
+from walletika import tools
+import pickle
+import unittest
+
+
+debugging = True
+
+
+def function_name(text: str):
+    print(f"[ + ] Start for: {text}")
+
+
+interface = tools.interface
+checksum_address = '0xC94EA8D9694cfe25b94D977eEd4D60d7c0985BD3'
+
+# Pickled by the Address class before interning, the attributes are stored as a dict
+old_address_pickle = (
+    b'\x80\x02cwalletika.tools.interface\nAddress\nq\x00)\x81q\x01}q\x02X\x0f\x00\x00\x00'
+    b'_Address__valueq\x03X*\x00\x00\x000xC94EA8D9694cfe25b94D977eEd4D60d7c0985BD3q\x04sb.'
+)
+
+# Pickled by the WeiAmount class before the exact formatting, it stored the float ether value
+# and the formatted parts instead of the decimals
+old_amount_pickles = {
+    (0, 6): (
+        b'\x80\x02cwalletika.tools.interface\nWeiAmount\nq\x00)\x81q\x01}q\x02(X\x11\x00\x00'
+        b'\x00_WeiAmount__valueq\x03K\x00X\x11\x00\x00\x00_WeiAmount__etherq\x04G\x00\x00\x00'
+        b'\x00\x00\x00\x00\x00X\x0f\x00\x00\x00_WeiAmount__intq\x05X\x01\x00\x00\x000q\x06X'
+        b'\x14\x00\x00\x00_WeiAmount__decimalsq\x07h\x06ub.'
+    ),
+    (1500000, 6): (
+        b'\x80\x02cwalletika.tools.interface\nWeiAmount\nq\x00)\x81q\x01}q\x02(X\x11\x00\x00'
+        b'\x00_WeiAmount__valueq\x03J`\xe3\x16\x00X\x11\x00\x00\x00_WeiAmount__etherq\x04G?'
+        b'\xf8\x00\x00\x00\x00\x00\x00X\x0f\x00\x00\x00_WeiAmount__intq\x05X\x01\x00\x00\x00'
+        b'1q\x06X\x14\x00\x00\x00_WeiAmount__decimalsq\x07X\x01\x00\x00\x005q\x08ub.'
+    ),
+    (1, 18): (
+        b'\x80\x02cwalletika.tools.interface\nWeiAmount\nq\x00)\x81q\x01}q\x02(X\x11\x00\x00'
+        b'\x00_WeiAmount__valueq\x03K\x01X\x11\x00\x00\x00_WeiAmount__etherq\x04G<2r]\xd1\xd2C'
+        b'\xacX\x0f\x00\x00\x00_WeiAmount__intq\x05X\x01\x00\x00\x000q\x06X\x14\x00\x00\x00'
+        b'_WeiAmount__decimalsq\x07X\x12\x00\x00\x00000000000000000001q\x08ub.'
+    ),
+    (123456789012345678901, 18): (
+        b'\x80\x02cwalletika.tools.interface\nWeiAmount\nq\x00)\x81q\x01}q\x02(X\x11\x00\x00'
+        b'\x00_WeiAmount__valueq\x03\x8a\t5l6/\x81\x9fN\xb1\x06X\x11\x00\x00\x00_WeiAmount__'
+        b'etherq\x04G@^\xdd<\x07\xfbL\x99X\x0f\x00\x00\x00_WeiAmount__intq\x05X\x03\x00\x00'
+        b'\x00123q\x06X\x14\x00\x00\x00_WeiAmount__decimalsq\x07X\x0e\x00\x00\x00456789012345'
+        b'68q\x08ub.'
+    )
+}
+
+
+class InterfaceUnitTesting(unittest.TestCase):
+    def test_1_address_interning(self):
+        function_name('Address interning')
+
+        # Task
+        addresses = [
+            interface.Address(checksum_address),
+            interface.Address(checksum_address.lower()),
+            interface.Address('0x' + checksum_address[2:].upper())
+        ]
+        many = interface.Address.many([checksum_address, checksum_address.lower()])
+
+        # Debugging
+        if debugging:
+            print(f"""
+            addresses: {[i.value() for i in addresses]}
+            ids: {[id(i) for i in addresses + many]}
+            """)
+
+        # Test
+        for address in addresses[1:] + many:
+            self.assertIs(address, addresses[0])
+        self.assertEqual(addresses[0].value(), checksum_address)
+        self.assertRaises(ValueError, interface.Address, '0x1234')
+        self.assertRaises(ValueError, interface.Address, None)
+        self.assertRaises(TypeError, interface.Address)
+
+    def test_2_address_immutable(self):
+        function_name('Address immutability')
+
+        # Task
+        address = interface.Address(checksum_address)
+
+        # Test
+        with self.assertRaises(AttributeError):
+            address._Address__value = '0xB41aD6b3EE5373dbAC2b471E4582A0b50f4bC9DE'
+        with self.assertRaises(AttributeError):
+            address.name = "wallet"
+        self.assertEqual(address.value(), checksum_address)
+
+    def test_3_address_hash(self):
+        function_name('Address hash and equality')
+
+        # Task
+        address = interface.Address(checksum_address)
+        other = interface.Address('0xB41aD6b3EE5373dbAC2b471E4582A0b50f4bC9DE')
+        lookup = {address: 'username1', other: 'username2'}
+
+        # Test
+        self.assertEqual(address, interface.Address(checksum_address.lower()))
+        self.assertNotEqual(address, other)
+        self.assertNotEqual(address, checksum_address)
+        self.assertEqual(hash(address), hash(interface.Address(checksum_address.lower())))
+        self.assertEqual(len({address, other, interface.Address(checksum_address.lower())}), 2)
+        self.assertEqual(lookup[interface.Address(checksum_address.lower())], 'username1')
+
+    def test_4_address_pickle(self):
+        function_name('Address pickle')
+
+        # Task
+        address = interface.Address(checksum_address)
+        loaded = pickle.loads(pickle.dumps(address))
+        old = pickle.loads(old_address_pickle)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            loaded: {loaded.value()}
+            old: {old.value()}
+            """)
+
+        # Test
+        self.assertIs(loaded, address)
+        # Objects of old pickles are equal to the interned ones, and still immutable
+        self.assertEqual(old.value(), checksum_address)
+        self.assertEqual(old, address)
+        self.assertEqual(hash(old), hash(address))
+        with self.assertRaises(AttributeError):
+            old._Address__value = checksum_address.lower()
+
+    def test_5_amount_format(self):
+        function_name('WeiAmount.to_ether_string')
+
+        # (value, decimals): (default, without currency format and 2 digits) of the old class
+        cases = {
+            (0, 6): ('0', '0'),
+            (1500000, 6): ('1.5', '1.5'),
+            (123456789012345678901, 18): ('123.45678901', '123.45'),
+            (10 ** 21 + 1, 18): ('1,000.0', '1000.0'),
+            (1234567 * 10 ** 18, 18): ('1,234,567.0', '1234567.0')
+        }
+
+        for (value, decimals), (default, short) in cases.items():
+            # Task
+            amount = interface.WeiAmount(value=value, decimals=decimals)
+
+            # Debugging
+            if debugging:
+                print(f"""
+                value: {value}
+                string: {amount.to_ether_string()}
+                """)
+
+            # Test
+            self.assertEqual(amount.to_ether_string(), default)
+            self.assertEqual(amount.to_ether_string(), default)
+            self.assertEqual(amount.to_ether_string(currency_format=False, length=2), short)
+
+        # The old class printed the float digits, the exact digits are zero beyond `length`
+        amount = interface.WeiAmount(value=1, decimals=18)
+        self.assertEqual(amount.to_ether_string(), '0.0')
+        self.assertEqual(amount.to_ether_string(length=18), '0.000000000000000001')
+        amount = interface.WeiAmount(value=10 ** 20 + 10 ** 10, decimals=18)
+        self.assertEqual(amount.to_ether_string(length=7), '100.0')
+        self.assertEqual(amount.to_ether_string(length=8), '100.00000001')
+        self.assertEqual(interface.WeiAmount(value=-1500000, decimals=6).to_ether_string(), '-1')
+
+    def test_6_amount_pickle(self):
+        function_name('WeiAmount pickle')
+
+        for (value, decimals), data in old_amount_pickles.items():
+            # Task
+            old = pickle.loads(data)
+            amount = interface.WeiAmount(value=value, decimals=decimals)
+            loaded = pickle.loads(pickle.dumps(amount))
+
+            # Debugging
+            if debugging:
+                print(f"""
+                value: {old.value()}
+                decimals: {old.decimals()}
+                string: {old.to_ether_string()}
+                """)
+
+            # Test
+            self.assertEqual((loaded.value(), loaded.decimals()), (value, decimals))
+            self.assertEqual(old.value(), value)
+            self.assertEqual(old.to_ether_string(), amount.to_ether_string())
+            self.assertEqual(old.to_ether(), amount.to_ether())
+            if value:
+                self.assertEqual(old.decimals(), decimals)
+
+        # A zero amount does not store its decimals, it is used with amounts of any decimals
+        zero = pickle.loads(old_amount_pickles[(0, 6)])
+        amounts = interface.WeiAmountArray.from_amounts(
+            [zero, interface.WeiAmount(value=1500000, decimals=6)]
+        )
+        self.assertEqual(amounts.decimals(), 6)
+        self.assertEqual(amounts.to_list(), [0, 1500000])
+        self.assertEqual((amounts + zero).to_list(), [0, 1500000])
+        self.assertEqual((amounts > zero).tolist(), [False, True])
+
+    def test_7_array_sum(self):
+        function_name('WeiAmountArray.sum')
+
+        # Task
+        values = [10 ** 60 + 1, 2 ** 255, 3, 0]
+        amounts = interface.WeiAmountArray.from_amounts(
+            [interface.WeiAmount(value=i, decimals=18) for i in values]
+        )
+        total = amounts.sum()
+        empty = interface.WeiAmountArray([], 6).sum()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            sum: {total.value()}
+            """)
+
+        # Test
+        # Python integers, so 256-bit sums stay exact
+        self.assertEqual(total.value(), sum(values))
+        self.assertEqual(total.decimals(), 18)
+        self.assertEqual((empty.value(), empty.decimals()), (0, 6))
+        self.assertEqual(len(amounts), 4)
+        self.assertEqual(amounts.to_list(), values)
+        self.assertEqual([i.value() for i in amounts], values)
+        self.assertEqual((amounts + amounts - amounts).to_list(), values)
+
+    def test_8_array_compare(self):
+        function_name('WeiAmountArray comparisons and masks')
+
+        # Task
+        amounts = interface.WeiAmountArray([5, 10 ** 30, 0, 7], 18)
+        limits = interface.WeiAmountArray([5, 1, 1, 8], 18)
+        mask = amounts > interface.WeiAmount(value=6, decimals=18)
+        selected = amounts[mask]
+
+        # Debugging
+        if debugging:
+            print(f"""
+            mask: {mask.tolist()}
+            selected: {selected.to_list()}
+            """)
+
+        # Test
+        self.assertEqual(mask.tolist(), [False, True, False, True])
+        self.assertEqual(mask.dtype, bool)
+        self.assertEqual((amounts == limits).tolist(), [True, False, False, False])
+        self.assertEqual((amounts != limits).tolist(), [False, True, True, True])
+        self.assertEqual((amounts < limits).tolist(), [False, False, True, True])
+        self.assertEqual((amounts <= limits).tolist(), [True, False, True, True])
+        self.assertEqual((amounts >= 5).tolist(), [True, True, False, True])
+        self.assertIsInstance(selected, interface.WeiAmountArray)
+        self.assertEqual(selected.to_list(), [10 ** 30, 7])
+        self.assertEqual(selected.decimals(), 18)
+        self.assertEqual(amounts[1].value(), 10 ** 30)
+
+    def test_9_array_scale(self):
+        function_name('WeiAmountArray.scale')
+
+        # Task
+        amounts = interface.WeiAmountArray([3 * 10 ** 18, 10 ** 18 + 1, 2 ** 255], 18)
+        same = amounts.scale('0.1')
+        quote = amounts.scale('2.5', decimals=6)
+        more = interface.WeiAmountArray([1500000], 6).scale(2, decimals=18)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            same: {same.to_list()}
+            quote: {quote.to_ether_string()}
+            """)
+
+        # Test
+        # Exact and rounded down, a float price of 0.1 would not be
+        self.assertEqual(same.to_list(), [3 * 10 ** 17, 10 ** 17, 2 ** 255 // 10])
+        self.assertEqual(same.decimals(), 18)
+        self.assertEqual(quote.to_list(), [7500000, 2500000, 2 ** 255 * 25 // 10 ** 13])
+        self.assertEqual(quote.decimals(), 6)
+        self.assertEqual(quote.to_ether_string()[:2], ['7.5', '2.5'])
+        self.assertEqual(more.to_list(), [3 * 10 ** 18])
+        self.assertEqual(more.decimals(), 18)
+
+    def test_10_array_decimals(self):
+        function_name('WeiAmountArray mixed decimals')
+
+        # Task
+        amounts = interface.WeiAmountArray([1, 2], 18)
+        usdt = interface.WeiAmount(value=1, decimals=6)
+
+        # Test
+        with self.assertRaises(ValueError):
+            interface.WeiAmountArray.from_amounts([interface.WeiAmount(value=1, decimals=18), usdt])
+        with self.assertRaises(ValueError):
+            interface.WeiAmountArray.from_amounts([usdt], decimals=18)
+        with self.assertRaises(ValueError):
+            amounts + interface.WeiAmountArray([1, 2], 6)
+        with self.assertRaises(ValueError):
+            amounts > usdt
+        self.assertEqual(interface.WeiAmountArray.from_amounts([]).decimals(), 18)
+
+    def test_11_array_format(self):
+        function_name('WeiAmountArray.to_ether_string')
+
+        # Task
+        values = [0, 1, 1500000000000000000, 123456789012345678901, 10 ** 21 + 1, -1500000]
+        amounts = interface.WeiAmountArray(values, 18)
+        result = amounts.to_ether_string()
+        short = amounts.to_ether_string(currency_format=False, length=2)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            strings: {result}
+            """)
+
+        # Test
+        # The same strings as WeiAmount
+        self.assertEqual(result, [i.to_ether_string() for i in amounts])
+        self.assertEqual(
+            short, [i.to_ether_string(currency_format=False, length=2) for i in amounts]
+        )
+        self.assertEqual(result[4], '1,000.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+from walletika import engine, tools
+from web3 import Web3, EthereumTesterProvider
+from web3.datastructures import NamedElementOnion
+from web3._utils.abi import get_abi_output_types
+from eth_abi import encode_abi
+from eth_abi.grammar import parse, TupleType
+from eth_utils import function_abi_to_4byte_selector, to_canonical_address
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+import collections.abc
+
+
+def _to_json_rpc(value):
+    """eth-tester returns python values, JSON-RPC clients expect hex quantities and data"""
+
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    if isinstance(value, collections.abc.Mapping):
+        return {k: _to_json_rpc(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_rpc(v) for v in value]
+
+    return value
+
+
+def _default_value(abi_type):
+    if abi_type.is_array:
+        size = abi_type.arrlist[-1]
+        return [_default_value(abi_type.item_type)] * (size[0] if size else 0)
+    if isinstance(abi_type, TupleType):
+        return tuple(_default_value(i) for i in abi_type.components)
+    if abi_type.base == 'bool':
+        return True
+    if abi_type.base == 'address':
+        return '0x' + '00' * 20
+    if abi_type.base == 'string':
+        return ''
+    if abi_type.base == 'bytes':
+        return b'\x00' * (abi_type.sub or 0)
+
+    return 0
+
+
+_OPCODES = {
+    'STOP': 0x00, 'ADD': 0x01, 'SUB': 0x03, 'LT': 0x10, 'EQ': 0x14, 'ISZERO': 0x15, 'AND': 0x16,
+    'SHL': 0x1b, 'SHR': 0x1c, 'BALANCE': 0x31, 'CALLDATALOAD': 0x35, 'CALLDATASIZE': 0x36,
+    'CALLDATACOPY': 0x37, 'CODECOPY': 0x39, 'RETURNDATASIZE': 0x3d, 'RETURNDATACOPY': 0x3e,
+    'TIMESTAMP': 0x42, 'NUMBER': 0x43, 'POP': 0x50, 'MLOAD': 0x51, 'MSTORE': 0x52, 'JUMP': 0x56,
+    'JUMPI': 0x57, 'GAS': 0x5a, 'JUMPDEST': 0x5b, 'CALL': 0xf1, 'RETURN': 0xf3, 'REVERT': 0xfd
+}
+
+
+def _opcode(name: str) -> int:
+    for prefix, base in (('DUP', 0x7f), ('SWAP', 0x8f), ('LOG', 0xa0)):
+        if name.startswith(prefix):
+            return base + int(name[len(prefix):])
+
+    return _OPCODES[name]
+
+
+def assemble(source: str, data: dict = None) -> bytes:
+    """
+    EVM code of whitespace separated opcodes, `PUSHn value`, `name:` for a JUMPDEST and `@name`
+    to push the offset of a label or of a `data` blob, the blobs are placed after the code
+    `#` starts a comment until the end of the line
+    """
+
+    data = data or {}
+    tokens = [i for line in source.splitlines() for i in line.split('#')[0].split()]
+    labels = {}
+
+    # Labels are pushed as two bytes, so the second pass knows every offset
+    for _ in range(2):
+        code = bytearray()
+        stream = iter(tokens)
+
+        for token in stream:
+            if token.endswith(':'):
+                labels[token[:-1]] = len(code)
+                code.append(_OPCODES['JUMPDEST'])
+            elif token.startswith('@'):
+                code += b'\x61' + labels.get(token[1:], 0).to_bytes(2, 'big')
+            elif token.startswith('PUSH'):
+                size = int(token[4:])
+                code.append(0x5f + size)
+                code += int(next(stream), 0).to_bytes(size, 'big')
+            else:
+                code.append(_opcode(token))
+
+        offset = len(code)
+        for name, blob in data.items():
+            labels[name] = offset
+            offset += len(blob)
+
+    return bytes(code) + b''.join(data.values())
+
+
+# Not a selector of the SDK ABIs
+EMIT_SELECTOR = bytes.fromhex('ffffffff')
+
+
+def stub_runtime(abi: list, results: dict = None) -> bytes:
+    """
+    EVM runtime code which answers every function of the ABI with a fixed result
+    `results` maps a function name to its outputs, the others answer zero values and `true`,
+    so views decode and transactions succeed. `EMIT_SELECTOR` logs an event, see LocalChain.emit
+    """
+
+    results = results or {}
+    data = {'true': (1).to_bytes(32, 'big')}
+    selectors = [(EMIT_SELECTOR, 'emit')]
+
+    for fn in abi:
+        if fn.get('type') != 'function':
+            continue
+
+        output_types = get_abi_output_types(fn)
+        if fn['name'] in results:
+            value = results[fn['name']]
+            values = list(value) if len(output_types) > 1 else [value]
+        else:
+            values = [_default_value(parse(i)) for i in output_types]
+
+        label = 'answer{}'.format(len(selectors))
+        selectors.append((function_abi_to_4byte_selector(fn), label))
+        data[label + 'Data'] = encode_abi(output_types, values)
+
+    def answer(name: str) -> str:
+        # CODECOPY(0, offset, size) RETURN(0, size)
+        size = len(data[name])
+        return 'PUSH2 {0} @{1} PUSH1 0 CODECOPY PUSH2 {0} PUSH1 0 RETURN\n'.format(size, name)
+
+    # selector = calldata[0:4] >> 224
+    source = 'PUSH1 0 CALLDATALOAD PUSH1 0xe0 SHR\n'
+    for selector, label in selectors:
+        source += 'DUP1 PUSH4 0x{} EQ @{} JUMPI\n'.format(selector.hex(), label)
+    # Unknown selector answers `true`
+    source += answer('true')
+    for _, label in selectors[1:]:
+        source += label + ': ' + answer(label + 'Data')
+
+    # Calldata: topics count, the topics, then the data which is copied to memory 0
+    source += """
+    emit:
+        PUSH1 4 CALLDATALOAD DUP1 PUSH1 5 SHL PUSH1 0x24 ADD
+        DUP1 CALLDATASIZE SUB DUP1 SWAP2 PUSH1 0 CALLDATACOPY   # [size, count]
+    """
+    for count in range(5):
+        source += 'DUP2 PUSH1 {} EQ @log{} JUMPI\n'.format(count, count)
+    source += 'PUSH1 0 DUP1 REVERT\n'
+    for count in range(5):
+        # LOGn pops the offset, the size, then the topics in order
+        source += 'log{}: '.format(count)
+        for index in reversed(range(count)):
+            source += 'PUSH1 {} CALLDATALOAD SWAP1 '.format(0x24 + index * 32)
+        source += 'PUSH1 0 LOG{} STOP\n'.format(count)
+
+    return assemble(source, data)
+
+
+# Multicall3 `aggregate3`, `getEthBalance`, `getBlockNumber` and `getCurrentBlockTimestamp`
+# Memory: 0x00 index, 0x20 calls count, 0x40 calls offset, 0x60 end of the result, 0x80 the result
+MULTICALL3_SOURCE = """
+    PUSH1 0 CALLDATALOAD PUSH1 0xe0 SHR
+    DUP1 PUSH4 0x82ad56cb EQ @aggregate3 JUMPI
+    DUP1 PUSH4 0x4d2301cc EQ @balance JUMPI
+    DUP1 PUSH4 0x42cbb15c EQ @number JUMPI
+    DUP1 PUSH4 0x0f28c97d EQ @timestamp JUMPI
+    PUSH1 0 DUP1 REVERT
+
+balance:
+    PUSH1 4 CALLDATALOAD BALANCE
+word:
+    PUSH1 0 MSTORE PUSH1 0x20 PUSH1 0 RETURN
+number:
+    NUMBER @word JUMP
+timestamp:
+    TIMESTAMP @word JUMP
+
+aggregate3:
+    PUSH1 4 CALLDATALOAD PUSH1 4 ADD                    # the calls array
+    DUP1 CALLDATALOAD PUSH1 0x20 MSTORE
+    PUSH1 0x20 ADD PUSH1 0x40 MSTORE
+    PUSH1 0x20 PUSH1 0x80 MSTORE                        # the result array offset and count
+    PUSH1 0x20 MLOAD PUSH1 0xa0 MSTORE
+    PUSH1 0x20 MLOAD PUSH1 5 SHL PUSH1 0xc0 ADD PUSH1 0x60 MSTORE
+loop:
+    PUSH1 0x20 MLOAD PUSH1 0 MLOAD LT ISZERO @done JUMPI
+    PUSH1 0x40 MLOAD DUP1 PUSH1 0 MLOAD PUSH1 5 SHL ADD CALLDATALOAD ADD          # [call]
+    DUP1 PUSH1 0x40 ADD CALLDATALOAD DUP2 ADD                                      # [data, call]
+    DUP1 CALLDATALOAD                                                              # [size, data, call]
+    DUP1 DUP3 PUSH1 0x20 ADD PUSH1 0x60 MLOAD PUSH1 0x60 ADD CALLDATACOPY
+    PUSH1 0 PUSH1 0 DUP3 PUSH1 0x60 MLOAD PUSH1 0x60 ADD PUSH1 0 DUP8 CALLDATALOAD GAS CALL
+    DUP1 ISZERO DUP5 PUSH1 0x20 ADD CALLDATALOAD ISZERO AND @fail JUMPI          # [success, ...]
+    PUSH1 0x60 MLOAD MSTORE                                                        # (success, bytes)
+    PUSH1 0x40 PUSH1 0x60 MLOAD PUSH1 0x20 ADD MSTORE
+    RETURNDATASIZE PUSH1 0x60 MLOAD PUSH1 0x40 ADD MSTORE
+    PUSH1 0 RETURNDATASIZE PUSH1 0x60 MLOAD PUSH1 0x60 ADD ADD MSTORE             # zero padding
+    RETURNDATASIZE PUSH1 0 PUSH1 0x60 MLOAD PUSH1 0x60 ADD RETURNDATACOPY
+    PUSH1 0xc0 PUSH1 0x60 MLOAD SUB PUSH1 0 MLOAD PUSH1 5 SHL PUSH1 0xc0 ADD MSTORE
+    PUSH1 0x1f RETURNDATASIZE ADD PUSH1 5 SHR PUSH1 5 SHL
+    PUSH1 0x60 MLOAD ADD PUSH1 0x60 ADD PUSH1 0x60 MSTORE
+    PUSH1 0 MLOAD PUSH1 1 ADD PUSH1 0 MSTORE
+    POP POP POP @loop JUMP
+done:
+    PUSH1 0x80 PUSH1 0x60 MLOAD SUB PUSH1 0x80 RETURN
+fail:
+    RETURNDATASIZE PUSH1 0 PUSH1 0 RETURNDATACOPY RETURNDATASIZE PUSH1 0 REVERT
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    chain = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+        if isinstance(payload, list):
+            response = [self.chain.request(i) for i in payload]
+        else:
+            response = self.chain.request(payload)
+
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LocalChain(object):
+    """
+    In-process eth-tester chain served as JSON-RPC over HTTP on 127.0.0.1
+    The SDK talks to it through its normal HTTP providers, so nothing has to be mocked
+    """
+
+    def __init__(self):
+        self.tester = EthereumTesterProvider()
+        self.web3 = Web3(self.tester)
+        self.accounts = [tools.interface.Address(i) for i in self.web3.eth.accounts]
+
+        self.set_code(engine.multicall.MULTICALL3_ADDRESS, assemble(MULTICALL3_SOURCE))
+
+        self.__lock = threading.Lock()
+        self.__request = self.tester.request_func(self.web3, NamedElementOnion([]))
+        handler = type('Handler', (_Handler,), {'chain': self})
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def uri(self) -> str:
+        return 'http://127.0.0.1:{}'.format(self.__server.server_port)
+
+    def network(self) -> tools.interface.Network:
+        return tools.interface.Network(
+            rpc=self.uri(),
+            name="Local chain",
+            chain_id=self.web3.eth.chain_id,
+            symbol="ETH",
+            explorer="http://127.0.0.1"
+        )
+
+    def request(self, payload: dict) -> dict:
+        response = {'jsonrpc': '2.0', 'id': payload.get('id')}
+
+        try:
+            with self.__lock:
+                result = self.__request(payload['method'], payload.get('params', []))
+        except Exception as err:
+            response['error'] = {'code': -32000, 'message': str(err)}
+            return response
+
+        if 'error' in result:
+            response['error'] = _to_json_rpc(result['error'])
+        else:
+            response['result'] = _to_json_rpc(result['result'])
+
+        return response
+
+    def set_code(self, address: str, runtime: bytes):
+        """Place runtime code at address, as the genesis of a network places its predeploys"""
+
+        chain = self.tester.ethereum_tester.backend.chain
+        state = chain.get_vm().state
+        state.set_code(to_canonical_address(address), runtime)
+        state.persist()
+        chain.header = chain.header.copy(state_root=state.state_root)
+        self.tester.ethereum_tester.mine_blocks(1)
+
+    def emit(self, contract: tools.interface.Address, topics: list, data: bytes = b'') -> dict:
+        """Make a stub contract log an event of up to 4 topics (hex or bytes), returns the receipt"""
+
+        call_data = EMIT_SELECTOR + len(topics).to_bytes(32, 'big')
+        for topic in topics:
+            call_data += bytes.fromhex(topic[2:]) if isinstance(topic, str) else bytes(topic)
+        tx_hash = self.web3.eth.send_transaction({
+            'from': self.accounts[0].value(),
+            'to': contract.value(),
+            'data': '0x' + (call_data + data).hex()
+        })
+
+        return self.web3.eth.get_transaction_receipt(tx_hash)
+
+    def deploy_stub(self, abi: list, results: dict = None) -> tools.interface.Address:
+        """Deploy a contract answering the ABI functions, see stub_runtime"""
+
+        runtime = stub_runtime(abi, results)
+        # CODECOPY(0, init size, runtime size) RETURN(0, runtime size)
+        init = b'\x61' + len(runtime).to_bytes(2, 'big') + b'\x80\x60\x0c\x60\x00\x39\x60\x00\xf3'
+        tx_hash = self.web3.eth.send_transaction({
+            'from': self.accounts[0].value(),
+            'data': '0x' + (init + runtime).hex()
+        })
+
+        return tools.interface.Address(self.web3.eth.get_transaction_receipt(tx_hash).contractAddress)
+
+
+__all__ = ['LocalChain', 'assemble', 'stub_runtime', 'EMIT_SELECTOR', 'MULTICALL3_SOURCE']
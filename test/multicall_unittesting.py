@@ -0,0 +1,296 @@
+from walletika import engine, tools, abis
+from localchain import LocalChain, assemble, MULTICALL3_SOURCE
+from web3 import exceptions
+import unittest
+
+
+debugging = True
+
+
+def function_name(text: str):
+    print(f"[ + ] Start for: {text}")
+
+
+def rpc_count(method: str) -> int:
+    return engine.metrics.RPCMetrics.snapshot().get(method, {}).get('count', 0)
+
+
+# Local chain with Multicall3 at its usual address
+chain = LocalChain()
+chain.start()
+engine.provider.MainProvider.connect(chain.network())
+# eth-tester charges the gas of `eth_call` to the first account
+wallets = chain.accounts[1:4]
+
+token = tools.interface.Token(
+    contract=chain.deploy_stub(abis.tokenABI, {
+        'name': "Walletika", 'symbol': "WTK", 'decimals': 18,
+        'totalSupply': 10 ** 27, 'balanceOf': 10 ** 21
+    }),
+    symbol="WTK",
+    decimals=18
+)
+token_engine = engine.token.TokenEngine(token_interface=token)
+
+# A contract which reverts every call
+reverting_address = '0x' + 'ee' * 20
+chain.set_code(reverting_address, assemble('PUSH1 0 DUP1 REVERT'))
+
+
+class MulticallUnitTesting(unittest.TestCase):
+    def test_1_supported(self):
+        function_name('Multicall.is_supported')
+
+        # Task
+        supported = engine.multicall.Multicall().is_supported()
+        unsupported = engine.multicall.Multicall(contract=chain.accounts[9]).is_supported()
+
+        # Test
+        self.assertTrue(supported)
+        self.assertFalse(unsupported)
+
+    def test_2_details(self):
+        function_name('details')
+
+        # Task
+        engine.callcache.CallCache.clear()
+        engine.metrics.RPCMetrics.reset()
+        result = token_engine.details()
+        calls = rpc_count('eth_call')
+
+        # Debugging
+        if debugging:
+            print(f"""
+            details: {result}
+            eth_call: {calls}
+            """)
+
+        # Test
+        self.assertEqual(calls, 1)
+        self.assertEqual(result['name'], token_engine.name())
+        self.assertEqual(result['symbol'], token.symbol)
+        self.assertEqual(result['decimals'], token.decimals)
+        self.assertEqual(result['totalSupply'].value(), token_engine.total_supply().value())
+
+    def test_3_balances_of(self):
+        function_name('balances_of')
+
+        # Task
+        engine.metrics.RPCMetrics.reset()
+        balances = token_engine.balances_of(wallets)
+        calls = rpc_count('eth_call')
+
+        # Test
+        self.assertEqual(calls, 1)
+        self.assertEqual(
+            [i.value() for i in balances], [token_engine.balance_of(i).value() for i in wallets]
+        )
+
+    def test_4_native_balances(self):
+        function_name('Multicall.balance_of')
+
+        # Task
+        with engine.multicall.Multicall() as multicall:
+            multicall.block_number()
+            for wallet in wallets:
+                multicall.balance_of(wallet)
+        block_number, *balances = multicall.results
+
+        # Test
+        self.assertEqual(block_number, engine.provider.MainProvider.web3.eth.block_number)
+        self.assertEqual(
+            [i.value() for i in balances],
+            [engine.provider.MainProvider.web3.eth.get_balance(i.value()) for i in wallets]
+        )
+
+    def test_5_allow_failure(self):
+        function_name('Multicall.add allow_failure')
+
+        # Task
+        reverting = engine.provider.MainProvider.web3.eth.contract(
+            address=tools.interface.Address(reverting_address).value(), abi=abis.tokenABI
+        )
+        contract = engine.provider.MainProvider.web3.eth.contract(
+            address=token.contract.value(), abi=abis.tokenABI
+        )
+        # No code, so nothing to decode
+        wallet = engine.provider.MainProvider.web3.eth.contract(
+            address=wallets[0].value(), abi=abis.tokenABI
+        )
+        with engine.multicall.Multicall() as multicall:
+            multicall.add(contract.functions.symbol())
+            multicall.add(reverting.functions.symbol())
+            multicall.add(wallet.functions.symbol())
+
+        # Test
+        self.assertEqual(multicall.results, ["WTK", None, None])
+
+        multicall = engine.multicall.Multicall()
+        multicall.add(reverting.functions.symbol(), allow_failure=False)
+        with self.assertRaises((exceptions.ContractLogicError, ValueError)):
+            multicall.execute()
+
+    def test_6_chunks(self):
+        function_name('Multicall size')
+
+        # Task
+        engine.metrics.RPCMetrics.reset()
+        multicall = engine.multicall.Multicall(size=2)
+        contract = engine.provider.MainProvider.web3.eth.contract(
+            address=token.contract.value(), abi=abis.tokenABI
+        )
+        for wallet in wallets + wallets:
+            multicall.add(contract.functions.balanceOf(wallet.value()))
+        with engine.metrics.rpc_budget(1):
+            results = multicall.execute()
+
+        # Test
+        self.assertEqual(results, [10 ** 21] * 6)
+        # Three `aggregate3` calls in one batch
+        self.assertEqual(engine.metrics.RPCMetrics.get('eth_call')['batched'], 3)
+
+    def test_7_fallback(self):
+        function_name('Multicall fallback')
+
+        # Task
+        engine.metrics.RPCMetrics.reset()
+        contract = engine.provider.MainProvider.web3.eth.contract(
+            address=token.contract.value(), abi=abis.tokenABI
+        )
+        with engine.multicall.Multicall(contract=chain.accounts[9]) as multicall:
+            multicall.add(contract.functions.name())
+            multicall.add(contract.functions.decimals())
+            multicall.balance_of(wallets[0])
+
+        # Test
+        self.assertEqual(rpc_count('eth_call'), 2)
+        self.assertEqual(multicall.results[:2], ["Walletika", 18])
+        self.assertEqual(
+            multicall.results[2].value(),
+            engine.provider.MainProvider.web3.eth.get_balance(wallets[0].value())
+        )
+
+    def test_8_call_cache_dumps(self):
+        function_name('CallCache.deferred')
+
+        # Task
+        engine.callcache.CallCache.clear()
+        contractcalls = engine.callcache.contractcalls.db
+        dumps = []
+        dump = contractcalls.dump
+        contractcalls.dump = lambda *args, **kwargs: dumps.append(dump(*args, **kwargs))
+        try:
+            result = token_engine.details()
+            cold = len(dumps)
+            token_engine.details()
+            warm = len(dumps) - cold
+        finally:
+            del contractcalls.dump
+
+        # Test
+        self.assertEqual(result['symbol'], "WTK")
+        # name, symbol and decimals are stored in one dump, then read from memory
+        self.assertEqual(cold, 1)
+        self.assertEqual(warm, 0)
+        self.assertEqual(
+            engine.callcache.CallCache.get(
+                engine.callcache.CallCache.key(token_engine.contract.functions.decimals())
+            ),
+            (True, 18)
+        )
+
+    def test_9_portfolio_fallback(self):
+        function_name('portfolio.scan without Multicall3')
+
+        # Task
+        # A wallet as a token has no code, so its balanceOf returns nothing
+        assets = [token, tools.interface.Token(contract=wallets[2], symbol="NONE", decimals=18)]
+        aggregated = engine.portfolio.scan(wallets[:2], assets)
+        chain.set_code(engine.multicall.MULTICALL3_ADDRESS, b'')
+        # Forget that the network has Multicall3
+        engine.multicall._deployments.clear()
+        try:
+            batched = engine.portfolio.scan(wallets[:2], assets)
+        finally:
+            chain.set_code(engine.multicall.MULTICALL3_ADDRESS, assemble(MULTICALL3_SOURCE))
+            engine.multicall._deployments.clear()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            aggregated: {aggregated.balances.tolist()} {aggregated.failed.tolist()}
+            batched: {batched.balances.tolist()} {batched.failed.tolist()}
+            """)
+
+        # Test
+        self.assertEqual(batched.failed.tolist(), [[False, False, True]] * 2)
+        self.assertEqual(batched.failed.tolist(), aggregated.failed.tolist())
+        self.assertEqual(batched.column(token).tolist(), [10 ** 21] * 2)
+        self.assertEqual(batched.column(token).tolist(), aggregated.column(token).tolist())
+
+    def test_10_batch_flushes(self):
+        function_name('Batch across flushes')
+
+        # Task
+        batch = engine.provider.MainProvider.batch(size=1)
+        first = batch.balance_of(wallets[0])
+        batch.flush()
+        second = batch.block_number()
+        third = batch.balance_of(wallets[1])
+        flushed = batch.flush()
+
+        # The second chunk fails, the first one was sent already
+        batch.block_number()
+        batch.request('eth_unknownMethod', [])
+        batch.block_number()
+        with self.assertRaises(ValueError):
+            batch.flush()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            indexes: {first}, {second}, {third}
+            results: {batch.results}
+            """)
+
+        # Test
+        self.assertEqual((first, second, third), (0, 1, 2))
+        self.assertEqual(len(flushed), 2)
+        self.assertEqual(
+            batch.results[first].value(),
+            engine.provider.MainProvider.web3.eth.get_balance(wallets[0].value())
+        )
+        self.assertIsInstance(batch.results[second], int)
+        self.assertEqual(batch.results[third].value(), flushed[1].value())
+        self.assertEqual(len(batch.results), 4)
+        self.assertIsInstance(batch.results[3], int)
+        self.assertEqual(len(batch), 0)
+
+    def test_11_call_cache_arguments(self):
+        function_name('CallCache.key with arguments')
+
+        # Task
+        engine.callcache.CallCache.clear()
+        engine.metrics.RPCMetrics.reset()
+        functions = token_engine.contract.functions
+        keys = [engine.callcache.CallCache.key(functions.balanceOf(i.value())) for i in wallets[:2]]
+        for wallet in wallets[:2] + wallets[:2]:
+            engine.callcache.CallCache.call(functions.balanceOf(wallet.value()))
+        calls = rpc_count('eth_call')
+
+        # Debugging
+        if debugging:
+            print(f"""
+            keys: {keys}
+            eth_call: {calls}
+            """)
+
+        # Test
+        # Every argument has its own result, a call without arguments is keyed by its selector
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertEqual(calls, 2)
+        self.assertEqual(engine.callcache.CallCache.key(functions.decimals())[2], '0x313ce567')
+
+
+if __name__ == '__main__':
+    unittest.main()
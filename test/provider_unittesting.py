@@ -1,6 +1,7 @@
 from walletika import engine, tools
 from web3 import datastructures
 import time
+import asyncio
 import pyotp
 import unittest
 
@@ -89,6 +90,235 @@ class NetworkUnitTesting(unittest.TestCase):
 
         self.__run(network_name)
 
+    def test_batch(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('MainProvider.batch > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(network)
+        addresses = [tools.interface.Address(i[0]) for i in specific_wallets_details()]
+
+        with engine.provider.MainProvider.batch(size=2) as batch:
+            for address in addresses:
+                batch.balance_of(address)
+            batch.block_number()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            balances: {[i.to_ether_string() for i in batch.results[:-1]]}
+            block_number: {batch.results[-1]}
+            """)
+
+        # Test
+        self.assertEqual(len(batch.results), len(addresses) + 1)
+        for address, balance in zip(addresses, batch.results):
+            self.assertIsInstance(balance, tools.interface.WeiAmount)
+            self.assertEqual(
+                balance.value(), engine.provider.MainProvider.balance_of(address).value()
+            )
+        self.assertIsInstance(batch.results[-1], int)
+
+    def test_backup_rpcs(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('MainProvider backup RPCs > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        network_with_backup = tools.interface.Network(
+            rpc="http://127.0.0.1:1",  # Unreachable
+            name=network.name,
+            chain_id=network.chainID,
+            symbol=network.symbol,
+            explorer=network.explorer,
+            backup_rpcs=[network.rpc]
+        )
+        connected = engine.provider.MainProvider.connect(network_with_backup)
+        endpoints = engine.provider.MainProvider.web3.provider.ranked()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            endpoints: {[(i.uri, i.latency, i.failures) for i in endpoints]}
+            """)
+
+        # Test
+        self.assertTrue(connected)
+        self.assertIsInstance(engine.provider.MainProvider.block_number(), int)
+        self.assertEqual(endpoints[0].uri, network.rpc)
+
+    def test_async_backup_rpcs(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('AsyncMainProvider backup RPCs > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        network_with_backup = tools.interface.Network(
+            rpc="http://127.0.0.1:1",  # Unreachable
+            name=network.name,
+            chain_id=network.chainID,
+            symbol=network.symbol,
+            explorer=network.explorer,
+            backup_rpcs=[network.rpc]
+        )
+
+        async def task():
+            provider = engine.provider.AsyncMainProvider
+            return await provider.connect(network_with_backup), await provider.block_number()
+
+        connected, block_number = asyncio.run(task())
+        endpoints = engine.provider.AsyncMainProvider.web3.provider.ranked()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            endpoints: {[(i.uri, i.latency, i.failures) for i in endpoints]}
+            """)
+
+        # Test
+        self.assertTrue(connected)
+        self.assertIsInstance(block_number, int)
+        self.assertEqual(endpoints[0].uri, network.rpc)
+
+    def test_eip1559_backup_rpcs(self):
+        network_name = "Ethereum"
+        function_name('MainProvider.eip1559_supported backup RPCs > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(tools.interface.Network(
+            rpc="http://127.0.0.1:1",  # Unreachable
+            name=network.name,
+            chain_id=network.chainID,
+            symbol=network.symbol,
+            explorer=network.explorer,
+            backup_rpcs=[network.rpc]
+        ))
+
+        # Test
+        # The Infura endpoint serves the requests when the first one fails
+        self.assertTrue(engine.provider.MainProvider.eip1559_supported())
+
+    def test_fee_cache(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('MainProvider.gas_price > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(network)
+        gas_price = engine.provider.MainProvider.gas_price()
+        block_number = engine.provider.MainProvider.fees.block_number()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            gas_price: {gas_price}
+            block_number: {block_number}
+            """)
+
+        # Test
+        self.assertIsInstance(gas_price, int)
+        if engine.provider.MainProvider.fees.block_number() == block_number:
+            self.assertEqual(engine.provider.MainProvider.gas_price(), gas_price)
+
+    def test_fee_oracle(self):
+        network_name = "Ethereum"
+        function_name('MainProvider.feeOracle > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(network)
+        fee_oracle = engine.provider.MainProvider.feeOracle
+        fee_oracle.resize(300)
+        latest_block = fee_oracle.update()
+        priority_fees = fee_oracle.priority_fees()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            latest_block: {latest_block}
+            next_base_fee: {fee_oracle.next_base_fee()}
+            priority_fees: {priority_fees}
+            """)
+
+        # Test
+        self.assertEqual(len(fee_oracle), 300)
+        self.assertEqual(len(priority_fees), 3)
+        self.assertEqual(priority_fees, sorted(priority_fees))
+        self.assertIsInstance(fee_oracle.next_base_fee(), int)
+
+    def test_rpc_metrics(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('RPCMetrics > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(network)
+        addresses = [tools.interface.Address(i[0]) for i in specific_wallets_details()]
+        engine.metrics.RPCMetrics.reset()
+
+        with engine.metrics.rpc_budget(1):
+            with engine.provider.MainProvider.batch() as batch:
+                for address in addresses:
+                    batch.balance_of(address)
+
+        with self.assertRaises(engine.metrics.RPCBudgetError):
+            with engine.metrics.rpc_budget(1):
+                for address in addresses:
+                    engine.provider.MainProvider.balance_of(address)
+
+        stats = engine.metrics.RPCMetrics.get('eth_getBalance')
+
+        # Debugging
+        if debugging:
+            print(f"""
+            metrics: {engine.metrics.RPCMetrics.snapshot()}
+            """)
+
+        # Test
+        self.assertEqual(stats['batched'], len(addresses))
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(sum(stats['histogram'].values()), stats['count'])
+        self.assertGreater(stats['responseBytes'], 0)
+
+    def test_send_transactions(self):
+        network_name = "Binance Smart Chain (Testnet)"
+        function_name('broadcast.send_transactions > %s' % network_name)
+
+        # Task
+        network = specific_networks_details()[network_name]
+        engine.provider.MainProvider.connect(network)
+        address, username, password, recovery_password = specific_wallets_details()[0]
+        otp_code = pyotp.TOTP(
+            tools.walletcreator.otp_hash(username, password, recovery_password)
+        ).now()
+        address, private_key, _ = tools.walletcreator.access(username, password, recovery_password, otp_code)
+        address = tools.interface.Address(address)
+        amount = tools.interface.EtherAmount(0.0001, decimals=18)
+
+        if not sendTransactionEnabled or engine.provider.MainProvider.balance_of(address).to_ether() < 0.1:
+            self.skipTest("Sending transactions is disabled or the balance is low")
+
+        txs = []
+        for _ in range(3):
+            tx = engine.provider.MainProvider.build_transaction(address, address, amount)
+            engine.provider.MainProvider.add_gas(tx)
+            txs.append(tx)
+        results = engine.broadcast.send_transactions(txs, private_key)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            nonces: {[i['nonce'] for i in txs]}
+            results: {[i.value() if isinstance(i, tools.interface.TXHash) else i for i in results]}
+            """)
+
+        # Test
+        self.assertEqual([i['nonce'] for i in txs], list(range(txs[0]['nonce'], txs[0]['nonce'] + 3)))
+        for result in results:
+            self.assertIsInstance(result, tools.interface.TXHash)
+
     def __run(self, network_name: str):
         # Task
         network = specific_networks_details()[network_name]
@@ -0,0 +1,339 @@
+from walletika import engine, tools, abis
+from localchain import LocalChain
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import asyncio
+import json
+import threading
+import unittest
+
+
+debugging = True
+
+
+def function_name(text: str):
+    print(f"[ + ] Start for: {text}")
+
+
+def amount(value: tools.interface.WeiAmount) -> tuple:
+    return value.value(), value.decimals()
+
+
+def pool_info(stake_interface: tools.interface.Stake) -> dict:
+    def token_info(token_interface: tools.interface.Token) -> dict:
+        return {
+            'contract': token_interface.contract.value(),
+            'symbol': token_interface.symbol,
+            'decimals': token_interface.decimals
+        }
+
+    return {
+        'stakeToken': token_info(stake_interface.stakeToken),
+        'rewardToken': token_info(stake_interface.rewardToken),
+        'stakeWebsite': stake_interface.stakeWebsite,
+        'rewardWebsite': stake_interface.rewardWebsite,
+        'startBlock': stake_interface.startBlock,
+        'endBlock': stake_interface.endBlock,
+        'startTime': stake_interface.startTime,
+        'endTime': stake_interface.endTime
+    }
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Stand-in of the stake feed API, the body is sent in small chunks with an ETag"""
+
+    protocol_version = 'HTTP/1.1'
+    feed = {}
+    etag = '"1"'
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        FeedHandler.requests.append(dict(self.headers))
+
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        data = json.dumps(self.feed).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for offset in range(0, len(data), 100):
+            chunk = data[offset:offset + 100]
+            self.wfile.write('{:x}\r\n'.format(len(chunk)).encode() + chunk + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+# Local chain with stub contracts
+chain = LocalChain()
+chain.start()
+network = chain.network()
+engine.provider.MainProvider.connect(network)
+user = chain.accounts[1]
+
+stake_token = tools.interface.Token(
+    contract=chain.deploy_stub(abis.tokenABI, {'symbol': "STK", 'decimals': 18}),
+    symbol="STK",
+    decimals=18
+)
+reward_token = tools.interface.Token(
+    contract=chain.deploy_stub(abis.tokenABI, {'symbol': "RWD", 'decimals': 6}),
+    symbol="RWD",
+    decimals=6
+)
+pool_state = {
+    'paused': False, 'hasUserLimit': True, 'lockedToEnd': False, 'totalSupply': 5 * 10 ** 21,
+    'rewardSupply': 10 ** 12, 'rewardPerBlock': 10 ** 6, 'poolLimitPerUser': 10 ** 20,
+    'accTokenPerShare': 123456, 'startBlock': 10, 'bonusEndBlock': 100000, 'lastRewardBlock': 20,
+    'balanceOf': 10 ** 19, 'pendingReward': 42
+}
+stake = tools.interface.Stake(
+    contract=chain.deploy_stub(abis.stakeABI, pool_state),
+    stake_token=stake_token,
+    reward_token=reward_token,
+    stake_website='',
+    reward_website='',
+    start_block=10,
+    end_block=100000,
+    start_time=0,
+    end_time=86400 * 30
+)
+stake_engine = engine.stake.StakeEngine(stake_interface=stake)
+
+if engine.stakefeed.upsert(engine.stakefeed.stored_pools(), network.rpc, stake):
+    engine.stake.stakecontracts.db.dump()
+
+# A factory whose pool is found only by its `NewSmartChefContract` log
+factory = chain.deploy_stub(abis.stakeFactoryABI)
+discovered_end_block = chain.web3.eth.block_number + 1000
+discovered_pool = chain.deploy_stub(abis.stakeABI, dict(
+    pool_state, stakedToken=stake_token.contract.value(), rewardToken=reward_token.contract.value(),
+    startBlock=1, bonusEndBlock=discovered_end_block, SMART_CHEF_FACTORY=factory.value()
+))
+
+feed_server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+threading.Thread(target=feed_server.serve_forever, daemon=True).start()
+feed_url = 'http://127.0.0.1:{}/stakes'.format(feed_server.server_port)
+
+
+class StakeUnitTesting(unittest.TestCase):
+    def test_1_snapshot(self):
+        function_name('StakeEngine.snapshot')
+
+        # Task
+        engine.metrics.RPCMetrics.reset()
+        snapshot = stake_engine.snapshot(user)
+        calls = engine.metrics.RPCMetrics.snapshot().get('eth_call', {}).get('count', 0)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            snapshot: {snapshot}
+            eth_call: {calls}
+            """)
+
+        # Test
+        self.assertEqual(calls, 1)
+        self.assertIs(snapshot.interface, stake)
+        self.assertEqual(snapshot.user, user)
+        self.assertEqual(snapshot.isPaused, stake_engine.is_paused())
+        self.assertEqual(snapshot.hasUserLimit, stake_engine.has_user_limit())
+        self.assertEqual(snapshot.lockedToEnd, stake_engine.locked_to_end())
+        self.assertEqual(amount(snapshot.totalSupply), amount(stake_engine.total_supply()))
+        self.assertEqual(amount(snapshot.rewardSupply), amount(stake_engine.reward_supply()))
+        self.assertEqual(amount(snapshot.rewardPerBlock), amount(stake_engine.reward_per_block()))
+        self.assertEqual(amount(snapshot.poolLimitPerUser), amount(stake_engine.pool_limit_per_user()))
+        self.assertEqual(amount(snapshot.accTokenPerShare), amount(stake_engine.acc_token_per_share()))
+        self.assertEqual(snapshot.startBlock, stake_engine.start_block())
+        self.assertEqual(snapshot.bonusEndBlock, stake_engine.bonus_end_block())
+        self.assertEqual(snapshot.lastRewardBlock, stake_engine.last_reward_block())
+        self.assertEqual(amount(snapshot.balance), amount(stake_engine.balance_of(user)))
+        self.assertEqual(amount(snapshot.pendingReward), amount(stake_engine.pending_reward(user)))
+        self.assertLessEqual(snapshot.blockNumber, engine.provider.MainProvider.block_number())
+
+    def test_2_snapshot_without_user(self):
+        function_name('StakeEngine.snapshot without user')
+
+        # Task
+        snapshot = stake_engine.snapshot()
+
+        # Test
+        self.assertIsNone(snapshot.user)
+        self.assertIsNone(snapshot.balance)
+        self.assertIsNone(snapshot.pendingReward)
+        self.assertEqual(amount(snapshot.totalSupply), amount(stake_engine.total_supply()))
+
+    def test_3_snapshot_all(self):
+        function_name('snapshot_all')
+
+        # Task
+        engine.metrics.RPCMetrics.reset()
+        snapshots = engine.stake.snapshot_all(user)
+        calls = engine.metrics.RPCMetrics.snapshot().get('eth_call', {}).get('count', 0)
+        snapshot = stake_engine.snapshot(user)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            pools: {len(snapshots)}
+            eth_call: {calls}
+            """)
+
+        # Test
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(snapshots), len(engine.stake.get_all(filter_by_network=True)))
+        found = [i for i in snapshots if i.interface.contract.value() == stake.contract.value()]
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0].rewardPerBlock.value(), snapshot.rewardPerBlock.value())
+        self.assertEqual(found[0].balance.value(), snapshot.balance.value())
+        self.assertEqual(found[0].pendingReward.value(), snapshot.pendingReward.value())
+        self.assertEqual(found[0].startBlock, snapshot.startBlock)
+
+    def test_4_async_snapshot(self):
+        function_name('AsyncStakeEngine.snapshot')
+
+        async def task():
+            await engine.provider.AsyncMainProvider.connect(network)
+            async_stake_engine = engine.stake.AsyncStakeEngine(stake_interface=stake)
+            return await async_stake_engine.snapshot(user)
+
+        # Task
+        snapshot = asyncio.run(task())
+        expected = stake_engine.snapshot(user)
+
+        # Test
+        self.assertEqual(snapshot.isPaused, expected.isPaused)
+        self.assertEqual(amount(snapshot.totalSupply), amount(expected.totalSupply))
+        self.assertEqual(amount(snapshot.pendingReward), amount(expected.pendingReward))
+        self.assertEqual(snapshot.lastRewardBlock, expected.lastRewardBlock)
+
+    def test_5_calculate_apr(self):
+        function_name('calculate_apr')
+
+        # Task
+        apr = engine.stake.calculate_apr(stake, 10 ** 6, 5 * 10 ** 21)
+        nothing_staked = engine.stake.calculate_apr(stake, 10 ** 6, 0)
+        nothing_at_all = engine.stake.calculate_apr(stake, 0, 0)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            apr: {apr}
+            nothing staked: {nothing_staked}
+            nothing at all: {nothing_at_all}
+            """)
+
+        # Test
+        # 1 RWD per block over 99990 blocks for 5000 STK, 12 periods a year
+        self.assertEqual(apr, '23997.60%')
+        self.assertEqual(nothing_staked, '0%')
+        self.assertEqual(nothing_at_all, '0%')
+        self.assertEqual(stake_engine.get_apr(), apr)
+
+    def test_6_feed_sync(self):
+        function_name('stakefeed.sync')
+
+        # Task
+        feed_pool = tools.interface.Address('0x' + '5a' * 20).value()
+        info = pool_info(stake)
+        FeedHandler.feed = {network.rpc: {stake.contract.value(): info, feed_pool: info}}
+        FeedHandler.etag = '"1"'
+        FeedHandler.requests = []
+        first = engine.stakefeed.sync(feed_url, chunk_size=64)
+        headers = engine.stakefeed.feed_headers(feed_url)
+        second = engine.stakefeed.sync(feed_url, chunk_size=64)
+
+        FeedHandler.feed[network.rpc][feed_pool] = dict(info, endBlock=info['endBlock'] + 1)
+        FeedHandler.etag = '"2"'
+        third = engine.stakefeed.sync(feed_url, chunk_size=64)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            first: {first}
+            second: {second}
+            third: {third}
+            headers: {headers}
+            """)
+
+        # Test
+        self.assertEqual(first, {'inserted': 1, 'updated': 0, 'deleted': 0, 'modified': True})
+        self.assertEqual(headers['etag'], '"1"')
+        self.assertNotIn('If-None-Match', FeedHandler.requests[0])
+        # The ETag is read back from data/stakefeeds
+        self.assertEqual(FeedHandler.requests[1].get('If-None-Match'), '"1"')
+        self.assertEqual(second, {'inserted': 0, 'updated': 0, 'deleted': 0, 'modified': False})
+        self.assertEqual(third, {'inserted': 0, 'updated': 1, 'deleted': 0, 'modified': True})
+        self.assertEqual(engine.stakefeed.feed_headers(feed_url)['etag'], '"2"')
+        self.assertEqual(
+            engine.stakefeed.stored_pools()[(network.rpc, feed_pool)].endBlock, info['endBlock'] + 1
+        )
+
+    def test_7_discover(self):
+        function_name('stakediscovery.discover')
+
+        # Task
+        pool_topic = '0x' + '00' * 12 + discovered_pool.value()[2:]
+        receipt = chain.emit(factory, [engine.stakediscovery.NEW_POOL_TOPIC, pool_topic])
+        count = engine.stakediscovery.discover(factory=factory, from_block=0, confirmations=0)
+        checkpoint = engine.logscanner.get_checkpoint(
+            network.rpc, engine.stakediscovery.checkpoint_key(factory)
+        )
+        again = engine.stakediscovery.discover(factory=factory, confirmations=0)
+        pool = engine.stakefeed.stored_pools().get((network.rpc, discovered_pool.value()))
+
+        # Debugging
+        if debugging:
+            print(f"""
+            discovered: {count}
+            again: {again}
+            checkpoint: {checkpoint}
+            """)
+
+        # Test
+        self.assertEqual(count, 1)
+        self.assertEqual(again, 0)
+        self.assertGreaterEqual(checkpoint, receipt.blockNumber)
+        self.assertEqual(pool.source, tools.interface.Stake.DISCOVERY)
+        self.assertEqual(pool.stakeToken.contract.value(), stake_token.contract.value())
+        self.assertEqual(pool.rewardToken.symbol, "RWD")
+        self.assertEqual(pool.rewardToken.decimals, 6)
+        self.assertEqual(pool.startBlock, 1)
+        self.assertEqual(pool.endBlock, discovered_end_block)
+        self.assertLess(pool.startTime, pool.endTime)
+
+    def test_8_factories(self):
+        function_name('stakediscovery.factories')
+
+        # Task
+        result = engine.stakediscovery.factories()
+
+        # Test
+        self.assertIn(factory.value(), [i.value() for i in result])
+
+    def test_9_feed_keeps_discovered_pools(self):
+        function_name('stakefeed.sync with discovered pools')
+
+        # Task
+        # The feed drops its second pool, the discovered one was never in it
+        FeedHandler.feed = {network.rpc: {stake.contract.value(): pool_info(stake)}}
+        FeedHandler.etag = '"3"'
+        result = engine.stake.data_import(feed_url)
+        stored = engine.stakefeed.stored_pools()
+
+        # Test
+        self.assertTrue(result)
+        self.assertIn((network.rpc, stake.contract.value()), stored)
+        self.assertIn((network.rpc, discovered_pool.value()), stored)
+        self.assertNotIn((network.rpc, tools.interface.Address('0x' + '5a' * 20).value()), stored)
+
+
+if __name__ == '__main__':
+    unittest.main()
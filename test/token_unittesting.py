@@ -1,6 +1,7 @@
 from walletika import engine, tools
 from web3 import datastructures
 import time
+import asyncio
 import pyotp
 import unittest
 
@@ -403,6 +404,59 @@ class TokenUnitTesting(unittest.TestCase):
                 wtk_token_engine.total_supply().value()
             )
 
+    def test_14_details(self):
+        function_name('details')
+
+        # Task
+        result: dict = token_engine.details()
+        balances: list = token_engine.balances_of([wallet1_address, wallet2_address])
+
+        # Debugging
+        if debugging:
+            print(f"""
+            details: {result}
+            balances: {[i.to_ether_string() for i in balances]}
+            """)
+
+        # Test
+        self.assertEqual(result['name'], token_engine.name())
+        self.assertEqual(result['symbol'], token.symbol)
+        self.assertEqual(result['decimals'], token.decimals)
+        self.assertIsInstance(result['totalSupply'], tools.interface.WeiAmount)
+        self.assertEqual(balances[0].value(), token_engine.balance_of(wallet1_address).value())
+        self.assertEqual(balances[1].value(), token_engine.balance_of(wallet2_address).value())
+
+    def test_15_async_token_engine(self):
+        function_name('AsyncTokenEngine')
+
+        async def task():
+            await engine.provider.AsyncMainProvider.connect(network)
+            async_token_engine = engine.token.AsyncTokenEngine(token_interface=token)
+            return await asyncio.gather(
+                async_token_engine.symbol(),
+                async_token_engine.decimals(),
+                async_token_engine.balance_of(wallet1_address),
+                async_token_engine.balance_of(wallet2_address)
+            )
+
+        # Task
+        symbol, decimals, balance1, balance2 = asyncio.run(task())
+
+        # Debugging
+        if debugging:
+            print(f"""
+            symbol: {symbol}
+            decimals: {decimals}
+            balance1: {balance1.to_ether_string()}
+            balance2: {balance2.to_ether_string()}
+            """)
+
+        # Test
+        self.assertEqual(symbol, token.symbol)
+        self.assertEqual(decimals, token.decimals)
+        self.assertEqual(balance1.value(), token_engine.balance_of(wallet1_address).value())
+        self.assertEqual(balance2.value(), token_engine.balance_of(wallet2_address).value())
+
     def __send_transaction(self, tx_data: dict, private_key: str):
         tx = engine.provider.MainProvider.build_transaction(
             from_address=tools.interface.Address(tx_data[engine.provider.Metadata.FROM]),
@@ -432,6 +486,107 @@ class TokenUnitTesting(unittest.TestCase):
             transaction_receipt: {transaction_receipt}
             """)
 
+    def test_16_call_cache(self):
+        function_name('CallCache')
+
+        # Task
+        engine.callcache.CallCache.clear()
+        decimals = token_engine.decimals()
+        found, cached = engine.callcache.CallCache.get((
+            network.chainID, token.contract.value(), '0x313ce567'  # decimals()
+        ))
+
+        # Debugging
+        if debugging:
+            print(f"""
+            decimals: {decimals}
+            cached: {cached}
+            """)
+
+        # Test
+        self.assertTrue(found)
+        self.assertEqual(cached, decimals)
+        self.assertEqual(token_engine.decimals(), token.decimals)
+
+    def test_17_plan_transfer_multiple(self):
+        function_name('plan_transfer_multiple')
+
+        # Task
+        addresses = [tools.interface.Address('0x%040x' % (i + 1)) for i in range(200)]
+        amounts = [tools.interface.EtherAmount(1, decimals=token.decimals)] * len(addresses)
+        target_gas = 1000000
+        result: list = wtk_token_engine.plan_transfer_multiple(addresses, amounts, target_gas=target_gas)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            chunks: {[(i['start'], i['end'], i['gas']) for i in result]}
+            """)
+
+        # Test
+        self.assertEqual(result[0]['start'], 0)
+        self.assertEqual(result[-1]['end'], len(addresses))
+        for previous, chunk in zip(result, result[1:]):
+            self.assertEqual(previous['end'], chunk['start'])
+        for chunk in result:
+            self.assertLessEqual(chunk['gas'], target_gas)
+            # The nonces are taken when the chunks are sent, see broadcast.send_transactions
+            self.assertNotIn('nonce', chunk['transaction'])
+
+    def test_18_transfers_sync(self):
+        function_name('transfers.sync')
+
+        # Task
+        wallet_engine = engine.wallet.WalletEngine(
+            tools.interface.Wallet(wallet1_address, 'username', b'', 'date', False)
+        )
+        if token.contract.value() not in [i.contract.value() for i in wallet_engine.tokens()]:
+            wallet_engine.add_token(token)
+        count: int = engine.transfers.sync(lookback=5000)
+        key = engine.transfers.checkpoint_key(token, wallet1_address.value())
+        checkpoint = engine.logscanner.get_checkpoint(network.rpc, key)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            new transactions: {count}
+            checkpoint: {checkpoint}
+            """)
+
+        # Test
+        self.assertIsInstance(count, int)
+        self.assertIsInstance(checkpoint, int)
+        engine.transfers.sync()
+        self.assertGreaterEqual(
+            engine.logscanner.get_checkpoint(network.rpc, key),
+            checkpoint
+        )
+
+    def test_19_portfolio(self):
+        function_name('portfolio.scan')
+
+        # Task
+        wallets = [wallet1_address, wallet2_address]
+        portfolio = engine.portfolio.scan(wallets, [token])
+        balance = token_engine.balance_of(wallet1_address)
+
+        # Debugging
+        if debugging:
+            print(f"""
+            block number: {portfolio.blockNumber}
+            balances: {portfolio.to_ether().tolist()}
+            failed: {portfolio.failed.tolist()}
+            """)
+
+        # Test
+        self.assertEqual(portfolio.balances.shape, (2, 2))
+        self.assertFalse(portfolio.failed.any())
+        self.assertEqual(portfolio.balance_of(wallet1_address, token).value(), balance.value())
+        self.assertEqual(
+            portfolio.totals()[1].value(),
+            sum(portfolio.balance_of(i, token).value() for i in wallets)
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
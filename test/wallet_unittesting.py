@@ -250,6 +250,27 @@ class WalletUnitTesting(unittest.TestCase):
 
         self.assertAlmostEqual(len(engine.wallet.get_all()), 0, msg="wallets have not been removed")
 
+    def test7_reconcile(self):
+        function_name('reconcile')
+
+        # Task
+        changed: list = engine.receipts.reconcile(rounds=1)
+        pending: dict = engine.receipts.pending_transactions()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            changed: {[(i.txHash.value(), i.status_text()) for i in changed]}
+            pending: {sum(len(i) for i in pending.values())}
+            """)
+
+        # Test
+        for transaction in changed:
+            self.assertIsInstance(transaction, tools.interface.Transaction)
+            self.assertNotEqual(transaction.status, tools.interface.Transaction.Status.PENDING)
+            for hashes in pending.values():
+                self.assertNotIn(transaction.txHash.value(), hashes)
+
 
 if __name__ == '__main__':
     unittest.main()
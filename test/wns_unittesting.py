@@ -0,0 +1,312 @@
+from walletika import engine, abis
+from localchain import LocalChain
+from web3 import Web3
+from eth_abi import encode_abi
+from concurrent.futures import Future
+import asyncio
+import threading
+import unittest
+
+
+debugging = True
+
+
+def function_name(text: str):
+    print(f"[ + ] Start for: {text}")
+
+
+def rpc_count(method: str) -> int:
+    return engine.metrics.RPCMetrics.snapshot().get(method, {}).get('count', 0)
+
+
+def registry_rows() -> int:
+    db = engine.wnsmirror.wnsregistry.db
+    return len(list(db.select(rpc=network.rpc, contract=wns_contract.value())))
+
+
+NEW_RECORD = 'NewRecord(string,address)'
+TRANSFER_USERNAME = 'TransferUsername(string,address,address)'
+VERIFIED = 'Verified(string,address,bool)'
+SCAMMER = 'Scammer(string,address,bool)'
+
+
+def emit_event(signature: str, addresses: list, types: list, values: list) -> dict:
+    """Log a WNS event from the stub, `addresses` are the indexed arguments"""
+
+    topics = [Web3.keccak(text=signature)] + ['0x' + '00' * 12 + i.value()[2:] for i in addresses]
+    return chain.emit(wns_contract, topics, encode_abi(types, values))
+
+
+# Local chain with a stub WNS contract, every name belongs to `owner` and is available
+chain = LocalChain()
+chain.start()
+network = chain.network()
+owner = chain.accounts[1]
+
+engine.provider.MainProvider.connect(network)
+engine.provider.WNSProvider.connect(network)
+wns_contract = chain.deploy_stub(abis.wnsABI, {
+    'getByName': (owner.value(), True, False),
+    'getByAddress': ("alice", True, False),
+    'isReserved': False,
+    'isRecorded': False
+})
+engine.provider.WNSProvider.set_contract(wns_contract)
+wns_engine = engine.wns.WNSEngine()
+WNSCache = engine.wnscache.WNSCache
+
+
+class WNSUnitTesting(unittest.TestCase):
+    def setUp(self):
+        WNSCache.clear()
+        WNSCache.ttl = 300.0
+        engine.metrics.RPCMetrics.reset()
+
+    def test_1_get_by_name(self):
+        function_name('WNSEngine.get_by_name')
+
+        # Task
+        first = wns_engine.get_by_name("alice")
+        second = wns_engine.get_by_name("alice")
+        calls = rpc_count('eth_call')
+
+        # Debugging
+        if debugging:
+            print(f"""
+            record: {first}
+            eth_call: {calls}
+            """)
+
+        # Test
+        self.assertEqual(calls, 1)
+        self.assertEqual(first['address'].value(), owner.value())
+        self.assertTrue(first['isVerified'])
+        self.assertEqual(first, second)
+        # A copy, so changing it leaves the cached record as it is
+        second['isVerified'] = False
+        self.assertTrue(wns_engine.get_by_name("alice")['isVerified'])
+
+    def test_2_resolve_many(self):
+        function_name('WNSEngine.resolve_many and reverse_many')
+
+        # Task
+        wns_engine.get_by_name("alice")
+        engine.metrics.RPCMetrics.reset()
+        names = wns_engine.resolve_many(["alice", "bob", "carol", "bob"])
+        names_calls = rpc_count('eth_call')
+        addresses = wns_engine.reverse_many(chain.accounts[2:5])
+        addresses_calls = rpc_count('eth_call') - names_calls
+        again = wns_engine.resolve_many(["bob", "carol"])
+        again += wns_engine.reverse_many(chain.accounts[2:5])
+        again_calls = rpc_count('eth_call') - names_calls - addresses_calls
+
+        # Debugging
+        if debugging:
+            print(f"""
+            names: {names}
+            addresses: {addresses}
+            eth_call: {names_calls}, {addresses_calls}, {again_calls}
+            """)
+
+        # Test
+        # The uncached names and addresses in one aggregated call each, then from the cache
+        self.assertEqual((names_calls, addresses_calls, again_calls), (1, 1, 0))
+        self.assertEqual(len(names), 4)
+        self.assertEqual(names[1], names[3])
+        for record in names:
+            self.assertEqual(record, wns_engine.get_by_name("alice"))
+        self.assertEqual([i['username'] for i in addresses], ["alice"] * 3)
+        self.assertEqual(again[3], wns_engine.get_by_address(chain.accounts[2]))
+
+    def test_3_expiry(self):
+        function_name('WNSCache ttl')
+
+        # Task
+        WNSCache.ttl = 0.0
+        wns_engine.get_by_name("alice")
+        wns_engine.get_by_name("alice")
+        calls = rpc_count('eth_call')
+
+        # Test
+        self.assertEqual(calls, 2)
+
+    def test_4_events(self):
+        function_name('WNSCache.refresh')
+
+        # Task
+        wns_engine.get_by_name("alice")
+        wns_engine.get_by_name("bob")
+        emit_event(NEW_RECORD, [owner], ['string'], ["alice"])
+        WNSCache.refresh(force=True)
+        engine.metrics.RPCMetrics.reset()
+        wns_engine.get_by_name("alice")
+        wns_engine.get_by_name("bob")
+        calls = rpc_count('eth_call')
+
+        # Test
+        # Only the name of the event is requested again
+        self.assertEqual(calls, 1)
+        self.assertEqual(WNSCache.get(WNSCache.NAME, "bob")[0], True)
+
+    def test_5_async_cache(self):
+        function_name('AsyncWNSEngine cache')
+
+        async def task():
+            await engine.provider.AsyncWNSProvider.connect(network)
+            engine.provider.AsyncWNSProvider.set_contract(wns_contract)
+            async_wns_engine = engine.wns.AsyncWNSEngine()
+
+            first = await async_wns_engine.get_by_name("alice")
+            second = await async_wns_engine.get_by_name("alice")
+            records = await async_wns_engine.reverse_many(chain.accounts[2:4])
+            cached_calls = rpc_count('eth_call')
+
+            WNSCache.ttl = 0.0
+            await async_wns_engine.get_by_name("dave")
+            await async_wns_engine.get_by_name("dave")
+            return (
+                async_wns_engine, first, second, records, cached_calls,
+                rpc_count('eth_call') - cached_calls
+            )
+
+        # Task
+        async_wns_engine, first, second, records, cached_calls, expired_calls = asyncio.run(task())
+
+        # Debugging
+        if debugging:
+            print(f"""
+            record: {first}
+            eth_call: {cached_calls}, {expired_calls}
+            """)
+
+        # Test
+        self.assertEqual(cached_calls, 3)
+        self.assertEqual(expired_calls, 2)
+        self.assertEqual(first, second)
+        self.assertEqual(first, wns_engine.get_by_name("alice"))
+        self.assertEqual([i['username'] for i in records], ["alice"] * 2)
+        # The aggregated and planning methods are sync only
+        for name in ['availability', 'plan_reserve_users', 'plan_multi_verified']:
+            self.assertFalse(hasattr(async_wns_engine, name))
+        self.assertFalse(hasattr(async_wns_engine, 'plan_multi_scammers'))
+        self.assertTrue(hasattr(async_wns_engine, 'reserve_users'))
+
+    def test_6_mirror(self):
+        function_name('WNSMirror.sync')
+
+        # Task
+        registry = engine.wnsmirror.wnsregistry.db
+        dumps = []
+        dump = registry.dump
+        registry.dump = lambda *args, **kwargs: dumps.append(dump(*args, **kwargs))
+        try:
+            # alice -> owner was recorded by test_4
+            emit_event(NEW_RECORD, [chain.accounts[2]], ['string'], ["bob"])
+            emit_event(VERIFIED, [chain.accounts[2]], ['string', 'bool'], ["bob", True])
+            emit_event(TRANSFER_USERNAME, [owner, chain.accounts[3]], ['string'], ["alice"])
+            emit_event(SCAMMER, [chain.accounts[4]], ['string', 'bool'], ["", True])
+
+            mirror = engine.wnsmirror.WNSMirror()
+            count = mirror.sync()
+            first_dumps = len(dumps)
+            rows = registry_rows()
+            mirror.sync()
+            idle_dumps = len(dumps) - first_dumps
+
+            emit_event(VERIFIED, [chain.accounts[2]], ['string', 'bool'], ["bob", False])
+            mirror.sync()
+            changed_rows = registry_rows()
+        finally:
+            del registry.dump
+
+        # The rows are read back by a new mirror
+        loaded = engine.wnsmirror.WNSMirror()
+
+        # Debugging
+        if debugging:
+            print(f"""
+            events: {count}
+            rows: {rows}
+            dumps: {dumps}
+            """)
+
+        # Test
+        self.assertEqual(count, 5)
+        self.assertEqual((first_dumps, idle_dumps, len(dumps)), (1, 0, 2))
+        # block, 2 names, 3 owners and 1 scammer, changed in place
+        self.assertEqual(rows, 7)
+        self.assertEqual(changed_rows, rows)
+        self.assertEqual(loaded.block_number(), mirror.block_number())
+        self.assertEqual(loaded.users_count(), 2)
+        self.assertEqual(loaded.get_by_name("alice")['address'].value(), chain.accounts[3].value())
+        self.assertFalse(loaded.get_by_name("bob")['isVerified'])
+        self.assertEqual(loaded.get_by_address(owner)['username'], '')
+        self.assertEqual(loaded.get_by_address(chain.accounts[3])['username'], "alice")
+        self.assertTrue(loaded.is_scammer(chain.accounts[4]))
+        self.assertEqual(loaded.cross_check(["bob"]), ["bob"])
+
+    def test_7_availability(self):
+        function_name('WNSEngine.availability')
+
+        # Task
+        names = ["amy", "ben", "cat", "dan", "eve", "ben"]
+        with engine.metrics.rpc_budget(1):
+            result = wns_engine.availability(names, size=2)
+        batched = engine.metrics.RPCMetrics.get('eth_call')['batched']
+
+        # Debugging
+        if debugging:
+            print(f"""
+            available: {result.available()}
+            batched eth_call: {batched}
+            """)
+
+        # Test
+        # 5 unique names, 2 calls each, 2 calls per eth_call, all in one batch
+        self.assertEqual(batched, 5)
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result.available(), names)
+        self.assertFalse(result.failed.any())
+        self.assertTrue(result.is_available("eve"))
+        self.assertEqual(engine.wns._inFlight, {})
+
+    def test_8_availability_in_flight(self):
+        function_name('WNSEngine.availability in flight')
+
+        # Task
+        # Another thread is checking "zed" already, it finds it reserved
+        future = Future()
+        engine.wns._inFlight[(wns_engine.contract.address, "zed")] = future
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(wns_engine.availability(["zed", "amy"]))
+        )
+        thread.start()
+        thread.join(timeout=1.0)
+        waiting = thread.is_alive()
+        calls = rpc_count('eth_call')
+
+        future.set_result((True, False))
+        thread.join()
+        engine.wns._inFlight.clear()
+        result = results[0]
+
+        # Debugging
+        if debugging:
+            print(f"""
+            waiting: {waiting}
+            reserved: {result.reserved.tolist()}
+            eth_call: {calls}
+            """)
+
+        # Test
+        # Only "amy" is requested, "zed" is the result of the other thread
+        self.assertTrue(waiting)
+        self.assertEqual(calls, 1)
+        self.assertEqual(rpc_count('eth_call'), 1)
+        self.assertEqual(result.reserved.tolist(), [True, False])
+        self.assertEqual(result.available(), ["amy"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ from . import abis
 from . import data
 from . import tools
 from . import engine
-from .engine.provider import MainProvider, WNSProvider
+from .engine.provider import MainProvider, WNSProvider, AsyncMainProvider, AsyncWNSProvider
 from web3 import Web3
 from eth_utils import units
 import os
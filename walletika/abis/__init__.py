@@ -11,6 +11,12 @@ STAKE_ABI_PATH = os.path.join(
 WNS_ABI_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), 'wns.json'
 )
+MULTICALL_ABI_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'multicall.json'
+)
+STAKE_FACTORY_ABI_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'stakefactory.json'
+)
 
 
 with open(TOKEN_ABI_PATH) as file:
@@ -25,4 +31,15 @@ with open(WNS_ABI_PATH) as file:
     wnsABI = json.load(file)
 
 
-__all__ = ['TOKEN_ABI_PATH', 'STAKE_ABI_PATH', 'WNS_ABI_PATH', 'tokenABI', 'stakeABI', 'wnsABI']
+with open(MULTICALL_ABI_PATH) as file:
+    multicallABI = json.load(file)
+
+
+with open(STAKE_FACTORY_ABI_PATH) as file:
+    stakeFactoryABI = json.load(file)
+
+
+__all__ = [
+    'TOKEN_ABI_PATH', 'STAKE_ABI_PATH', 'WNS_ABI_PATH', 'MULTICALL_ABI_PATH', 'STAKE_FACTORY_ABI_PATH',
+    'tokenABI', 'stakeABI', 'wnsABI', 'multicallABI', 'stakeFactoryABI'
+]
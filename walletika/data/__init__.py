@@ -4,3 +4,7 @@ from . import tokens
 from . import transactions
 from . import addressesbook
 from . import stakecontracts
+from . import stakefeeds
+from . import contractcalls
+from . import checkpoints
+from . import wnsregistry
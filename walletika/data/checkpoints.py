@@ -0,0 +1,9 @@
+from . import loader
+
+
+db = loader.loader(file_name='checkpoints')
+
+if db.count_column() == 0:
+    db.create_table(['rpc', 'key', 'block'])
+
+__all__ = ['db']
@@ -0,0 +1,9 @@
+from . import loader
+
+
+db = loader.loader(file_name='contractcalls')
+
+if db.count_column() == 0:
+    db.create_table(['chainID', 'contract', 'selector', 'result'])
+
+__all__ = ['db']
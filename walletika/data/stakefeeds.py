@@ -0,0 +1,9 @@
+from . import loader
+
+
+db = loader.loader(file_name='stakefeeds')
+
+if db.count_column() == 0:
+    db.create_table(['url', 'etag', 'lastModified'])
+
+__all__ = ['db']
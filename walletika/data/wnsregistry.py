@@ -0,0 +1,9 @@
+from . import loader
+
+
+db = loader.loader(file_name='wnsregistry')
+
+if db.count_column() == 0:
+    db.create_table(['rpc', 'contract', 'kind', 'key', 'value'])
+
+__all__ = ['db']
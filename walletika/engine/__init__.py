@@ -1,7 +1,24 @@
 from . import provider
+from . import batch
+from . import multicall
+from . import rpcpool
+from . import nonce
+from . import metrics
+from . import fees
+from . import callcache
+from . import receipts
+from . import broadcast
+from . import airdrop
+from . import logscanner
+from . import transfers
+from . import portfolio
 from . import network
 from . import wallet
 from . import addressbook
 from . import token
+from . import stakefeed
+from . import stakediscovery
 from . import stake
+from . import wnscache
 from . import wns
+from . import wnsmirror
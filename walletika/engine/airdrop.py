@@ -0,0 +1,91 @@
+from ..tools import interface
+import typing
+
+
+def wei_values(amounts: typing.Union[list, interface.WeiAmountArray]) -> list:
+    """Integer wei of a WeiAmountArray, or of a list of EtherAmount, WeiAmount or int"""
+
+    if isinstance(amounts, interface.WeiAmountArray):
+        return amounts.to_list()
+
+    return [
+        i.to_wei() if isinstance(i, interface.EtherAmount)
+        else i.value() if isinstance(i, interface.WeiAmount)
+        else i
+        for i in amounts
+    ]
+
+
+def plan(
+        engine, method: typing.Callable, count: int, target_gas: int = None, sample: int = 20,
+        margin: float = 0.95
+) -> list:
+    """
+    Split a list based contract function (e.g. transferMultiple) into the fewest transactions
+    whose gas stays under `target_gas`, half of the block gas limit by default
+    `method(start, end)` returns the bound contract function of the rows[start:end], every
+    chunk is built by the engine with the gas estimated here and without nonce, they get
+    sequential nonces when they are sent
+    Returns [{'start': int, 'end': int, 'gas': int, 'transaction': dict}, ...]
+    :exception ValueError
+    """
+
+    if not isinstance(engine.sender, interface.Address):
+        raise ValueError("The sender must not be a zero address")
+
+    web3 = engine.contract.web3
+    if target_gas is None:
+        target_gas = web3.eth.get_block('latest').gasLimit // 2
+
+    def estimate(start: int, end: int) -> tuple:
+        try:
+            return method(start, end).estimateGas({'from': engine.sender.value()}), None
+        except ValueError as error:
+            # Too many rows fail the estimation when the gas exceeds the block gas limit
+            return None, error
+
+    # Fixed and per row gas from a small sample, refined by estimating every chunk
+    single, error = estimate(0, 1)
+    if error:
+        raise error
+
+    per_row = single
+    sample = min(sample, count)
+    if sample > 1:
+        multi, error = estimate(0, sample)
+        if error:
+            raise error
+        per_row = max((multi - single) / (sample - 1), 1)
+    base = max(single - per_row, 0)
+
+    result = []
+    start = 0
+
+    while start < count:
+        end = min(count, start + max(1, int((target_gas - base) / per_row * margin)))
+
+        while True:
+            gas, error = estimate(start, end)
+            if gas is not None and gas <= target_gas:
+                break
+
+            if end - start == 1:
+                raise error or ValueError("One row needs {} gas, more than {}".format(gas, target_gas))
+
+            if gas is None:
+                end = start + (end - start) // 2
+            else:
+                end = start + max(1, int((end - start) * target_gas / gas * margin))
+
+        result.append({
+            'start': start,
+            'end': end,
+            'gas': gas,
+            'transaction': engine._build_transaction(method(start, end), gas=gas)
+        })
+        start = end
+
+    return result
+
+
+__all__ = ['wei_values', 'plan']
@@ -0,0 +1,173 @@
+from ..tools import interface
+from web3 import datastructures
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.method_formatters import PYTHONIC_RESULT_FORMATTERS
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from hexbytes import HexBytes
+import itertools
+import typing
+
+
+_requestIDs = itertools.count()
+
+
+def encode_call(method) -> dict:
+    """Build the `eth_call` transaction of a bound contract function"""
+
+    return {
+        'to': method.address,
+        'data': method._encode_transaction_data()
+    }
+
+
+def decode_call(method, return_data: typing.Union[str, bytes]) -> typing.Any:
+    """Decode the `eth_call` output of a bound contract function like `.call()` does"""
+
+    output_types = get_abi_output_types(method.abi)
+    output_data = method.web3.codec.decode_abi(output_types, HexBytes(return_data))
+    normalized_data = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, output_data)
+
+    if len(normalized_data) == 1:
+        return normalized_data[0]
+
+    return normalized_data
+
+
+class Batch(object):
+    """
+    Queue JSON-RPC calls and send them as batch arrays
+    The results are available in `results` by the queued order after flushing
+    """
+
+    def __init__(self, provider, size: int = 100):
+        self.__provider = provider
+        self.__size = size
+        self.__queue = []
+
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self.__queue)
+
+    def request(
+            self, method: str, params: list, formatter: typing.Callable = None, allow_failure: bool = False
+    ) -> int:
+        """
+        Queue a raw JSON-RPC call, returns its index in the results
+        The result of a failed call which allows failure is None
+        """
+
+        self.__queue.append((method, params, formatter, allow_failure))
+        # The results of the earlier flushes come first
+        return len(self.results) + len(self.__queue) - 1
+
+    def balance_of(self, address: interface.Address) -> int:
+        return self.request(
+            'eth_getBalance', [address.value(), 'latest'],
+            lambda value: interface.WeiAmount(value=int(value, 16), decimals=18)
+        )
+
+    def block_number(self) -> int:
+        return self.request('eth_blockNumber', [], lambda value: int(value, 16))
+
+    def get_block(self, block_identifier: typing.Union[int, str] = 'latest') -> int:
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+
+        return self.request(
+            'eth_getBlockByNumber', [block_identifier, False],
+            self.__attribute_dict('eth_getBlockByNumber')
+        )
+
+    def get_transaction(self, transaction_hash: interface.TXHash, allow_failure: bool = False) -> int:
+        return self.request(
+            'eth_getTransactionByHash', [transaction_hash.value()],
+            self.__attribute_dict('eth_getTransactionByHash'), allow_failure=allow_failure
+        )
+
+    def get_transaction_receipt(self, transaction_hash: interface.TXHash, allow_failure: bool = False) -> int:
+        return self.request(
+            'eth_getTransactionReceipt', [transaction_hash.value()],
+            self.__attribute_dict('eth_getTransactionReceipt'), allow_failure=allow_failure
+        )
+
+    def call(self, method, formatter: typing.Callable = None) -> int:
+        """Queue a bound contract function, e.g. `contract.functions.balanceOf(address)`"""
+
+        def decoder(value: str) -> typing.Any:
+            result = decode_call(method, value)
+            if formatter:
+                result = formatter(result)
+
+            return result
+
+        return self.request('eth_call', [encode_call(method), 'latest'], decoder)
+
+    def flush(self) -> list:
+        """
+        Send all queued calls, `size` calls per HTTP request, returns the results of this flush
+        The results of the chunks which were sent before an error are kept in `results`
+        :exception ValueError: when any call which does not allow failure returns an error
+        """
+
+        queue, self.__queue = self.__queue, []
+        results = []
+
+        for offset in range(0, len(queue), self.__size):
+            chunk = queue[offset:offset + self.__size]
+            payload = []
+
+            for method, params, _, _ in chunk:
+                payload.append({
+                    'jsonrpc': '2.0', 'method': method, 'params': params, 'id': next(_requestIDs)
+                })
+
+            responses = self.__provider.make_batch_request(payload)
+            if isinstance(responses, dict):
+                # The whole batch was rejected
+                raise ValueError(responses.get('error', responses))
+
+            # Batch responses may come back in any order
+            responses = {response.get('id'): response for response in responses}
+            values = []
+
+            for request, (_, _, formatter, allow_failure) in zip(payload, chunk):
+                response = responses.get(request['id'], {})
+                if 'result' not in response:
+                    if allow_failure:
+                        values.append(None)
+                        continue
+                    raise ValueError(response.get('error', "Missing batch response"))
+
+                value = response['result']
+                if formatter:
+                    value = formatter(value)
+
+                values.append(value)
+
+            results.extend(values)
+            self.results.extend(values)
+
+        return results
+
+    @staticmethod
+    def __attribute_dict(method: str) -> typing.Callable:
+        formatter = PYTHONIC_RESULT_FORMATTERS[method]
+
+        def wrapper(value: typing.Optional[dict]) -> datastructures.AttributeDict:
+            if value is None:
+                return datastructures.AttributeDict(dict())
+
+            return datastructures.AttributeDict.recursive(formatter(value))
+
+        return wrapper
+
+
+__all__ = ['encode_call', 'decode_call', 'Batch']
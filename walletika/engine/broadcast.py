@@ -0,0 +1,138 @@
+from .provider import MainProvider, Metadata, _unsent
+from .nonce import NonceManager
+from ..tools import interface
+from eth_account import Account
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import typing
+import itertools
+
+
+# Fewer transactions than this are signed in the current process, a pool costs more
+MIN_POOL_SIGNING = 32
+
+
+def _sign(tx_data: dict, private_key: str) -> tuple:
+    """Runs in the signing processes, returns (raw transaction, tx hash, error message)"""
+
+    try:
+        signed_txn = Account.sign_transaction(tx_data, private_key)
+    except Exception as error:
+        return None, None, '{}: {}'.format(type(error).__name__, error)
+
+    return '0x' + bytes(signed_txn.rawTransaction).hex(), '0x' + bytes(signed_txn.hash).hex(), None
+
+
+def sign_transactions(transactions: list, private_keys: list, processes: int = None) -> list:
+    """Sign in a process pool, returns (raw transaction, tx hash, error message) per transaction"""
+
+    if processes == 1 or len(transactions) < MIN_POOL_SIGNING:
+        return [_sign(tx_data, key) for tx_data, key in zip(transactions, private_keys)]
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(
+            _sign, transactions, private_keys,
+            chunksize=max(1, len(transactions) // (processes * 4))
+        ))
+
+
+def send_transactions(
+        transactions: list, private_keys: typing.Union[str, dict], provider=MainProvider,
+        processes: int = None, concurrency: int = 4, batch_size: int = 50
+) -> list:
+    """
+    Sign and broadcast many built transactions, a transaction without nonce gets the next
+    nonce of its sender in the list order
+    Transactions are signed in `processes` processes, then sent as JSON-RPC batches of
+    `batch_size` raw transactions by nonce, up to `concurrency` senders at the same time
+    `private_keys` is the key of the only sender or {sender address: private key}
+    Returns interface.TXHash or the error of every transaction, in the list order
+    A failed transaction loses the nonce which was assigned here, like send_transaction
+    """
+
+    results = [None] * len(transactions)
+    keys = []
+    assigned = set()
+
+    for index, tx_data in enumerate(transactions):
+        sender = interface.Address(tx_data[Metadata.FROM])
+        key = private_keys if isinstance(private_keys, str) else private_keys.get(sender.value())
+        if key is None:
+            results[index] = ValueError("No private key of {}".format(sender.value()))
+
+        tx_data.setdefault(Metadata.CHAIN_ID, provider.interface.chainID)
+        if Metadata.NONCE not in tx_data and results[index] is None:
+            tx_data[Metadata.NONCE] = provider.next_nonce(sender)
+            assigned.add(index)
+        keys.append(key)
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    signed = sign_transactions(
+        [transactions[i] for i in pending], [keys[i] for i in pending], processes=processes
+    )
+
+    senders = {}
+    for index, (raw_transaction, tx_hash, error) in zip(pending, signed):
+        if error:
+            results[index] = ValueError(error)
+        else:
+            tx_data = transactions[index]
+            senders.setdefault(tx_data[Metadata.FROM].lower(), []).append(
+                (tx_data[Metadata.NONCE], index, raw_transaction, tx_hash)
+            )
+
+    def broadcast(chunk: list) -> list:
+        request_ids = itertools.count()
+        payload = [
+            {
+                'jsonrpc': '2.0',
+                'method': 'eth_sendRawTransaction',
+                'params': [raw_transaction],
+                'id': next(request_ids)
+            } for _, _, raw_transaction, _ in chunk
+        ]
+
+        try:
+            response = provider.make_batch_request(payload)
+        except Exception as error:
+            return [error] * len(chunk)
+
+        if isinstance(response, dict):
+            # The whole batch is rejected
+            return [ValueError(response.get('error', response))] * len(chunk)
+
+        responses = {i.get('id'): i for i in response}
+        return [
+            ValueError(responses.get(request_id, {}).get('error', "No response"))
+            if 'result' not in responses.get(request_id, {}) else None
+            for request_id in range(len(chunk))
+        ]
+
+    def broadcast_sender(sender_transactions: list):
+        # Nodes may reject a nonce ahead of the pending ones, so every sender is sent in order
+        sender_transactions.sort()
+        for i in range(0, len(sender_transactions), batch_size):
+            chunk = sender_transactions[i:i + batch_size]
+            for (_, index, _, tx_hash), error in zip(chunk, broadcast(chunk)):
+                results[index] = error or interface.TXHash(tx_hash)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(broadcast_sender, senders.values()))
+
+    for index, (tx_data, result) in enumerate(zip(transactions, results)):
+        if Metadata.NONCE not in tx_data:
+            continue
+
+        sender = interface.Address(tx_data[Metadata.FROM])
+        if isinstance(result, interface.TXHash):
+            NonceManager.sent(provider.interface.chainID, sender, tx_data[Metadata.NONCE])
+        else:
+            # The assigned nonce is handed out again and removed, so a retry of the same dict
+            # takes a new one
+            _unsent(provider.interface.chainID, tx_data, sender, index in assigned, result)
+
+    return results
+
+
+__all__ = ['MIN_POOL_SIGNING', 'sign_transactions', 'send_transactions']
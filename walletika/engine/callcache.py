@@ -0,0 +1,111 @@
+from .provider import MainProvider, AsyncMainProvider
+from .batch import encode_call
+from ..data import contractcalls
+import typing
+import threading
+
+
+class _CallCache(object):
+    """
+    Results of contract calls which never change, like token name and decimals
+    Keyed by (chainID, contract, calldata) and stored on disk so they survive restarts
+    The file is dumped once per new result, or once at the end of a `deferred()` block
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__results = None
+        self.__deferred = 0
+        self.__dirty = False
+
+    def __enter__(self):
+        with self.__lock:
+            self.__deferred += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self.__lock:
+            self.__deferred -= 1
+            if self.__deferred == 0 and self.__dirty:
+                self.__dirty = False
+                contractcalls.db.dump()
+
+    def deferred(self):
+        """`with CallCache.deferred():` stores the new results of the block in one dump"""
+
+        return self
+
+    def call(self, method, provider=MainProvider) -> typing.Any:
+        key = self.key(method, provider)
+        found, result = self.get(key)
+
+        if not found:
+            result = method.call()
+            self.set(key, result)
+
+        return result
+
+    async def async_call(self, method, provider=AsyncMainProvider) -> typing.Any:
+        key = self.key(method, provider)
+        found, result = self.get(key)
+
+        if not found:
+            result = await provider.call(method)
+            self.set(key, result)
+
+        return result
+
+    def get(self, key: tuple) -> tuple:
+        """Returns (found, result)"""
+
+        with self.__lock:
+            self.__load()
+            if key in self.__results:
+                return True, self.__results[key]
+
+        return False, None
+
+    def set(self, key: tuple, result: typing.Any):
+        chain_id, contract, selector = key
+
+        with self.__lock:
+            self.__load()
+            if key in self.__results:
+                return
+
+            self.__results[key] = result
+            contractcalls.db.insert(
+                row_index=contractcalls.db.count_row(),
+                chainID=chain_id, contract=contract, selector=selector, result=result
+            )
+
+            if self.__deferred:
+                self.__dirty = True
+            else:
+                contractcalls.db.dump()
+
+    def clear(self):
+        with self.__lock:
+            self.__results = {}
+            contractcalls.db.clear()
+            contractcalls.db.dump()
+
+    def __load(self):
+        if self.__results is None:
+            self.__results = {
+                (row['chainID'], row['contract'], row['selector']): row['result']
+                for _, row in contractcalls.db.select()
+            }
+
+    @staticmethod
+    def key(method, provider=MainProvider) -> tuple:
+        """
+        (chainID, contract, calldata) of a bound contract function, the calldata of a function
+        without arguments is its selector
+        """
+
+        return provider.interface.chainID, method.address, encode_call(method)['data']
+
+
+CallCache = _CallCache()
+__all__ = ['CallCache']
@@ -0,0 +1,177 @@
+import time
+import typing
+import threading
+import numpy
+
+
+class FeeCache(object):
+    """
+    Fee values keyed on the latest block number, all transactions which are built
+    within the same block share one snapshot
+    The latest block number itself is probed at most once per `refresh_interval` seconds
+    """
+
+    def __init__(self, web3, refresh_interval: float = 1.0):
+        self.web3 = web3
+        self.refreshInterval = refresh_interval
+
+        self.__lock = threading.Lock()
+        self.__blockNumber = None
+        self.__checkedAt = 0.0
+        self.__values = {
+            # name: value of the current block
+        }
+
+    def block_number(self) -> int:
+        with self.__lock:
+            return self.__latest_block()
+
+    def get(self, name: str, fetch: typing.Callable) -> typing.Any:
+        """Value of `name` for the latest block, calls `fetch` once per block"""
+
+        with self.__lock:
+            self.__latest_block()
+
+            if name not in self.__values:
+                self.__values[name] = fetch()
+
+            return self.__values[name]
+
+    def clear(self):
+        with self.__lock:
+            self.__blockNumber = None
+            self.__values.clear()
+
+    def __latest_block(self) -> int:
+        now = time.monotonic()
+
+        if self.__blockNumber is None or now - self.__checkedAt >= self.refreshInterval:
+            block_number = self.web3.eth.block_number
+            if block_number != self.__blockNumber:
+                self.__blockNumber = block_number
+                self.__values.clear()
+            self.__checkedAt = now
+
+        return self.__blockNumber
+
+
+class FeeOracle(object):
+    """
+    Rolling window of per-block base fee and priority fee percentiles from `eth_feeHistory`
+    Only the blocks which are new since the last update are fetched, `max_request_blocks`
+    blocks per request
+    """
+
+    def __init__(
+            self, web3, window: int = 200, reward_percentiles: tuple = (25, 50, 75),
+            max_request_blocks: int = 128
+    ):
+        if window < 1:
+            raise ValueError("Window must be at least one block")
+
+        self.web3 = web3
+        self.window = window
+        self.rewardPercentiles = list(reward_percentiles)
+        self.maxRequestBlocks = max_request_blocks
+
+        self.__lock = threading.Lock()
+        self.__latestBlock = None
+        self.__nextBaseFee = 0
+        self.__baseFees = numpy.zeros(0, dtype=numpy.float64)
+        self.__gasUsedRatios = numpy.zeros(0, dtype=numpy.float64)
+        self.__rewards = numpy.zeros((0, len(self.rewardPercentiles)), dtype=numpy.float64)
+
+    def __len__(self) -> int:
+        return len(self.__baseFees)
+
+    def resize(self, window: int):
+        if window < 1:
+            raise ValueError("Window must be at least one block")
+
+        with self.__lock:
+            if window > self.window:
+                # Older blocks are missing, refill the whole window on the next update
+                self.__latestBlock = None
+            self.window = window
+            self.__trim()
+
+    def update(self) -> int:
+        """Fetch the blocks after the last update, returns the latest block number"""
+
+        with self.__lock:
+            latest_block = self.web3.eth.block_number
+
+            if self.__latestBlock is None or latest_block < self.__latestBlock:
+                first_block = latest_block - self.window + 1
+                self.__clear()
+            else:
+                first_block = max(self.__latestBlock + 1, latest_block - self.window + 1)
+
+            first_block = max(first_block, 0)
+            while first_block <= latest_block:
+                block_count = min(self.maxRequestBlocks, latest_block - first_block + 1)
+                self.__append(
+                    self.web3.eth.fee_history(
+                        block_count, first_block + block_count - 1, self.rewardPercentiles
+                    )
+                )
+                first_block += block_count
+
+            self.__latestBlock = latest_block
+            self.__trim()
+
+            return latest_block
+
+    def next_base_fee(self) -> int:
+        """Base fee of the pending block"""
+
+        return self.__nextBaseFee
+
+    def base_fees(self) -> numpy.ndarray:
+        return self.__baseFees.copy()
+
+    def gas_used_ratios(self) -> numpy.ndarray:
+        return self.__gasUsedRatios.copy()
+
+    def priority_fees(self, percentile: float = 90) -> list:
+        """
+        `percentile` of every reward percentile column over the window, blocks without
+        transactions (zero rewards) are ignored
+        """
+
+        with self.__lock:
+            rewards = numpy.where(self.__rewards > 0, self.__rewards, numpy.nan)
+
+        if not rewards.size or numpy.isnan(rewards).all(axis=0).any():
+            raise ValueError("Fee history has no priority fees")
+
+        return [int(i) for i in numpy.nanpercentile(rewards, percentile, axis=0)]
+
+    def __append(self, fee_history: dict):
+        block_count = len(fee_history.gasUsedRatio)
+        reward = fee_history.get('reward') or [[0] * len(self.rewardPercentiles)] * block_count
+
+        self.__baseFees = numpy.concatenate(
+            (self.__baseFees, numpy.array(fee_history.baseFeePerGas[:block_count], dtype=numpy.float64))
+        )
+        self.__gasUsedRatios = numpy.concatenate(
+            (self.__gasUsedRatios, numpy.array(fee_history.gasUsedRatio, dtype=numpy.float64))
+        )
+        self.__rewards = numpy.concatenate(
+            (self.__rewards, numpy.array(reward, dtype=numpy.float64).reshape(block_count, -1))
+        )
+        # The last base fee of the history belongs to the block after the newest one
+        self.__nextBaseFee = fee_history.baseFeePerGas[-1]
+
+    def __trim(self):
+        self.__baseFees = self.__baseFees[-self.window:]
+        self.__gasUsedRatios = self.__gasUsedRatios[-self.window:]
+        self.__rewards = self.__rewards[-self.window:]
+
+    def __clear(self):
+        self.__baseFees = self.__baseFees[:0]
+        self.__gasUsedRatios = self.__gasUsedRatios[:0]
+        self.__rewards = self.__rewards[:0]
+
+
+__all__ = ['FeeCache', 'FeeOracle']
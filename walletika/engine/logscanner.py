@@ -0,0 +1,104 @@
+from .provider import MainProvider
+from ..data import checkpoints
+from concurrent.futures import ThreadPoolExecutor
+import typing
+import requests
+import threading
+
+
+# Provider errors which mean the block range has too many logs to answer at once
+RANGE_ERRORS = (
+    '-32005', 'more than', 'too many', 'limit exceeded', 'range too large', 'range is too large',
+    'block range', 'response size', 'query timeout', 'exceed'
+)
+
+
+def get_checkpoint(rpc: str, key: str) -> typing.Optional[int]:
+    """The latest scanned block of `key` on the network, None when it was never scanned"""
+
+    for _, row in checkpoints.db.select(rpc=rpc, key=key):
+        return row['block']
+
+    return None
+
+
+def set_checkpoint(rpc: str, key: str, block: int, dump: bool = True):
+    for index, _ in checkpoints.db.select(rpc=rpc, key=key):
+        checkpoints.db.remove_row(index)
+        break
+
+    checkpoints.db.insert(row_index=checkpoints.db.count_row(), rpc=rpc, key=key, block=block)
+    if dump:
+        checkpoints.db.dump()
+
+
+def is_range_error(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+
+    message = str(error).lower()
+    return any(i in message for i in RANGE_ERRORS)
+
+
+class LogScanner(object):
+    """
+    `eth_getLogs` over block ranges of `chunk` blocks, `concurrency` ranges at the same time
+    A range which the provider refuses for its size is split in halves, and later ranges
+    use the smaller size
+    """
+
+    def __init__(self, provider=MainProvider, chunk: int = 2000, concurrency: int = 4):
+        self.provider = provider
+        self.chunk = chunk
+        self.concurrency = concurrency
+
+        self.__lock = threading.Lock()
+
+    def get_logs(self, query: dict, from_block: int, to_block: int) -> list:
+        """:exception ValueError"""
+
+        try:
+            return list(self.provider.web3.eth.get_logs(
+                dict(query, fromBlock=from_block, toBlock=to_block)
+            ))
+        except (ValueError, requests.exceptions.Timeout) as error:
+            if from_block >= to_block or not is_range_error(error):
+                raise
+
+        middle = (from_block + to_block) // 2
+        with self.__lock:
+            self.chunk = max(1, min(self.chunk, middle - from_block + 1))
+
+        return self.get_logs(query, from_block, middle) + self.get_logs(query, middle + 1, to_block)
+
+    def scan(self, queries: list, from_block: int, to_block: int) -> typing.Iterator[tuple]:
+        """
+        Yields (from block, to block, logs) of consecutive ranges in block order, the logs of
+        all `queries` ({'address': ..., 'topics': [...]}) are merged by block and log index
+        """
+
+        def fetch(block_range: tuple) -> list:
+            logs = {}
+            for query in queries:
+                for log in self.get_logs(query, *block_range):
+                    logs[(log['transactionHash'], log['logIndex'])] = log
+
+            return sorted(logs.values(), key=lambda i: (i['blockNumber'], i['logIndex']))
+
+        cursor = from_block
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+            while cursor <= to_block:
+                ranges = []
+                for _ in range(self.concurrency):
+                    if cursor > to_block:
+                        break
+                    end = min(to_block, cursor + self.chunk - 1)
+                    ranges.append((cursor, end))
+                    cursor = end + 1
+
+                for block_range, logs in zip(ranges, executor.map(fetch, ranges)):
+                    yield block_range[0], block_range[1], logs
+
+
+__all__ = ['RANGE_ERRORS', 'get_checkpoint', 'set_checkpoint', 'is_range_error', 'LogScanner']
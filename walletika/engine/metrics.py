@@ -0,0 +1,136 @@
+import bisect
+import threading
+
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket is unbounded
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RPCBudgetError(AssertionError):
+    pass
+
+
+class MethodStats(object):
+    def __init__(self):
+        self.count = 0
+        self.batched = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requestBytes = 0
+        self.responseBytes = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'batched': self.batched,
+            'errors': self.errors,
+            'latency': self.latency,
+            'histogram': dict(zip(LATENCY_BUCKETS + (float('inf'),), self.histogram)),
+            'requestBytes': self.requestBytes,
+            'responseBytes': self.responseBytes
+        }
+
+
+class _RPCMetrics(object):
+    """
+    Per JSON-RPC method counts, latency histograms and payload sizes of the provider requests
+    Methods sent inside a JSON-RPC batch are counted as `batched`, the batch request itself
+    is recorded under the `batch` method
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__stats = {
+            # method: MethodStats
+        }
+        self.__budgets = []
+
+    def request(self, methods: list):
+        """Called before sending one HTTP request, raises when an active budget is exceeded"""
+
+        with self.__lock:
+            for budget in self.__budgets:
+                budget.spend(methods)
+
+    def record(
+            self, methods: list, latency: float, request_bytes: int, response_bytes: int,
+            failed: bool = False
+    ):
+        with self.__lock:
+            if len(methods) > 1:
+                for method in methods:
+                    self.__get(method).batched += 1
+                methods = ['batch']
+
+            for method in methods:
+                stats = self.__get(method)
+                stats.count += 1
+                stats.errors += int(failed)
+                stats.latency += latency
+                stats.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+                stats.requestBytes += request_bytes
+                stats.responseBytes += response_bytes
+
+    def get(self, method: str) -> dict:
+        with self.__lock:
+            return self.__get(method).to_dict()
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {method: stats.to_dict() for method, stats in self.__stats.items()}
+
+    def reset(self):
+        with self.__lock:
+            self.__stats.clear()
+
+    def add_budget(self, budget):
+        with self.__lock:
+            self.__budgets.append(budget)
+
+    def remove_budget(self, budget):
+        with self.__lock:
+            self.__budgets.remove(budget)
+
+    def __get(self, method: str) -> MethodStats:
+        stats = self.__stats.get(method)
+        if stats is None:
+            stats = self.__stats[method] = MethodStats()
+        return stats
+
+
+class rpc_budget(object):
+    """
+    Fail when the block sends more than `max_requests` HTTP requests to the node
+    A JSON-RPC batch is one request, `methods` limits the counting to these methods
+    :exception RPCBudgetError
+    """
+
+    def __init__(self, max_requests: int, methods: list = None):
+        self.maxRequests = max_requests
+        self.methods = methods
+        self.requests = 0
+
+    def __enter__(self):
+        self.requests = 0
+        RPCMetrics.add_budget(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        RPCMetrics.remove_budget(self)
+
+    def spend(self, methods: list):
+        if self.methods is not None and not any(i in self.methods for i in methods):
+            return
+
+        self.requests += 1
+        if self.requests > self.maxRequests:
+            raise RPCBudgetError(
+                "RPC budget exceeded: request {} of {} allowed ({})".format(
+                    self.requests, self.maxRequests, ', '.join(methods)
+                )
+            )
+
+
+RPCMetrics = _RPCMetrics()
+__all__ = ['LATENCY_BUCKETS', 'RPCBudgetError', 'RPCMetrics', 'rpc_budget']
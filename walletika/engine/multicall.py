@@ -0,0 +1,178 @@
+from .provider import MainProvider
+from .batch import decode_call
+from ..abis import multicallABI
+from ..tools import interface
+from web3 import exceptions
+from eth_abi.exceptions import DecodingError
+from hexbytes import HexBytes
+import typing
+
+
+# Multicall3 is deployed at the same address on most of EVM networks
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+
+_deployments = {
+    # (rpc, contract): bool
+}
+
+
+class Multicall(object):
+    """
+    Aggregate view calls of many contracts into one `eth_call` by Multicall3 `aggregate3`
+    Falls back to sequential calls when the network has no Multicall3 deployment
+    """
+
+    def __init__(self, provider=MainProvider, contract: interface.Address = None, size: int = 500):
+        self.__provider = provider
+        self.__size = size
+        self.__queue = []
+
+        self.contract = provider.web3.eth.contract(
+            address=contract.value() if contract else MULTICALL3_ADDRESS, abi=multicallABI
+        )
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self) -> int:
+        return len(self.__queue)
+
+    def add(
+            self, method, formatter: typing.Callable = None,
+            allow_failure: bool = True, fallback: typing.Callable = None
+    ) -> int:
+        """
+        Queue a bound contract function, e.g. `contract.functions.balanceOf(address)`
+        The result of a failed call is None when `allow_failure` is enabled
+        `fallback` replaces `method.call` when the network has no Multicall3 deployment
+        """
+
+        def decoder(return_data: bytes) -> typing.Any:
+            try:
+                return decode_call(method, return_data)
+            except DecodingError:
+                # The target has no code or returns nothing
+                raise exceptions.BadFunctionCallOutput(
+                    "Could not decode contract function call to {}".format(method.fn_name)
+                )
+
+        return self.add_raw(
+            method.address, HexBytes(method._encode_transaction_data()), decoder,
+            formatter=formatter, allow_failure=allow_failure, fallback=fallback or method.call
+        )
+
+    def add_raw(
+            self, target: str, call_data: bytes, decoder: typing.Callable, fallback: typing.Callable,
+            formatter: typing.Callable = None, allow_failure: bool = True
+    ) -> int:
+        """
+        Queue encoded call data, cheaper than building contract functions for thousands of calls
+        `decoder(return data)` raises exceptions.BadFunctionCallOutput for an unexpected output
+        """
+
+        self.__queue.append((target, call_data, decoder, formatter, allow_failure, fallback))
+        return len(self.__queue) - 1
+
+    def balance_of(self, address: interface.Address) -> int:
+        """Queue the native coin balance of address"""
+
+        return self.add(
+            self.contract.functions.getEthBalance(address.value()),
+            formatter=lambda value: interface.WeiAmount(value=value, decimals=18),
+            allow_failure=False,
+            fallback=lambda: self.__provider.web3.eth.get_balance(address.value())
+        )
+
+    def block_number(self) -> int:
+        return self.add(
+            self.contract.functions.getBlockNumber(),
+            allow_failure=False,
+            fallback=lambda: self.__provider.web3.eth.block_number
+        )
+
+    def is_supported(self) -> bool:
+        key = (self.__provider.interface.rpc, self.contract.address)
+
+        if key not in _deployments:
+            _deployments[key] = len(self.__provider.web3.eth.get_code(self.contract.address)) > 0
+
+        return _deployments[key]
+
+    def execute(self) -> list:
+        """
+        Resolve all queued calls, `size` calls per `eth_call`, many `eth_call` in one batch
+        :exception web3.exceptions.ContractLogicError: when a call which does not allow failure reverts
+        :exception ValueError: the same, when the calls need more than one `eth_call`
+        """
+
+        queue, self.__queue = self.__queue, []
+
+        if self.is_supported():
+            results = self.__aggregate(queue)
+        else:
+            results = self.__sequential(queue)
+
+        self.results.extend(results)
+        return results
+
+    def __aggregate(self, queue: list) -> list:
+        results = []
+        chunks = [queue[offset:offset + self.__size] for offset in range(0, len(queue), self.__size)]
+        methods = [
+            self.contract.functions.aggregate3([
+                (target, allow_failure, call_data)
+                for target, call_data, _, _, allow_failure, _ in chunk
+            ]) for chunk in chunks
+        ]
+
+        if len(methods) == 1:
+            all_responses = [methods[0].call()]
+        else:
+            # Many chunks go together as one JSON-RPC batch
+            with self.__provider.batch() as batch:
+                for method in methods:
+                    batch.call(method)
+            all_responses = batch.results
+
+        for chunk, responses in zip(chunks, all_responses):
+            for call, (success, return_data) in zip(chunk, responses):
+                _, _, decoder, formatter, allow_failure, _ = call
+                value = None
+
+                if success:
+                    try:
+                        value = decoder(return_data)
+                    except exceptions.BadFunctionCallOutput:
+                        if not allow_failure:
+                            raise
+                        success = False
+
+                results.append(formatter(value) if success and formatter else value)
+
+        return results
+
+    @staticmethod
+    def __sequential(queue: list) -> list:
+        results = []
+
+        for _, _, _, formatter, allow_failure, fallback in queue:
+            try:
+                value = fallback()
+            except (exceptions.ContractLogicError, exceptions.BadFunctionCallOutput, ValueError):
+                if not allow_failure:
+                    raise
+                results.append(None)
+                continue
+
+            results.append(formatter(value) if formatter else value)
+
+        return results
+
+
+__all__ = ['MULTICALL3_ADDRESS', 'Multicall']
@@ -6,14 +6,16 @@ def get_all() -> list:
     return [i['interface'] for _, i in networks.db.select()]
 
 
-def add_new(rpc: str, name: str, chain_id: int, symbol: str, explorer: str) -> bool:
+def add_new(
+        rpc: str, name: str, chain_id: int, symbol: str, explorer: str, backup_rpcs: list = None
+) -> bool:
     """
-    Add a new network
+    Add a new network, `backup_rpcs` are used when `rpc` is slow or down
     :exception aesdatabase.error.RowItemError
     """
 
     network_interface = interface.Network(
-        rpc=rpc, name=name, chain_id=chain_id, symbol=symbol, explorer=explorer
+        rpc=rpc, name=name, chain_id=chain_id, symbol=symbol, explorer=explorer, backup_rpcs=backup_rpcs
     )
     networks.db.insert(row_index=networks.db.count_row(), rpc=rpc, interface=network_interface)
     networks.db.dump()
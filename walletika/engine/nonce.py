@@ -0,0 +1,108 @@
+from ..tools import interface
+import time
+import threading
+
+
+# Node error messages which mean the local nonce is behind the network
+NONCE_ERRORS = (
+    'nonce too low',
+    'invalid nonce',
+    'invalid transaction nonce',
+    'nonce has already been used',
+    'replacement transaction underpriced',
+    'transaction already imported'
+)
+
+
+class _NonceManager(object):
+    """
+    Hand out sequential nonces per (chain, sender) locally
+    Every sender is seeded once from its `pending` transaction count, a nonce which
+    is handed out but not sent within `lease` seconds is handed out again to avoid gaps
+    """
+
+    def __init__(self, lease: int = 60):
+        self.lease = lease
+
+        self.__lock = threading.Lock()
+        self.__nonces = {
+            # (chainID, address): next nonce
+        }
+        self.__unsent = {
+            # (chainID, address): {nonce: handed out time}
+        }
+
+    def next(self, web3, chain_id: int, address: interface.Address) -> int:
+        key = (chain_id, address.value())
+
+        with self.__lock:
+            if key not in self.__nonces:
+                self.__seed(key, web3.eth.get_transaction_count(address.value(), 'pending'))
+
+            return self.__take(key)
+
+    async def async_next(self, web3, chain_id: int, address: interface.Address) -> int:
+        key = (chain_id, address.value())
+
+        if key not in self.__nonces:
+            count = await web3.eth.get_transaction_count(address.value(), 'pending')
+            with self.__lock:
+                # Another coroutine may have seeded it meanwhile
+                if key not in self.__nonces:
+                    self.__seed(key, count)
+
+        with self.__lock:
+            return self.__take(key)
+
+    def sent(self, chain_id: int, address: interface.Address, nonce: int):
+        """Mark the nonce as broadcasted, so it will never be handed out again"""
+
+        with self.__lock:
+            self.__unsent.get((chain_id, address.value()), {}).pop(nonce, None)
+
+    def release(self, chain_id: int, address: interface.Address, nonce: int):
+        """Give back a nonce of a transaction which will not be sent"""
+
+        with self.__lock:
+            unsent = self.__unsent.get((chain_id, address.value()))
+            if unsent is not None and nonce in unsent:
+                unsent[nonce] = 0.0
+
+    def resync(self, chain_id: int, address: interface.Address):
+        """Forget the local nonce, the next one is seeded from the network again"""
+
+        with self.__lock:
+            self.__nonces.pop((chain_id, address.value()), None)
+            self.__unsent.pop((chain_id, address.value()), None)
+
+    def reset(self):
+        with self.__lock:
+            self.__nonces.clear()
+            self.__unsent.clear()
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return any(i in message for i in NONCE_ERRORS)
+
+    def __seed(self, key: tuple, count: int):
+        self.__nonces[key] = count
+        self.__unsent[key] = {}
+
+    def __take(self, key: tuple) -> int:
+        now = time.monotonic()
+        unsent = self.__unsent[key]
+        expired = [nonce for nonce, handed_out in unsent.items() if now - handed_out >= self.lease]
+
+        if expired:
+            nonce = min(expired)
+        else:
+            nonce = self.__nonces[key]
+            self.__nonces[key] = nonce + 1
+
+        unsent[nonce] = now
+        return nonce
+
+
+NonceManager = _NonceManager()
+__all__ = ['NONCE_ERRORS', 'NonceManager']
@@ -0,0 +1,152 @@
+from .provider import MainProvider
+from .multicall import Multicall
+from ..tools import interface
+from web3 import exceptions
+from eth_abi import decode_abi
+from eth_abi.exceptions import DecodingError
+from hexbytes import HexBytes
+import numpy
+import typing
+
+
+# Selectors of balanceOf(address) and Multicall3 getEthBalance(address)
+BALANCE_OF_SELECTOR = bytes.fromhex('70a08231')
+GET_ETH_BALANCE_SELECTOR = bytes.fromhex('4d2301cc')
+
+
+def _call_data(selector: bytes, address: interface.Address) -> bytes:
+    return selector + bytes(12) + bytes.fromhex(address.value()[2:])
+
+
+def _uint(return_data: bytes) -> int:
+    """The uint256 output of balanceOf and getEthBalance"""
+
+    try:
+        return decode_abi(['uint256'], return_data)[0]
+    except DecodingError:
+        raise exceptions.BadFunctionCallOutput("Could not decode the balance")
+
+
+def _hex_uint(value: str) -> typing.Optional[int]:
+    """`_uint` of an `eth_call` hex result, None when it could not be decoded"""
+
+    try:
+        return _uint(HexBytes(value))
+    except exceptions.BadFunctionCallOutput:
+        return None
+
+
+class Portfolio(object):
+    """
+    Balances of wallets (rows) in assets (columns), the native coin is the `None` asset
+    Balances are kept as one integer array, WeiAmount objects are made only when asked
+    """
+
+    def __init__(
+            self, wallets: list, assets: list, balances: numpy.ndarray, failed: numpy.ndarray,
+            block_number: int
+    ):
+        self.wallets = wallets
+        self.assets = assets
+        self.balances = balances
+        self.failed = failed
+        self.blockNumber = block_number
+
+        self.__walletIndex = {address.value(): index for index, address in enumerate(wallets)}
+        self.__assetIndex = {self.__asset_key(asset): index for index, asset in enumerate(assets)}
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    def decimals(self, asset: typing.Optional[interface.Token]) -> int:
+        return 18 if asset is None else asset.decimals
+
+    def balance_of(
+            self, wallet: interface.Address, asset: interface.Token = None
+    ) -> typing.Optional[interface.WeiAmount]:
+        """None when the balance could not be read"""
+
+        row = self.__walletIndex[wallet.value()]
+        column = self.__assetIndex[self.__asset_key(asset)]
+        if self.failed[row, column]:
+            return None
+
+        return interface.WeiAmount(value=int(self.balances[row, column]), decimals=self.decimals(asset))
+
+    def column(self, asset: interface.Token = None) -> numpy.ndarray:
+        """Balances of all wallets in one asset"""
+
+        return self.balances[:, self.__assetIndex[self.__asset_key(asset)]]
+
+    def amounts(self, asset: interface.Token = None) -> interface.WeiAmountArray:
+        """Balances of all wallets in one asset, failed ones are zero"""
+
+        return interface.WeiAmountArray(self.column(asset), self.decimals(asset))
+
+    def totals(self) -> list:
+        """Total of every asset over all wallets"""
+
+        return [self.amounts(asset).sum() for asset in self.assets]
+
+    def to_ether(self) -> numpy.ndarray:
+        """Float balances, for sorting and charts only"""
+
+        scale = numpy.array([10 ** self.decimals(asset) for asset in self.assets], dtype=object)
+        return (self.balances / scale).astype(numpy.float64)
+
+    @staticmethod
+    def __asset_key(asset: typing.Optional[interface.Token]) -> typing.Optional[str]:
+        return None if asset is None else asset.contract.value()
+
+
+def scan(
+        wallets: list, tokens: list, provider=MainProvider, native: bool = True, size: int = 500
+) -> Portfolio:
+    """
+    Read the balances of N wallets in M tokens (and the native coin) by Multicall3, `size`
+    calls per `eth_call`, or by JSON-RPC batches when the network has no Multicall3
+    """
+
+    assets = ([None] if native else []) + list(tokens)
+    calls = []
+    for wallet in wallets:
+        for asset in assets:
+            if asset is None:
+                calls.append((None, _call_data(GET_ETH_BALANCE_SELECTOR, wallet), wallet))
+            else:
+                calls.append((asset.contract.value(), _call_data(BALANCE_OF_SELECTOR, wallet), wallet))
+
+    multicall = Multicall(provider=provider, size=size)
+
+    if multicall.is_supported():
+        multicall.block_number()
+        for target, call_data, wallet in calls:
+            multicall.add_raw(
+                target or multicall.contract.address, call_data, _uint, fallback=None,
+                allow_failure=target is not None
+            )
+        block_number, *values = multicall.execute()
+    else:
+        with provider.batch(size=min(size, 100)) as batch:
+            batch.block_number()
+            for target, call_data, wallet in calls:
+                if target is None:
+                    batch.request('eth_getBalance', [wallet.value(), 'latest'], lambda value: int(value, 16))
+                else:
+                    batch.request(
+                        'eth_call', [{'to': target, 'data': '0x' + call_data.hex()}, 'latest'],
+                        _hex_uint, allow_failure=True
+                    )
+        block_number, *values = batch.results
+
+    failed = numpy.array([value is None for value in values], dtype=bool).reshape(len(wallets), len(assets))
+    balances = numpy.array(
+        [value or 0 for value in values], dtype=object
+    ).reshape(len(wallets), len(assets))
+
+    return Portfolio(
+        wallets=list(wallets), assets=assets, balances=balances, failed=failed, block_number=block_number
+    )
+
+
+__all__ = ['Portfolio', 'scan']
@@ -1,5 +1,12 @@
 from ..tools import interface
+from .batch import Batch, encode_call, decode_call
+from .rpcpool import RPCPool, AsyncRPCPool
+from .nonce import NonceManager
+from .fees import FeeCache, FeeOracle
 from web3 import Web3, exceptions, datastructures
+from web3.eth import AsyncEth
+from web3.contract import Contract
+import typing
 
 
 class Metadata:
@@ -29,19 +36,38 @@ class EIP1559Metadata:
     PRIORITY_FEE_PER_GAS = 'priorityFeePerGas'
 
 
+def _unsent(chain_id: int, tx_data: dict, sender: interface.Address, assigned: bool, error: Exception):
+    """
+    After a failed send: a nonce error resyncs the sender, another error gives the nonce back
+    A nonce which the send assigned is removed, so sending the same dict again takes a new one
+    """
+
+    if NonceManager.is_nonce_error(error):
+        NonceManager.resync(chain_id, sender)
+    elif assigned:
+        NonceManager.release(chain_id, sender, tx_data[Metadata.NONCE])
+
+    if assigned:
+        del tx_data[Metadata.NONCE]
+
+
 class __Provider(object):
     def __init__(self):
         self.__contract = None
 
         self.interface = None
         self.web3 = None
+        self.fees = None
+        self.feeOracle = None
 
     def connect(self, network_interface: interface.Network) -> bool:
         valid = False
 
         if isinstance(network_interface, interface.Network):
             self.interface = network_interface
-            self.web3 = Web3(Web3.HTTPProvider(network_interface.rpc))
+            self.web3 = Web3(RPCPool(network_interface.endpoints()))
+            self.fees = FeeCache(self.web3)
+            self.feeOracle = FeeOracle(self.web3)
             valid = self.web3.isConnected()
 
         return valid
@@ -49,6 +75,24 @@ class __Provider(object):
     def is_connected(self) -> bool:
         return self.web3.isConnected()
 
+    def batch(self, size: int = 100) -> Batch:
+        """Queue calls to be sent as JSON-RPC batches, `size` calls per HTTP request"""
+
+        return Batch(provider=self, size=size)
+
+    def make_batch_request(self, payload: list) -> list:
+        return self.web3.provider.make_batch_request(payload)
+
+    def gas_price(self) -> int:
+        """Gas price of the latest block, fetched once per block"""
+
+        return self.fees.get(Metadata.GAS_PRICE, lambda: self.web3.eth.gas_price)
+
+    def next_nonce(self, address: interface.Address) -> int:
+        """Next local nonce of address on the connected network, see NonceManager"""
+
+        return NonceManager.next(self.web3, self.interface.chainID, address)
+
     def build_transaction(
             self, from_address: interface.Address, to_address: interface.Address,
             value: interface.EtherAmount, data_bytes: bytes = b''
@@ -58,7 +102,6 @@ class __Provider(object):
             Metadata.TO: to_address.value(),
             Metadata.VALUE: value.to_wei(),
             Metadata.DATA: data_bytes,
-            Metadata.NONCE: self.web3.eth.get_transaction_count(from_address.value()),
             Metadata.CHAIN_ID: self.interface.chainID
         }
 
@@ -71,13 +114,13 @@ class __Provider(object):
 
         if eip1559_enabled:
             tx_data.update(
-                self.__estimate_gas_eip1559()[rate]
+                self.fees.get('eip1559', self.__estimate_gas_eip1559)[rate]
             )
             estimated_gas = gas_limit * tx_data.pop(Metadata.ESTIMATED_GAS)
             max_fee = gas_limit * tx_data[Metadata.MAX_FEE_PER_GAS]
         else:
             tx_data.update({
-                Metadata.GAS_PRICE: self.web3.eth.gas_price
+                Metadata.GAS_PRICE: self.gas_price()
             })
             estimated_gas = gas_limit * tx_data[Metadata.GAS_PRICE]
             max_fee = estimated_gas
@@ -106,8 +149,25 @@ class __Provider(object):
         }
 
     def send_transaction(self, tx_data: dict, private_key: str) -> interface.TXHash:
-        signed_txn = self.web3.eth.account.sign_transaction(tx_data, private_key=private_key)
-        self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        """
+        Sign and send, a transaction without nonce gets the next local nonce of its sender
+        A nonce error resyncs the sender and is raised, the transaction is never sent twice
+        :exception ValueError
+        """
+
+        sender = interface.Address(tx_data[Metadata.FROM])
+        assigned = Metadata.NONCE not in tx_data
+        if assigned:
+            tx_data[Metadata.NONCE] = self.next_nonce(sender)
+
+        try:
+            signed_txn = self.web3.eth.account.sign_transaction(tx_data, private_key=private_key)
+            self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception as error:
+            _unsent(self.interface.chainID, tx_data, sender, assigned, error)
+            raise
+
+        NonceManager.sent(self.interface.chainID, sender, tx_data[Metadata.NONCE])
         return interface.TXHash(self.web3.toHex(signed_txn.hash))
 
     def get_transaction(self, transaction_hash: interface.TXHash) -> datastructures.AttributeDict:
@@ -132,30 +192,13 @@ class __Provider(object):
             except KeyError:
                 continue
 
-    def __fee_history(self) -> list:
-        historical_blocks = 10
-        fee_history = self.web3.eth.fee_history(historical_blocks, 'pending', [25, 50, 75])
-        oldest_block = fee_history.oldestBlock
-        latest_block = oldest_block + historical_blocks
-
-        return [
-            {
-                EIP1559Metadata.BLOCK_NUMBER: block_number,
-                EIP1559Metadata.BASE_FEE_PER_GAS: fee_history.baseFeePerGas[index],
-                EIP1559Metadata.GAS_USED_RATIO: fee_history.gasUsedRatio[index],
-                EIP1559Metadata.PRIORITY_FEE_PER_GAS: fee_history.reward[index]
-            } for index, block_number in enumerate(range(oldest_block, latest_block))
-        ]
-
     def __estimate_gas_eip1559(self) -> dict:
         rates = [EIP1559Metadata.SLOW, EIP1559Metadata.MEDIUM, EIP1559Metadata.FAST]
-        fee_history = self.__fee_history()
-        base_fee = self.web3.eth.get_block('pending').baseFeePerGas
+        self.feeOracle.update()
+        base_fee = self.feeOracle.next_base_fee()
         result = {}
 
-        for index, rate in enumerate(rates):
-            all_priority_fee = [i[EIP1559Metadata.PRIORITY_FEE_PER_GAS][index] for i in fee_history]
-            priority_fee = max(all_priority_fee)
+        for rate, priority_fee in zip(rates, self.feeOracle.priority_fees()):
             estimated_gas = int(0.9 * base_fee + priority_fee)
             max_fee = int(1.5 * estimated_gas)
             if priority_fee >= max_fee or priority_fee <= 0:
@@ -189,7 +232,9 @@ class _MainProvider(__Provider):
         valid = False
 
         if self.interface:
-            if '.infura.io/v3' in self.interface.rpc and self.interface.symbol == 'ETH':
+            # Any endpoint of the pool may serve the requests
+            infura = any('.infura.io/v3' in i for i in self.interface.endpoints())
+            if infura and self.interface.symbol == 'ETH':
                 valid = True
 
         return valid
@@ -203,6 +248,120 @@ class _WNSProvider(__Provider):
         self.__contract = address
 
 
+class NetworkProvider(__Provider):
+    """Standalone provider of any stored network, it leaves the current network untouched"""
+
+    def __init__(self, network_interface: interface.Network):
+        super(NetworkProvider, self).__init__()
+        self.connect(network_interface)
+
+
+class __AsyncProvider(object):
+    def __init__(self):
+        self.interface = None
+        self.web3 = None
+
+    async def connect(self, network_interface: interface.Network) -> bool:
+        valid = False
+
+        if isinstance(network_interface, interface.Network):
+            self.interface = network_interface
+            self.web3 = Web3(
+                AsyncRPCPool(network_interface.endpoints()), modules={'eth': (AsyncEth,)},
+                middlewares=[]
+            )
+            valid = await self.web3.isConnected()
+
+        return valid
+
+    async def is_connected(self) -> bool:
+        return await self.web3.isConnected()
+
+    def contract_factory(self, address: interface.Address, abi: list) -> Contract:
+        """Contract object which is used to encode and decode the calls only"""
+
+        return Contract.factory(self.web3, abi=abi)(address.value())
+
+    async def call(self, method) -> typing.Any:
+        """Await a bound contract function, the async twin of `method.call()`"""
+
+        return decode_call(method, await self.web3.eth.call(encode_call(method)))
+
+    async def next_nonce(self, address: interface.Address) -> int:
+        return await NonceManager.async_next(self.web3, self.interface.chainID, address)
+
+    async def build_transaction(self, method, from_address: interface.Address) -> dict:
+        tx = {
+            Metadata.FROM: from_address.value(),
+            Metadata.TO: method.address,
+            Metadata.VALUE: 0,
+            Metadata.DATA: method._encode_transaction_data()
+        }
+        tx.update({
+            Metadata.GAS: await self.web3.eth.estimate_gas(tx),
+            Metadata.GAS_PRICE: await self.web3.eth.gas_price,
+            Metadata.CHAIN_ID: self.interface.chainID
+        })
+
+        return tx
+
+    async def send_transaction(self, tx_data: dict, private_key: str) -> interface.TXHash:
+        sender = interface.Address(tx_data[Metadata.FROM])
+        assigned = Metadata.NONCE not in tx_data
+        if assigned:
+            tx_data[Metadata.NONCE] = await self.next_nonce(sender)
+
+        try:
+            signed_txn = self.web3.eth.account.sign_transaction(tx_data, private_key=private_key)
+            await self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception as error:
+            _unsent(self.interface.chainID, tx_data, sender, assigned, error)
+            raise
+
+        NonceManager.sent(self.interface.chainID, sender, tx_data[Metadata.NONCE])
+        return interface.TXHash(self.web3.toHex(signed_txn.hash))
+
+    async def get_transaction(self, transaction_hash: interface.TXHash) -> datastructures.AttributeDict:
+        try:
+            return await self.web3.eth.get_transaction(transaction_hash.value())
+        except exceptions.TransactionNotFound:
+            return datastructures.AttributeDict(dict())
+
+    async def get_transaction_receipt(
+            self, transaction_hash: interface.TXHash
+    ) -> datastructures.AttributeDict:
+        try:
+            return await self.web3.eth.get_transaction_receipt(transaction_hash.value())
+        except exceptions.TransactionNotFound:
+            return datastructures.AttributeDict(dict())
+
+
+class _AsyncMainProvider(__AsyncProvider):
+    async def connect(self, network_interface: interface.Network) -> bool:
+        interface._currentNetwork = network_interface
+        return await super(_AsyncMainProvider, self).connect(network_interface)
+
+    async def balance_of(self, address: interface.Address) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            await self.web3.eth.get_balance(address.value()), decimals=18
+        )
+
+    async def block_number(self) -> int:
+        return await self.web3.eth.block_number
+
+
+class _AsyncWNSProvider(__AsyncProvider):
+    def contract(self) -> interface.Address:
+        return self.__contract
+
+    def set_contract(self, address: interface.Address):
+        self.__contract = address
+
+
 MainProvider = _MainProvider()
 WNSProvider = _WNSProvider()
-__all__ = ['Metadata', 'MainProvider', 'WNSProvider']
+AsyncMainProvider = _AsyncMainProvider()
+AsyncWNSProvider = _AsyncWNSProvider()
+__all__ = [
+    'Metadata', 'MainProvider', 'WNSProvider', 'AsyncMainProvider', 'AsyncWNSProvider', 'NetworkProvider'
+]
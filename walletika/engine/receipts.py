@@ -0,0 +1,99 @@
+from .provider import NetworkProvider
+from ..tools import interface
+from ..data import networks, transactions
+import time
+
+
+def pending_transactions() -> dict:
+    """Pending transactions of all wallets, {rpc: {tx hash: [Transaction, ...]}}"""
+
+    result = {}
+
+    for _, row in transactions.db.select():
+        transaction = row['interface']
+        if transaction.status == interface.Transaction.Status.PENDING:
+            result.setdefault(row['rpc'], {}).setdefault(transaction.txHash.value(), []).append(transaction)
+
+    return result
+
+
+def reconcile(
+        rounds: int = 4, delay: float = 2.0, max_delay: float = 30.0, batch_size: int = 100,
+        drop_unknown: bool = False
+) -> list:
+    """
+    Poll the receipts of all pending transactions in JSON-RPC batches per network, waiting
+    `delay` seconds doubled every round (up to `max_delay`) while some are still pending,
+    then store all status changes in one write
+    Pending transactions which the node doesn't know at all after the last round are marked
+    as failed when `drop_unknown` is enabled
+    Returns the transactions whose status changed
+    """
+
+    pending = pending_transactions()
+    providers = {}
+    changed = []
+
+    for rpc in pending:
+        for _, row in networks.db.select(rpc=rpc):
+            providers[rpc] = NetworkProvider(row['interface'])
+            break
+
+    def fetch(provider, hashes: list, method: str) -> list:
+        """Results of one batch per network, an unreachable network answers nothing this round"""
+
+        try:
+            with provider.batch(size=batch_size) as batch:
+                for tx_hash in hashes:
+                    getattr(batch, method)(interface.TXHash(tx_hash), allow_failure=True)
+        except (IOError, ValueError):
+            return []
+
+        return batch.results
+
+    try:
+        for round_index in range(rounds):
+            if round_index > 0:
+                time.sleep(min(delay * 2 ** (round_index - 1), max_delay))
+
+            for rpc, provider in providers.items():
+                hashes = list(pending[rpc])
+                if not hashes:
+                    continue
+
+                for tx_hash, receipt in zip(hashes, fetch(provider, hashes, 'get_transaction_receipt')):
+                    if not receipt:
+                        continue
+
+                    status = interface.Transaction.Status.SUCCESS if receipt.get('status', 1) else \
+                        interface.Transaction.Status.FAILED
+                    for transaction in pending[rpc].pop(tx_hash):
+                        transaction.status = status
+                        changed.append(transaction)
+
+            if not any(pending[rpc] for rpc in providers):
+                break
+
+        if drop_unknown:
+            for rpc, provider in providers.items():
+                hashes = list(pending[rpc])
+                if not hashes:
+                    continue
+
+                results = fetch(provider, hashes, 'get_transaction')
+                for tx_hash, transaction_data in zip(hashes, results):
+                    # None is a failed lookup, not an unknown transaction
+                    if transaction_data is None or transaction_data:
+                        continue
+
+                    for transaction in pending[rpc].pop(tx_hash):
+                        transaction.status = interface.Transaction.Status.FAILED
+                        changed.append(transaction)
+    finally:
+        if changed:
+            transactions.db.dump()
+
+    return changed
+
+
+__all__ = ['pending_transactions', 'reconcile']
@@ -0,0 +1,221 @@
+from .metrics import RPCMetrics
+from web3 import HTTPProvider, AsyncHTTPProvider
+from web3.providers.base import JSONBaseProvider
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3._utils.request import make_post_request, _get_async_session
+from aiohttp import ClientTimeout, ClientResponseError, ClientConnectionError
+import json
+import asyncio
+import time
+import typing
+import requests
+import threading
+
+
+# These calls must not be repeated on another endpoint when the first attempt is unknown
+NON_IDEMPOTENT_METHODS = ('eth_sendRawTransaction', 'eth_sendTransaction')
+
+
+class Endpoint(object):
+    def __init__(self, uri: str, timeout: int):
+        self.uri = uri
+        self.provider = HTTPProvider(uri, request_kwargs={'timeout': timeout})
+        self.latency = 0.0
+        self.failures = 0
+        self.unhealthyUntil = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return self.unhealthyUntil <= now
+
+
+class AsyncEndpoint(Endpoint):
+    def __init__(self, uri: str, timeout: int):
+        super(AsyncEndpoint, self).__init__(uri, timeout)
+        self.provider = AsyncHTTPProvider(uri, request_kwargs={'timeout': ClientTimeout(timeout)})
+
+
+class _EndpointPool(object):
+    """Endpoints of one network ranked by EWMA latency, with a cooldown for the failing ones"""
+
+    endpointClass = Endpoint
+
+    def __init__(
+            self, endpoints: list, timeout: int = 10, smoothing: float = 0.3, cooldown: int = 30
+    ):
+        if not endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+
+        self.endpoints = [self.endpointClass(uri, timeout) for uri in endpoints]
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+
+        self.__lock = threading.Lock()
+        super(_EndpointPool, self).__init__()
+
+    def __str__(self) -> str:
+        return "RPC pool {}".format(', '.join(endpoint.uri for endpoint in self.endpoints))
+
+    def ranked(self) -> list:
+        """Healthy endpoints by latency, then unhealthy ones by the nearest recovery"""
+
+        now = time.monotonic()
+
+        with self.__lock:
+            healthy = sorted(
+                [i for i in self.endpoints if i.is_healthy(now)], key=lambda i: i.latency
+            )
+            unhealthy = sorted(
+                [i for i in self.endpoints if not i.is_healthy(now)], key=lambda i: i.unhealthyUntil
+            )
+
+        return healthy + unhealthy
+
+    def _succeeded(self, endpoint: Endpoint, latency: float):
+        with self.__lock:
+            if endpoint.latency:
+                endpoint.latency += self.smoothing * (latency - endpoint.latency)
+            else:
+                endpoint.latency = latency
+            endpoint.failures = 0
+            endpoint.unhealthyUntil = 0.0
+
+    def _failed(self, endpoint: Endpoint):
+        with self.__lock:
+            endpoint.failures += 1
+            # Back off longer from an endpoint that keeps failing
+            endpoint.unhealthyUntil = time.monotonic() + self.cooldown * min(endpoint.failures, 10)
+
+
+class RPCPool(_EndpointPool, JSONBaseProvider):
+    """
+    Web3 provider over several HTTP endpoints of one network
+    Routes every request to the fastest healthy endpoint by EWMA latency, and retries
+    idempotent requests on the next endpoint on timeout, connection error, HTTP 429 or 5xx
+    """
+
+    def make_request(self, method: str, params: typing.Any) -> dict:
+        return self.__request([method], self.encode_rpc_request(method, params))
+
+    def make_batch_request(self, payload: list) -> list:
+        return self.__request([i['method'] for i in payload], json.dumps(payload).encode())
+
+    def isConnected(self) -> bool:
+        try:
+            response = self.make_request('web3_clientVersion', [])
+        except (IOError, ValueError):
+            return False
+
+        return 'error' not in response and 'result' in response
+
+    def __request(self, methods: list, request_data: bytes) -> typing.Any:
+        RPCMetrics.request(methods)
+        started = time.monotonic()
+        response_data = b''
+
+        try:
+            response_data = self.__route(
+                request_data, retry=not any(i in NON_IDEMPOTENT_METHODS for i in methods)
+            )
+            response = self.decode_rpc_response(response_data)
+        except Exception:
+            RPCMetrics.record(
+                methods, time.monotonic() - started, len(request_data), len(response_data), failed=True
+            )
+            raise
+
+        RPCMetrics.record(
+            methods, time.monotonic() - started, len(request_data), len(response_data),
+            failed=isinstance(response, dict) and 'error' in response
+        )
+        return response
+
+    def __route(self, request_data: bytes, retry: bool) -> bytes:
+        error = None
+
+        for endpoint in self.ranked():
+            started = time.monotonic()
+
+            try:
+                response_data = make_post_request(
+                    endpoint.uri, request_data, **endpoint.provider.get_request_kwargs()
+                )
+            except requests.exceptions.HTTPError as err:
+                # Only rate limiting and server side errors are worth another endpoint
+                status_code = err.response.status_code if err.response is not None else 0
+                if status_code != 429 and status_code < 500:
+                    raise
+                error = err
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as err:
+                error = err
+            else:
+                self._succeeded(endpoint, time.monotonic() - started)
+                return response_data
+
+            self._failed(endpoint)
+            if not retry:
+                break
+
+        raise error
+
+
+class AsyncRPCPool(_EndpointPool, AsyncJSONBaseProvider):
+    """Asyncio twin of RPCPool, it ranks, retries and reports its requests the same way"""
+
+    endpointClass = AsyncEndpoint
+
+    async def make_request(self, method: str, params: typing.Any) -> dict:
+        request_data = self.encode_rpc_request(method, params)
+        RPCMetrics.request([method])
+        started = time.monotonic()
+        response_data = b''
+
+        try:
+            response_data = await self.__route(
+                request_data, retry=method not in NON_IDEMPOTENT_METHODS
+            )
+            response = self.decode_rpc_response(response_data)
+        except Exception:
+            RPCMetrics.record(
+                [method], time.monotonic() - started, len(request_data), len(response_data),
+                failed=True
+            )
+            raise
+
+        RPCMetrics.record(
+            [method], time.monotonic() - started, len(request_data), len(response_data),
+            failed='error' in response
+        )
+        return response
+
+    async def __route(self, request_data: bytes, retry: bool) -> bytes:
+        error = None
+
+        for endpoint in self.ranked():
+            started = time.monotonic()
+
+            try:
+                session = await _get_async_session(endpoint.uri)
+                async with session.post(
+                        endpoint.uri, data=request_data, **endpoint.provider.get_request_kwargs()
+                ) as response:
+                    response.raise_for_status()
+                    response_data = await response.read()
+            except ClientResponseError as err:
+                # Only rate limiting and server side errors are worth another endpoint
+                if err.status != 429 and err.status < 500:
+                    raise
+                error = err
+            except (asyncio.TimeoutError, ClientConnectionError) as err:
+                error = err
+            else:
+                self._succeeded(endpoint, time.monotonic() - started)
+                return response_data
+
+            self._failed(endpoint)
+            if not retry:
+                break
+
+        raise error
+
+
+__all__ = ['NON_IDEMPOTENT_METHODS', 'Endpoint', 'AsyncEndpoint', 'RPCPool', 'AsyncRPCPool']
@@ -1,15 +1,19 @@
-from .provider import MainProvider, Metadata
+from .provider import MainProvider, AsyncMainProvider, Metadata
+from .callcache import CallCache
+from .multicall import Multicall
+from . import stakefeed
 from ..abis import tokenABI, stakeABI
 from ..tools import interface
 from ..data import stakecontracts
-import requests
+from decimal import Decimal, InvalidOperation
+import asyncio
+import dataclasses
+import typing
 
 
-def __fetching(url: str) -> dict:
-    try:
-        return requests.get(url).json()
-    except requests.exceptions.ConnectionError:
-        return {}
+_aprCache = {
+    # (rpc, contract): (block number, apr)
+}
 
 
 def get_all(filter_by_network: bool = False) -> list:
@@ -23,44 +27,125 @@ def get_all(filter_by_network: bool = False) -> list:
     return result
 
 
-def data_import(api_url: str) -> bool:
-    valid = False
-    data_fetched = __fetching(api_url)
-
-    if data_fetched:
-        stakecontracts.db.clear()
-
-    for rpc, contracts in data_fetched.items():
-        for contract, info in contracts.items():
-            stake_token = interface.Token(
-                contract=interface.Address(info['stakeToken']['contract']),
-                symbol=info['stakeToken']['symbol'],
-                decimals=info['stakeToken']['decimals']
-            )
-            reward_token = interface.Token(
-                contract=interface.Address(info['rewardToken']['contract']),
-                symbol=info['rewardToken']['symbol'],
-                decimals=info['rewardToken']['decimals']
-            )
-            stake_interface = interface.Stake(
-                contract=interface.Address(contract),
-                stake_token=stake_token,
-                reward_token=reward_token,
-                stake_website=info['stakeWebsite'],
-                reward_website=info['rewardWebsite'],
-                start_block=info['startBlock'],
-                end_block=info['endBlock'],
-                start_time=info['startTime'],
-                end_time=info['endTime']
-            )
+def snapshot_all(user: interface.Address = None) -> list:
+    """Snapshots of every pool of the connected network, all in one aggregated request"""
 
-            stakecontracts.db.insert(rpc=rpc, interface=stake_interface)
+    engines = [StakeEngine(stake_interface=i) for i in get_all(filter_by_network=True)]
 
-    if stakecontracts.db.count_row() > 0:
-        stakecontracts.db.dump()
-        valid = True
+    with Multicall() as multicall:
+        multicall.block_number()
+        calls = []
+        for stake_engine in engines:
+            calls.append(stake_engine._snapshot_calls(user))
+            for _, method, formatter in calls[-1]:
+                multicall.add(method, formatter=formatter)
+
+    block_number, *values = multicall.results
+    result = []
+    offset = 0
+
+    for stake_engine, pool_calls in zip(engines, calls):
+        result.append(stake_engine._make_snapshot(
+            block_number, user, pool_calls, values[offset:offset + len(pool_calls)]
+        ))
+        offset += len(pool_calls)
+
+    return result
+
+
+def calculate_apr(stake_interface: interface.Stake, reward_per_block: int, total_supply: int) -> str:
+    """APR of the whole staking period in exact decimal arithmetic, '0%' when nothing is staked"""
+
+    try:
+        year = 86400 * 365
+        stake_period = stake_interface.endTime - stake_interface.startTime
+        blocks = stake_interface.endBlock - stake_interface.startBlock
+        reward = Decimal(reward_per_block).scaleb(-stake_interface.rewardToken.decimals) * blocks
+        staked = Decimal(total_supply).scaleb(-stake_interface.stakeToken.decimals)
+        interest = reward / staked * 100
+        apr = (year // stake_period) * interest
+    except (ZeroDivisionError, InvalidOperation):
+        # InvalidOperation is 0/0, no reward over nothing staked
+        return '0%'
+
+    return '{:.2f}%'.format(apr)
+
+
+def get_all_apr(cache_blocks: int = 20) -> dict:
+    """
+    APR of every pool of the connected network, {contract address: apr}
+    One block number read for all pools, then the `rewardPerBlock` and `totalSupply` of the
+    pools which were not calculated in the last `cache_blocks` blocks in one aggregated call
+    """
+
+    rpc = MainProvider.interface.rpc
+    block_number = MainProvider.fees.block_number()
+    result = {}
+    outdated = []
+
+    for stake_interface in get_all(filter_by_network=True):
+        contract = stake_interface.contract.value()
+        cached = _aprCache.get((rpc, contract))
+
+        if stake_interface.endBlock <= block_number:
+            result[contract] = '0%'
+        elif cached and block_number - cached[0] < cache_blocks:
+            result[contract] = cached[1]
+        else:
+            outdated.append(stake_interface)
+
+    if outdated:
+        with Multicall() as multicall:
+            for stake_interface in outdated:
+                functions = StakeEngine(stake_interface=stake_interface).contract.functions
+                multicall.add(functions.rewardPerBlock())
+                multicall.add(functions.totalSupply())
+
+        for index, stake_interface in enumerate(outdated):
+            contract = stake_interface.contract.value()
+            reward_per_block, total_supply = multicall.results[index * 2:index * 2 + 2]
+
+            if reward_per_block is None or total_supply is None:
+                # Not cached, the next call tries again
+                result[contract] = '0%'
+                continue
+
+            result[contract] = calculate_apr(stake_interface, reward_per_block, total_supply)
+            _aprCache[(rpc, contract)] = (block_number, result[contract])
 
-    return valid
+    return result
+
+
+def data_import(api_url: str) -> bool:
+    """Sync data/stakecontracts with the feed incrementally, see `stakefeed.sync`"""
+
+    stakefeed.sync(api_url)
+    return stakecontracts.db.count_row() > 0
+
+
+@dataclasses.dataclass(frozen=True)
+class StakeSnapshot:
+    """
+    The pool state at one block, and the position of `user` when one is given
+    A value which could not be read is None
+    """
+
+    interface: interface.Stake
+    blockNumber: int
+    isPaused: typing.Optional[bool]
+    hasUserLimit: typing.Optional[bool]
+    lockedToEnd: typing.Optional[bool]
+    totalSupply: typing.Optional[interface.WeiAmount]
+    rewardSupply: typing.Optional[interface.WeiAmount]
+    rewardPerBlock: typing.Optional[interface.WeiAmount]
+    poolLimitPerUser: typing.Optional[interface.WeiAmount]
+    accTokenPerShare: typing.Optional[interface.WeiAmount]
+    startBlock: typing.Optional[int]
+    bonusEndBlock: typing.Optional[int]
+    lastRewardBlock: typing.Optional[int]
+    user: typing.Optional[interface.Address] = None
+    balance: typing.Optional[interface.WeiAmount] = None
+    pendingReward: typing.Optional[interface.WeiAmount] = None
 
 
 class StakeEngine(object):
@@ -126,15 +211,15 @@ class StakeEngine(object):
 
     def precision_factor(self) -> interface.WeiAmount:
         return interface.WeiAmount(
-            value=self.contract.functions.PRECISION_FACTOR().call(),
+            value=CallCache.call(self.contract.functions.PRECISION_FACTOR()),
             decimals=self.interface.rewardToken.decimals
         )
 
     def reward_token(self) -> interface.Address:
-        return interface.Address(self.contract.functions.rewardToken().call())
+        return interface.Address(CallCache.call(self.contract.functions.rewardToken()))
 
     def staked_token(self) -> interface.Address:
-        return interface.Address(self.contract.functions.stakedToken().call())
+        return interface.Address(CallCache.call(self.contract.functions.stakedToken()))
 
     def total_supply(self) -> interface.WeiAmount:
         return interface.WeiAmount(
@@ -237,27 +322,87 @@ class StakeEngine(object):
         result = '0%'
 
         if self.interface.endBlock > MainProvider.block_number():
-            try:
-                year = 86400 * 365
-                stake_period = self.interface.endTime - self.interface.startTime
-                blocks = self.interface.endBlock - self.interface.startBlock
-                reward = self.reward_per_block().to_ether() * blocks
-                interest = (reward / self.total_supply().to_ether()) * 100
-                apr = int(year / stake_period) * interest
-                result = '{:.2f}%'.format(apr)
-            except ZeroDivisionError:
-                pass
+            result = calculate_apr(
+                self.interface, self.reward_per_block().value(), self.total_supply().value()
+            )
 
         return result
 
+    def snapshot(self, user: interface.Address = None) -> StakeSnapshot:
+        """Get the pool state and the position of `user` in one aggregated call"""
+
+        calls = self._snapshot_calls(user)
+
+        with Multicall() as multicall:
+            multicall.block_number()
+            for _, method, formatter in calls:
+                multicall.add(method, formatter=formatter)
+
+        block_number, *values = multicall.results
+        return self._make_snapshot(block_number, user, calls, values)
+
     def set_favorite(self, status: bool):
         self.interface.isFavorite = status
         stakecontracts.db.dump()
 
+    def _snapshot_calls(self, user: interface.Address = None) -> list:
+        """[(StakeSnapshot field, contract function, formatter), ...]"""
+
+        def stake_amount(value: int) -> interface.WeiAmount:
+            return interface.WeiAmount(value=value, decimals=self.interface.stakeToken.decimals)
+
+        def reward_amount(value: int) -> interface.WeiAmount:
+            return interface.WeiAmount(value=value, decimals=self.interface.rewardToken.decimals)
+
+        functions = self.contract.functions
+        calls = [
+            ('isPaused', functions.paused(), None),
+            ('hasUserLimit', functions.hasUserLimit(), None),
+            ('lockedToEnd', functions.lockedToEnd(), None),
+            ('totalSupply', functions.totalSupply(), stake_amount),
+            ('rewardSupply', functions.rewardSupply(), reward_amount),
+            ('rewardPerBlock', functions.rewardPerBlock(), reward_amount),
+            ('poolLimitPerUser', functions.poolLimitPerUser(), stake_amount),
+            ('accTokenPerShare', functions.accTokenPerShare(), reward_amount),
+            ('startBlock', functions.startBlock(), None),
+            ('bonusEndBlock', functions.bonusEndBlock(), None),
+            ('lastRewardBlock', functions.lastRewardBlock(), None)
+        ]
+
+        if user is not None:
+            calls += [
+                ('balance', functions.balanceOf(user.value()), stake_amount),
+                ('pendingReward', functions.pendingReward(user.value()), reward_amount)
+            ]
+
+        return calls
+
+    def _make_snapshot(
+            self, block_number: int, user: typing.Optional[interface.Address], calls: list, values: list
+    ) -> StakeSnapshot:
+        return StakeSnapshot(
+            interface=self.interface,
+            blockNumber=block_number,
+            user=user,
+            **{field: value for (field, _, _), value in zip(calls, values)}
+        )
+
     def _build_transaction(self, method) -> dict:
         if not isinstance(self.sender, interface.Address):
             raise ValueError("The sender must not be a zero address")
 
+        args = self._transaction_args(method)
+        tx = method.buildTransaction({
+            Metadata.FROM: self.sender.value(),
+            Metadata.GAS_PRICE: MainProvider.gas_price()
+        })
+        self.latestTransactionDetails.update({
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
+        })
+
+        return tx
+
+    def _transaction_args(self, method, recovered_token_decimals: int = None) -> dict:
         abi = method.abi
         abi_name = abi['name']
         args = {}
@@ -284,25 +429,156 @@ class StakeEngine(object):
                     value=value, decimals=self.interface.rewardToken.decimals
                 )
             elif npt_type == 'uint256' and abi_name == 'recoverWrongTokens':
-                contract = MainProvider.web3.eth.contract(
-                    address=args['_tokenAddress'].value(), abi=tokenABI
-                )
+                if recovered_token_decimals is None:
+                    contract = MainProvider.web3.eth.contract(
+                        address=args['_tokenAddress'].value(), abi=tokenABI
+                    )
+                    recovered_token_decimals = contract.functions.decimals().call()
                 args[npt_name] = interface.WeiAmount(
-                    value=value, decimals=contract.functions.decimals().call()
+                    value=value, decimals=recovered_token_decimals
                 )
             else:
                 args[npt_name] = value
 
-        tx = method.buildTransaction({
-            Metadata.FROM: self.sender.value(),
-            Metadata.GAS_PRICE: MainProvider.web3.eth.gas_price
-        })
-        tx[Metadata.NONCE] = MainProvider.web3.eth.get_transaction_count(self.sender.value())
+        return args
+
+
+class AsyncStakeEngine(StakeEngine):
+    """Asyncio twin of StakeEngine over AsyncMainProvider, every call returns a coroutine"""
+
+    def __init__(self, stake_interface: interface.Stake, sender: interface.Address = None):
+        self.interface = stake_interface
+        self.sender = sender
+        self.contract = AsyncMainProvider.contract_factory(stake_interface.contract, abi=stakeABI)
+        self.latestTransactionDetails = {
+            'abi': {},
+            'args': {},
+            'data': b''
+        }
+
+    async def owner(self) -> interface.Address:
+        return interface.Address(await AsyncMainProvider.call(self.contract.functions.owner()))
+
+    async def smart_chef_factory(self) -> interface.Address:
+        return interface.Address(await AsyncMainProvider.call(self.contract.functions.SMART_CHEF_FACTORY()))
+
+    async def has_user_limit(self) -> bool:
+        return await AsyncMainProvider.call(self.contract.functions.hasUserLimit())
+
+    async def locked_to_end(self) -> bool:
+        return await AsyncMainProvider.call(self.contract.functions.lockedToEnd())
+
+    async def is_initialized(self) -> bool:
+        return await AsyncMainProvider.call(self.contract.functions.isInitialized())
+
+    async def is_paused(self) -> bool:
+        return await AsyncMainProvider.call(self.contract.functions.paused())
+
+    async def last_pause_time(self) -> int:
+        return await AsyncMainProvider.call(self.contract.functions.lastPauseTime())
+
+    async def acc_token_per_share(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.accTokenPerShare()),
+            decimals=self.interface.rewardToken.decimals
+        )
+
+    async def bonus_end_block(self) -> int:
+        return await AsyncMainProvider.call(self.contract.functions.bonusEndBlock())
+
+    async def start_block(self) -> int:
+        return await AsyncMainProvider.call(self.contract.functions.startBlock())
+
+    async def last_reward_block(self) -> int:
+        return await AsyncMainProvider.call(self.contract.functions.lastRewardBlock())
+
+    async def pool_limit_per_user(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.poolLimitPerUser()),
+            decimals=self.interface.stakeToken.decimals
+        )
+
+    async def reward_per_block(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.rewardPerBlock()),
+            decimals=self.interface.rewardToken.decimals
+        )
+
+    async def precision_factor(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await CallCache.async_call(self.contract.functions.PRECISION_FACTOR()),
+            decimals=self.interface.rewardToken.decimals
+        )
+
+    async def reward_token(self) -> interface.Address:
+        return interface.Address(await CallCache.async_call(self.contract.functions.rewardToken()))
+
+    async def staked_token(self) -> interface.Address:
+        return interface.Address(await CallCache.async_call(self.contract.functions.stakedToken()))
+
+    async def total_supply(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.totalSupply()),
+            decimals=self.interface.stakeToken.decimals
+        )
+
+    async def reward_supply(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.rewardSupply()),
+            decimals=self.interface.rewardToken.decimals
+        )
+
+    async def balance_of(self, address: interface.Address) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.balanceOf(address.value())),
+            decimals=self.interface.stakeToken.decimals
+        )
+
+    async def pending_reward(self, address: interface.Address) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.pendingReward(address.value())),
+            decimals=self.interface.rewardToken.decimals
+        )
+
+    async def get_apr(self) -> str:
+        result = '0%'
+
+        if self.interface.endBlock > await AsyncMainProvider.block_number():
+            reward_per_block, total_supply = await asyncio.gather(
+                self.reward_per_block(), self.total_supply()
+            )
+            result = calculate_apr(self.interface, reward_per_block.value(), total_supply.value())
+
+        return result
+
+    async def snapshot(self, user: interface.Address = None) -> StakeSnapshot:
+        calls = self._snapshot_calls(user)
+        block_number, *values = await asyncio.gather(
+            AsyncMainProvider.block_number(), *[AsyncMainProvider.call(method) for _, method, _ in calls]
+        )
+        values = [formatter(value) if formatter else value for (_, _, formatter), value in zip(calls, values)]
+
+        return self._make_snapshot(block_number, user, calls, values)
+
+    async def _build_transaction(self, method) -> dict:
+        if not isinstance(self.sender, interface.Address):
+            raise ValueError("The sender must not be a zero address")
+
+        recovered_token_decimals = None
+        if method.abi['name'] == 'recoverWrongTokens':
+            contract = AsyncMainProvider.contract_factory(interface.Address(method.args[0]), abi=tokenABI)
+            recovered_token_decimals = await AsyncMainProvider.call(contract.functions.decimals())
+
+        args = self._transaction_args(method, recovered_token_decimals)
+        tx = await AsyncMainProvider.build_transaction(method, self.sender)
         self.latestTransactionDetails.update({
-            'abi': abi, 'args': args, 'data': tx[Metadata.DATA]
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
         })
 
         return tx
 
 
-__all__ = ['get_all', 'data_import', 'StakeEngine']
+__all__ = [
+    'get_all', 'snapshot_all', 'calculate_apr', 'get_all_apr', 'data_import', 'StakeSnapshot',
+    'StakeEngine', 'AsyncStakeEngine'
+]
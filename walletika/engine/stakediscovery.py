@@ -0,0 +1,188 @@
+from .provider import MainProvider
+from .multicall import Multicall
+from .callcache import CallCache
+from .logscanner import LogScanner, get_checkpoint, set_checkpoint
+from . import stakefeed
+from ..abis import stakeABI, tokenABI, stakeFactoryABI
+from ..tools import interface
+from ..data import stakecontracts
+from web3 import Web3, exceptions
+from eth_utils import event_abi_to_log_topic
+
+
+NEW_POOL_TOPIC = Web3.toHex(event_abi_to_log_topic(next(
+    i for i in stakeFactoryABI if i['type'] == 'event' and i['name'] == 'NewSmartChefContract'
+)))
+
+# Blocks back from the latest one to measure the average block time
+BLOCK_TIME_SAMPLE = 10000
+
+
+def _hex(value) -> str:
+    return value if isinstance(value, str) else Web3.toHex(value)
+
+
+def checkpoint_key(factory: interface.Address) -> str:
+    return 'stakefactory:{}'.format(factory.value())
+
+
+def factories(provider=MainProvider) -> list:
+    """The factories of the stored pools of the connected network"""
+
+    result = {}
+
+    with CallCache.deferred():
+        for _, row in stakecontracts.db.select(rpc=provider.interface.rpc):
+            contract = provider.web3.eth.contract(address=row['interface'].contract.value(), abi=stakeABI)
+            try:
+                address = CallCache.call(contract.functions.SMART_CHEF_FACTORY(), provider=provider)
+            except (ValueError, exceptions.BadFunctionCallOutput):
+                # Not a pool of a factory
+                continue
+            result[address] = interface.Address(address)
+
+    return list(result.values())
+
+
+def discover(
+        factory: interface.Address = None, provider=MainProvider, from_block: int = None,
+        lookback: int = 100000, confirmations: int = 5, chunk: int = 2000, concurrency: int = 4
+) -> int:
+    """
+    Add the pools which `factory` created to data/stakecontracts from its `NewSmartChefContract`
+    logs, the factories of the stored pools by default
+    Every factory resumes from its checkpoint, a factory without one starts from `from_block`
+    or `lookback` blocks ago. The tokens, blocks and times of the new pools are read by
+    Multicall3, the websites and the source of a known pool are kept, the new ones are
+    `Stake.DISCOVERY` pools which a feed sync never deletes. Returns the inserted and updated count
+    """
+
+    rpc = provider.interface.rpc
+    to_block = provider.web3.eth.block_number - confirmations
+    scanner = LogScanner(provider=provider, chunk=chunk, concurrency=concurrency)
+    count = 0
+
+    for factory_address in [factory] if factory else factories(provider):
+        key = checkpoint_key(factory_address)
+        start = get_checkpoint(rpc, key)
+        start = start + 1 if start is not None else from_block
+        if start is None:
+            start = max(0, to_block - lookback)
+
+        query = {'address': factory_address.value(), 'topics': [NEW_POOL_TOPIC]}
+
+        for _, end, logs in scanner.scan([query], start, to_block):
+            pools = []
+            for log in logs:
+                # The pool address is indexed, older factories log it as data
+                word = _hex(log['topics'][1]) if len(log['topics']) > 1 else _hex(log['data'])
+                pools.append(Web3.toChecksumAddress('0x' + word[-40:]))
+
+            if pools:
+                stored = stakefeed.stored_pools()
+                changes = 0
+                for stake_interface in resolve(pools, provider):
+                    current = stored.get((rpc, stake_interface.contract.value()))
+                    if current is not None:
+                        stake_interface.stakeWebsite = current.stakeWebsite
+                        stake_interface.rewardWebsite = current.rewardWebsite
+                    if stakefeed.upsert(stored, rpc, stake_interface):
+                        changes += 1
+
+                if changes:
+                    stakecontracts.db.dump()
+                count += changes
+
+            set_checkpoint(rpc, key, end)
+
+    return count
+
+
+def resolve(pools: list, provider=MainProvider) -> list:
+    """
+    interface.Stake of every pool address, by two aggregated calls and one batch of blocks
+    A pool whose contract can not be read is left out
+    """
+
+    contracts = [provider.web3.eth.contract(address=i, abi=stakeABI) for i in pools]
+
+    with Multicall(provider=provider) as multicall:
+        for contract in contracts:
+            multicall.add(contract.functions.stakedToken())
+            multicall.add(contract.functions.rewardToken())
+            multicall.add(contract.functions.startBlock())
+            multicall.add(contract.functions.bonusEndBlock())
+
+    details = {}
+    for index, pool in enumerate(pools):
+        values = multicall.results[index * 4:index * 4 + 4]
+        if None not in values:
+            details[pool] = values
+
+    if not details:
+        return []
+
+    tokens = sorted(set(i for values in details.values() for i in values[:2]))
+    with Multicall(provider=provider) as multicall:
+        for token in tokens:
+            contract = provider.web3.eth.contract(address=token, abi=tokenABI)
+            multicall.add(contract.functions.symbol())
+            multicall.add(contract.functions.decimals())
+
+    token_of = {}
+    for index, token in enumerate(tokens):
+        symbol, decimals = multicall.results[index * 2:index * 2 + 2]
+        if symbol is not None and decimals is not None:
+            token_of[token] = interface.Token(
+                contract=interface.Address(token), symbol=symbol, decimals=decimals
+            )
+
+    times = block_times(set(i for values in details.values() for i in values[2:]), provider)
+    result = []
+
+    for pool, (staked_token, reward_token, start_block, end_block) in details.items():
+        if staked_token not in token_of or reward_token not in token_of:
+            continue
+
+        result.append(interface.Stake(
+            contract=interface.Address(pool),
+            stake_token=token_of[staked_token],
+            reward_token=token_of[reward_token],
+            stake_website='',
+            reward_website='',
+            start_block=start_block,
+            end_block=end_block,
+            start_time=times[start_block],
+            end_time=times[end_block],
+            source=interface.Stake.DISCOVERY
+        ))
+
+    return result
+
+
+def block_times(blocks: set, provider=MainProvider) -> dict:
+    """
+    {block number: timestamp}, mined blocks are read in one batch and the future ones are
+    estimated by the average block time of the last `BLOCK_TIME_SAMPLE` blocks
+    """
+
+    latest = provider.web3.eth.get_block('latest')
+    mined = sorted(i for i in blocks if i <= latest.number)
+
+    with provider.batch() as batch:
+        batch.get_block(max(0, latest.number - BLOCK_TIME_SAMPLE))
+        for block_number in mined:
+            batch.get_block(block_number)
+
+    sample, *mined_blocks = batch.results
+    seconds = (latest.timestamp - sample.timestamp) / max(1, latest.number - sample.number)
+    result = {block.number: block.timestamp for block in mined_blocks}
+
+    for block_number in blocks:
+        if block_number not in result:
+            result[block_number] = int(latest.timestamp + (block_number - latest.number) * seconds)
+
+    return result
+
+
+__all__ = ['NEW_POOL_TOPIC', 'checkpoint_key', 'factories', 'discover', 'resolve', 'block_times']
@@ -0,0 +1,251 @@
+from ..tools import interface
+from ..data import stakecontracts, stakefeeds
+import codecs
+import json
+import typing
+import requests
+
+
+_WHITESPACE = ' \t\r\n,'
+
+
+def iter_pools(chunks: typing.Iterable[str]) -> typing.Iterator[tuple]:
+    """
+    Parse the feed {rpc: {contract: info}} incrementally from text chunks, yields
+    (rpc, contract, info) as soon as a pool is complete, so a large feed is never held at once
+    :exception ValueError
+    """
+
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+    depth = 0
+    rpc = None
+
+    def skip(index: int) -> int:
+        while index < len(buffer) and buffer[index] in _WHITESPACE:
+            index += 1
+        return index
+
+    while True:
+        position = skip(position)
+
+        if position < len(buffer):
+            char = buffer[position]
+
+            if depth == 0:
+                if char != '{':
+                    raise ValueError("The feed must be a JSON object")
+                depth = 1
+                position += 1
+                continue
+
+            if char == '}':
+                depth -= 1
+                position += 1
+                if depth == 0:
+                    return
+                continue
+
+            try:
+                key, end = decoder.raw_decode(buffer, position)
+                end = skip(end)
+                if buffer[end] != ':':
+                    raise ValueError("Expected ':' at {}".format(end))
+                end = skip(end + 1)
+
+                if depth == 1:
+                    if buffer[end] != '{':
+                        raise ValueError("The contracts of {} must be a JSON object".format(key))
+                    rpc = key
+                    depth = 2
+                    position = end + 1
+                else:
+                    info, position = decoder.raw_decode(buffer, end)
+                    yield rpc, key, info
+                continue
+            except (json.JSONDecodeError, IndexError):
+                # The token is split between chunks
+                pass
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            if depth == 0 and position == len(buffer) and rpc is None:
+                return
+            raise ValueError("The feed is truncated")
+
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def stake_from_info(contract: str, info: dict) -> interface.Stake:
+    return interface.Stake(
+        contract=interface.Address(contract),
+        stake_token=interface.Token(
+            contract=interface.Address(info['stakeToken']['contract']),
+            symbol=info['stakeToken']['symbol'],
+            decimals=info['stakeToken']['decimals']
+        ),
+        reward_token=interface.Token(
+            contract=interface.Address(info['rewardToken']['contract']),
+            symbol=info['rewardToken']['symbol'],
+            decimals=info['rewardToken']['decimals']
+        ),
+        stake_website=info['stakeWebsite'],
+        reward_website=info['rewardWebsite'],
+        start_block=info['startBlock'],
+        end_block=info['endBlock'],
+        start_time=info['startTime'],
+        end_time=info['endTime']
+    )
+
+
+def stored_pools() -> dict:
+    """{(rpc, contract): interface.Stake} of data/stakecontracts"""
+
+    return {
+        (row['rpc'], row['interface'].contract.value()): row['interface']
+        for _, row in stakecontracts.db.select()
+    }
+
+
+def upsert(stored: dict, rpc: str, stake_interface: interface.Stake) -> typing.Optional[str]:
+    """
+    Insert a new pool, or update the stored one in place, so its user flags e.g. `isFavorite`
+    and its source stay as they are. Returns 'inserted', 'updated' or None when nothing
+    changed, without dumping
+    """
+
+    key = (rpc, stake_interface.contract.value())
+    current = stored.get(key)
+
+    if current is None:
+        stakecontracts.db.insert(rpc=rpc, interface=stake_interface)
+        stored[key] = stake_interface
+        return 'inserted'
+
+    if _fields(current) == _fields(stake_interface):
+        return None
+
+    current.stakeToken = stake_interface.stakeToken
+    current.rewardToken = stake_interface.rewardToken
+    current.stakeWebsite = stake_interface.stakeWebsite
+    current.rewardWebsite = stake_interface.rewardWebsite
+    current.startBlock = stake_interface.startBlock
+    current.endBlock = stake_interface.endBlock
+    current.startTime = stake_interface.startTime
+    current.endTime = stake_interface.endTime
+    return 'updated'
+
+
+def delete(keys: set) -> int:
+    """Remove the pools of {(rpc, contract), ...}, without dumping"""
+
+    indexes = [
+        index for index, row in stakecontracts.db.select()
+        if (row['rpc'], row['interface'].contract.value()) in keys
+    ]
+
+    for index in reversed(indexes):
+        stakecontracts.db.remove_row(index)
+
+    return len(indexes)
+
+
+def sync(
+        api_url: str, timeout: float = 30.0, chunk_size: int = 65536, delete_missing: bool = True
+) -> dict:
+    """
+    Apply the feed to data/stakecontracts by (rpc, contract): new pools are inserted, changed
+    ones updated in place and the missing feed pools deleted unless `delete_missing` is False,
+    the pools of `stakediscovery` are never deleted. The file is dumped only on changes
+    The feed is requested with the ETag/Last-Modified of the last sync, stored in
+    data/stakefeeds, and parsed while it downloads
+    Returns {'inserted': int, 'updated': int, 'deleted': int, 'modified': bool}
+    :exception requests.exceptions.HTTPError
+    :exception ValueError
+    """
+
+    result = {'inserted': 0, 'updated': 0, 'deleted': 0, 'modified': False}
+    cached = feed_headers(api_url)
+    headers = {}
+
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('lastModified'):
+        headers['If-Modified-Since'] = cached['lastModified']
+
+    try:
+        response = requests.get(api_url, headers=headers, stream=True, timeout=timeout)
+    except requests.exceptions.ConnectionError:
+        return result
+
+    with response:
+        if response.status_code == 304:
+            return result
+
+        response.raise_for_status()
+        result['modified'] = True
+
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+        chunks = (decoder.decode(i) for i in response.iter_content(chunk_size=chunk_size))
+
+        stored = stored_pools()
+        seen = set()
+
+        for rpc, contract, info in iter_pools(chunks):
+            stake_interface = stake_from_info(contract, info)
+            seen.add((rpc, stake_interface.contract.value()))
+
+            change = upsert(stored, rpc, stake_interface)
+            if change:
+                result[change] += 1
+
+        # An empty feed is a broken feed, the stored pools are kept as they are
+        if seen and delete_missing:
+            feed_pools = set(key for key, i in stored.items() if i.source == interface.Stake.FEED)
+            result['deleted'] = delete(feed_pools - seen)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+    if result['inserted'] or result['updated'] or result['deleted']:
+        stakecontracts.db.dump()
+
+    # After the pools, so a failed dump never skips the feed next time
+    if (etag, last_modified) != (cached.get('etag'), cached.get('lastModified')):
+        for index, _ in stakefeeds.db.select(url=api_url):
+            stakefeeds.db.remove_row(index)
+            break
+
+        stakefeeds.db.insert(
+            row_index=stakefeeds.db.count_row(), url=api_url, etag=etag, lastModified=last_modified
+        )
+        stakefeeds.db.dump()
+
+    return result
+
+
+def feed_headers(api_url: str) -> dict:
+    """{'etag': str, 'lastModified': str} of the last sync of the feed, empty before the first"""
+
+    for _, row in stakefeeds.db.select(url=api_url):
+        return {'etag': row['etag'], 'lastModified': row['lastModified']}
+
+    return {}
+
+
+def _fields(stake_interface: interface.Stake) -> tuple:
+    return (
+        stake_interface.stakeToken.contract.value(), stake_interface.stakeToken.symbol,
+        stake_interface.stakeToken.decimals, stake_interface.rewardToken.contract.value(),
+        stake_interface.rewardToken.symbol, stake_interface.rewardToken.decimals,
+        stake_interface.stakeWebsite, stake_interface.rewardWebsite, stake_interface.startBlock,
+        stake_interface.endBlock, stake_interface.startTime, stake_interface.endTime
+    )
+
+
+__all__ = [
+    'iter_pools', 'stake_from_info', 'stored_pools', 'upsert', 'delete', 'sync', 'feed_headers'
+]
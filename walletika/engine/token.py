@@ -1,6 +1,10 @@
-from .provider import MainProvider, Metadata
+from .provider import MainProvider, AsyncMainProvider, Metadata
+from .multicall import Multicall
+from .callcache import CallCache
+from . import airdrop
 from ..abis import tokenABI
 from ..tools import interface
+import asyncio
 
 
 class TokenEngine(object):
@@ -17,13 +21,13 @@ class TokenEngine(object):
         }
 
     def name(self) -> str:
-        return self.contract.functions.name().call()
+        return CallCache.call(self.contract.functions.name())
 
     def symbol(self) -> str:
-        return self.contract.functions.symbol().call()
+        return CallCache.call(self.contract.functions.symbol())
 
     def decimals(self) -> int:
-        return self.contract.functions.decimals().call()
+        return CallCache.call(self.contract.functions.decimals())
 
     def total_supply(self) -> interface.WeiAmount:
         return interface.WeiAmount(
@@ -43,6 +47,57 @@ class TokenEngine(object):
             decimals=self.interface.decimals
         )
 
+    def details(self) -> dict:
+        """
+        Get name, symbol, decimals and total supply in one aggregated call, the first three
+        are read once and then come from CallCache
+        """
+
+        functions = self.contract.functions
+        immutables = [functions.name(), functions.symbol(), functions.decimals()]
+        cached = [CallCache.get(CallCache.key(method)) for method in immutables]
+
+        with Multicall() as multicall:
+            for method, (found, _) in zip(immutables, cached):
+                if not found:
+                    multicall.add(method)
+            multicall.add(
+                functions.totalSupply(),
+                formatter=lambda value: interface.WeiAmount(value=value, decimals=self.interface.decimals)
+            )
+
+        results = iter(multicall.results)
+        values = []
+        with CallCache.deferred():
+            for method, (found, result) in zip(immutables, cached):
+                if not found:
+                    result = next(results)
+                    if result is not None:
+                        CallCache.set(CallCache.key(method), result)
+                values.append(result)
+
+        name, symbol, decimals = values
+        return {
+            'name': name,
+            'symbol': symbol,
+            'decimals': decimals,
+            'totalSupply': next(results)
+        }
+
+    def balances_of(self, addresses: list) -> list:
+        """Get the balances of many addresses in one aggregated call"""
+
+        decimals = self.interface.decimals
+
+        with Multicall() as multicall:
+            for address in addresses:
+                multicall.add(
+                    self.contract.functions.balanceOf(address.value()),
+                    formatter=lambda value: interface.WeiAmount(value=value, decimals=decimals)
+                )
+
+        return multicall.results
+
     def approve(self, spender: interface.Address, amount: interface.EtherAmount) -> dict:
         return self._build_transaction(
             self.contract.functions.approve(spender.value(), amount.to_wei())
@@ -70,10 +125,27 @@ class TokenEngine(object):
             self.contract.functions.decreaseAllowance(spender.value(), amount.to_wei())
         )
 
-    def _build_transaction(self, method) -> dict:
+    def _build_transaction(self, method, gas: int = None) -> dict:
         if not isinstance(self.sender, interface.Address):
             raise ValueError("The sender must not be a zero address")
 
+        args = self._transaction_args(method)
+        params = {
+            Metadata.FROM: self.sender.value(),
+            Metadata.GAS_PRICE: MainProvider.gas_price()
+        }
+        if gas is not None:
+            # Already estimated, e.g. by airdrop.plan
+            params[Metadata.GAS] = gas
+
+        tx = method.buildTransaction(params)
+        self.latestTransactionDetails.update({
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
+        })
+
+        return tx
+
+    def _transaction_args(self, method) -> dict:
         abi = method.abi
         args = {}
 
@@ -103,16 +175,7 @@ class TokenEngine(object):
             else:
                 args[npt_name] = value
 
-        tx = method.buildTransaction({
-            Metadata.FROM: self.sender.value(),
-            Metadata.GAS_PRICE: MainProvider.web3.eth.gas_price
-        })
-        tx[Metadata.NONCE] = MainProvider.web3.eth.get_transaction_count(self.sender.value())
-        self.latestTransactionDetails.update({
-            'abi': abi, 'args': args, 'data': tx[Metadata.DATA]
-        })
-
-        return tx
+        return args
 
 
 class WalletikaTokenEngine(TokenEngine):
@@ -136,12 +199,28 @@ class WalletikaTokenEngine(TokenEngine):
 
     def transfer_multiple(self, addresses: list, amounts: list) -> dict:
         _addresses = [i.value() if isinstance(i, interface.Address) else i for i in addresses]
-        _amounts = [i.to_wei() if isinstance(i, interface.EtherAmount) else i for i in amounts]
+        _amounts = airdrop.wei_values(amounts)
 
         return self._build_transaction(
             self.contract.functions.transferMultiple(_addresses, _amounts)
         )
 
+    def plan_transfer_multiple(self, addresses: list, amounts: list, target_gas: int = None) -> list:
+        """Airdrop to any number of addresses in the fewest transactions, see airdrop.plan"""
+
+        if len(addresses) != len(amounts):
+            raise ValueError("Addresses and amounts must have the same length")
+
+        _addresses = [i.value() if isinstance(i, interface.Address) else i for i in addresses]
+        _amounts = airdrop.wei_values(amounts)
+
+        return airdrop.plan(
+            self, lambda start, end: self.contract.functions.transferMultiple(
+                _addresses[start:end], _amounts[start:end]
+            ),
+            len(_addresses), target_gas=target_gas
+        )
+
     def burn(self, amount: interface.EtherAmount) -> dict:
         return self._build_transaction(
             self.contract.functions.burn(amount.to_wei())
@@ -174,4 +253,75 @@ class WalletikaTokenEngine(TokenEngine):
         )
 
 
-__all__ = ['TokenEngine', 'WalletikaTokenEngine']
+class AsyncTokenEngine(TokenEngine):
+    """Asyncio twin of TokenEngine over AsyncMainProvider, every call returns a coroutine"""
+
+    def __init__(self, token_interface: interface.Token, sender: interface.Address = None):
+        self.interface = token_interface
+        self.sender = sender
+        self.contract = AsyncMainProvider.contract_factory(token_interface.contract, abi=tokenABI)
+        self.latestTransactionDetails = {
+            'abi': {},
+            'args': {},
+            'data': b''
+        }
+
+    async def name(self) -> str:
+        return await CallCache.async_call(self.contract.functions.name())
+
+    async def symbol(self) -> str:
+        return await CallCache.async_call(self.contract.functions.symbol())
+
+    async def decimals(self) -> int:
+        return await CallCache.async_call(self.contract.functions.decimals())
+
+    async def total_supply(self) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.totalSupply()),
+            decimals=self.interface.decimals
+        )
+
+    async def balance_of(self, address: interface.Address) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(self.contract.functions.balanceOf(address.value())),
+            decimals=self.interface.decimals
+        )
+
+    async def allowance(self, owner: interface.Address, spender: interface.Address) -> interface.WeiAmount:
+        return interface.WeiAmount(
+            value=await AsyncMainProvider.call(
+                self.contract.functions.allowance(owner.value(), spender.value())
+            ),
+            decimals=self.interface.decimals
+        )
+
+    async def details(self) -> dict:
+        with CallCache.deferred():
+            name, symbol, decimals, total_supply = await asyncio.gather(
+                self.name(), self.symbol(), self.decimals(), self.total_supply()
+            )
+
+        return {
+            'name': name,
+            'symbol': symbol,
+            'decimals': decimals,
+            'totalSupply': total_supply
+        }
+
+    async def balances_of(self, addresses: list) -> list:
+        return list(await asyncio.gather(*[self.balance_of(address) for address in addresses]))
+
+    async def _build_transaction(self, method) -> dict:
+        if not isinstance(self.sender, interface.Address):
+            raise ValueError("The sender must not be a zero address")
+
+        args = self._transaction_args(method)
+        tx = await AsyncMainProvider.build_transaction(method, self.sender)
+        self.latestTransactionDetails.update({
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
+        })
+
+        return tx
+
+
+__all__ = ['TokenEngine', 'WalletikaTokenEngine', 'AsyncTokenEngine']
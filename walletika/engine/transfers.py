@@ -0,0 +1,139 @@
+from .provider import MainProvider
+from .logscanner import LogScanner, get_checkpoint, set_checkpoint
+from ..tools import interface
+from ..data import tokens, transactions, checkpoints
+from web3 import Web3
+import time
+
+
+# keccak('Transfer(address,address,uint256)')
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+
+def _hex(value) -> str:
+    return value if isinstance(value, str) else Web3.toHex(value)
+
+
+def _address_topic(address: str) -> str:
+    return '0x' + '00' * 12 + address[2:].lower()
+
+
+def _topic_address(topic) -> str:
+    return Web3.toChecksumAddress('0x' + _hex(topic)[-40:])
+
+
+def checkpoint_key(token_interface: interface.Token, address: str) -> str:
+    """Checkpoint of the transfers of one wallet in one token"""
+
+    return 'transfers:{}:{}'.format(token_interface.contract.value(), address)
+
+
+def sync(
+        provider=MainProvider, from_block: int = None, lookback: int = 100000,
+        confirmations: int = 5, chunk: int = 2000, concurrency: int = 4
+) -> int:
+    """
+    Index the `Transfer` logs from and to the wallets of every token in data/tokens on the
+    connected network as `interface.Transaction` rows
+    Every wallet of a token resumes from its own checkpoint, a wallet without one starts from
+    `from_block` or `lookback` blocks ago, the last `confirmations` blocks are left for the
+    next sync, wallets at the same block are scanned together
+    New rows and checkpoints are written after every scanned range, returns the new rows count
+    """
+
+    rpc = provider.interface.rpc
+    to_block = provider.web3.eth.block_number - confirmations
+    scanner = LogScanner(provider=provider, chunk=chunk, concurrency=concurrency)
+    wallets_of = {}
+    token_of = {}
+    count = 0
+
+    for _, row in tokens.db.select(rpc=rpc):
+        token = row['interface']
+        wallets_of.setdefault(token.contract.value(), set()).add(row['address'])
+        token_of[token.contract.value()] = token
+
+    # Transactions which are stored already, e.g. by WalletEngine.add_transaction
+    stored = set()
+    for _, row in transactions.db.select(rpc=rpc):
+        stored.add(_transaction_key(row['address'], row['interface']))
+
+    for contract, wallets in wallets_of.items():
+        token = token_of[contract]
+        groups = {}
+        for wallet in wallets:
+            start = get_checkpoint(rpc, checkpoint_key(token, wallet))
+            start = start + 1 if start is not None else from_block
+            if start is None:
+                start = max(0, to_block - lookback)
+            groups.setdefault(start, []).append(wallet)
+
+        for start, group in sorted(groups.items()):
+            wallet_topics = [_address_topic(i) for i in sorted(group)]
+            queries = [
+                {'address': contract, 'topics': [TRANSFER_TOPIC, wallet_topics]},
+                {'address': contract, 'topics': [TRANSFER_TOPIC, None, wallet_topics]}
+            ]
+
+            for _, end, logs in scanner.scan(queries, start, to_block):
+                added = _store(provider, rpc, token, wallets, logs, stored)
+                if added:
+                    transactions.db.dump()
+                count += added
+
+                for wallet in group:
+                    set_checkpoint(rpc, checkpoint_key(token, wallet), end, dump=False)
+                checkpoints.db.dump()
+
+    return count
+
+
+def _store(provider, rpc: str, token: interface.Token, wallets: set, logs: list, stored: set) -> int:
+    logs = [i for i in logs if len(i['topics']) == 3]
+    if not logs:
+        return 0
+
+    block_numbers = sorted(set(log['blockNumber'] for log in logs))
+    with provider.batch() as batch:
+        for block_number in block_numbers:
+            batch.get_block(block_number)
+    timestamps = {i: block.timestamp for i, block in zip(block_numbers, batch.results)}
+
+    count = 0
+    for log in logs:
+        value = int(_hex(log['data']), 16)
+        from_address = interface.Address(_topic_address(log['topics'][1]))
+        to_address = interface.Address(_topic_address(log['topics'][2]))
+        transaction = interface.Transaction(
+            tx_hash=interface.TXHash(_hex(log['transactionHash'])),
+            function='transfer',
+            from_address=from_address,
+            to_address=to_address,
+            amount=interface.WeiAmount(value=value, decimals=token.decimals),
+            symbol=token.symbol,
+            date_created=time.ctime(timestamps[log['blockNumber']]),
+            status=interface.Transaction.Status.SUCCESS
+        )
+
+        for address in {from_address.value(), to_address.value()} & wallets:
+            key = _transaction_key(address, transaction)
+            if key in stored:
+                continue
+
+            transactions.db.insert(
+                row_index=transactions.db.count_row(), rpc=rpc, address=address, interface=transaction
+            )
+            stored.add(key)
+            count += 1
+
+    return count
+
+
+def _transaction_key(address: str, transaction: interface.Transaction) -> tuple:
+    return (
+        address, transaction.txHash.value(), transaction.fromAddress.value(),
+        transaction.toAddress.value(), transaction.amount.value()
+    )
+
+
+__all__ = ['TRANSFER_TOPIC', 'checkpoint_key', 'sync']
@@ -1,47 +1,53 @@
-from .provider import WNSProvider, Metadata
+from .provider import WNSProvider, AsyncWNSProvider, Metadata
+from .multicall import Multicall
+from .wnscache import WNSCache
+from . import airdrop
 from ..abis import wnsABI
 from ..tools import interface
+from concurrent.futures import Future
+import numpy
+import asyncio
+import threading
 
 
-class WNSEngine(object):
-    def __init__(self, sender: interface.Address = None):
-        self.sender = sender
-        self.contract = WNSProvider.web3.eth.contract(
-            address=WNSProvider.contract().value(), abi=wnsABI
-        )
-        self.latestTransactionDetails = {
-            'abi': {},
-            'args': {},
-            'data': b''
-        }
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
 
-    def owner(self) -> interface.Address:
-        return interface.Address(self.contract.functions.owner().call())
+_inFlightLock = threading.Lock()
+_inFlight = {
+    # (WNS contract, name): Future of (is reserved, is recorded)
+}
 
-    def users_count(self) -> int:
-        return self.contract.functions.usersCount().call()
 
-    def is_reserved(self, name: str) -> bool:
-        return self.contract.functions.isReserved(name).call()
+class Availability(object):
+    """
+    `isReserved` and `isRecorded` of many names as two boolean arrays in the names order,
+    `failed` marks the names which could not be read
+    """
 
-    def is_recorded(self, name: str) -> bool:
-        return self.contract.functions.isRecorded(name).call()
+    def __init__(
+            self, names: list, reserved: numpy.ndarray, recorded: numpy.ndarray, failed: numpy.ndarray
+    ):
+        self.names = names
+        self.reserved = reserved
+        self.recorded = recorded
+        self.failed = failed
 
-    def get_by_name(self, name: str) -> dict:
-        result = self.contract.functions.getByName(name).call()
-        return {
-            'address': interface.Address(result[0]),
-            'isVerified': result[1],
-            'isScammer': result[2]
-        }
+        self.__index = {name: index for index, name in enumerate(names)}
 
-    def get_by_address(self, address: interface.Address) -> dict:
-        result = self.contract.functions.getByAddress(address.value()).call()
-        return {
-            'username': result[0],
-            'isVerified': result[1],
-            'isScammer': result[2]
-        }
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def is_available(self, name: str) -> bool:
+        index = self.__index[name]
+        return not (self.reserved[index] or self.recorded[index] or self.failed[index])
+
+    def available(self) -> list:
+        mask = ~(self.reserved | self.recorded | self.failed)
+        return [name for name, free in zip(self.names, mask) if free]
+
+
+class _WNSEngineBase(object):
+    """The transactions and the records of WNSEngine and AsyncWNSEngine"""
 
     def new_record(self, name: str) -> dict:
         return self._build_transaction(
@@ -91,10 +97,7 @@ class WNSEngine(object):
             self.contract.functions.transferOwnership(new_owner.value())
         )
 
-    def _build_transaction(self, method) -> dict:
-        if not isinstance(self.sender, interface.Address):
-            raise ValueError("The sender must not be a zero address")
-
+    def _transaction_args(self, method) -> dict:
         abi = method.abi
         args = {}
 
@@ -116,16 +119,294 @@ class WNSEngine(object):
             else:
                 args[npt_name] = value
 
-        tx = method.buildTransaction({
+        return args
+
+    @staticmethod
+    def _name_record(result: tuple) -> dict:
+        return {
+            'address': interface.Address(result[0]),
+            'isVerified': result[1],
+            'isScammer': result[2]
+        }
+
+    @staticmethod
+    def _address_record(result: tuple) -> dict:
+        return {
+            'username': result[0],
+            'isVerified': result[1],
+            'isScammer': result[2]
+        }
+
+    @staticmethod
+    def _is_unknown(record: dict) -> bool:
+        if 'username' in record:
+            return not record['username']
+
+        return record['address'].value() == ZERO_ADDRESS
+
+
+class WNSEngine(_WNSEngineBase):
+    def __init__(self, sender: interface.Address = None):
+        self.sender = sender
+        self.contract = WNSProvider.web3.eth.contract(
+            address=WNSProvider.contract().value(), abi=wnsABI
+        )
+        self.latestTransactionDetails = {
+            'abi': {},
+            'args': {},
+            'data': b''
+        }
+
+    def owner(self) -> interface.Address:
+        return interface.Address(self.contract.functions.owner().call())
+
+    def users_count(self) -> int:
+        return self.contract.functions.usersCount().call()
+
+    def is_reserved(self, name: str) -> bool:
+        return self.contract.functions.isReserved(name).call()
+
+    def is_recorded(self, name: str) -> bool:
+        return self.contract.functions.isRecorded(name).call()
+
+    def get_by_name(self, name: str) -> dict:
+        WNSCache.refresh()
+        found, result = WNSCache.get(WNSCache.NAME, name)
+
+        if not found:
+            result = self._name_record(self.contract.functions.getByName(name).call())
+            WNSCache.set(WNSCache.NAME, name, result, negative=self._is_unknown(result))
+
+        return dict(result)
+
+    def get_by_address(self, address: interface.Address) -> dict:
+        WNSCache.refresh()
+        found, result = WNSCache.get(WNSCache.ADDRESS, address.value())
+
+        if not found:
+            result = self._address_record(self.contract.functions.getByAddress(address.value()).call())
+            WNSCache.set(WNSCache.ADDRESS, address.value(), result, negative=self._is_unknown(result))
+
+        return dict(result)
+
+    def availability(self, names: list, size: int = 500) -> Availability:
+        """
+        Check `isReserved` and `isRecorded` of thousands of names in aggregated calls, `size`
+        calls per `eth_call`. A name which another thread is checking already is waited for,
+        not requested again
+        """
+
+        contract = self.contract.address
+        futures = {}
+        owned = []
+
+        with _inFlightLock:
+            for name in dict.fromkeys(names):
+                key = (contract, name)
+                if key not in _inFlight:
+                    _inFlight[key] = Future()
+                    owned.append(name)
+                futures[name] = _inFlight[key]
+
+        try:
+            if owned:
+                with Multicall(provider=WNSProvider, size=size) as multicall:
+                    for name in owned:
+                        multicall.add(self.contract.functions.isReserved(name))
+                        multicall.add(self.contract.functions.isRecorded(name))
+
+                for index, name in enumerate(owned):
+                    futures[name].set_result(tuple(multicall.results[index * 2:index * 2 + 2]))
+        except Exception as error:
+            for name in owned:
+                if not futures[name].done():
+                    futures[name].set_exception(error)
+            raise
+        finally:
+            with _inFlightLock:
+                for name in owned:
+                    _inFlight.pop((contract, name), None)
+
+        results = [futures[name].result() for name in names]
+        return Availability(
+            names=list(names),
+            reserved=numpy.array([bool(reserved) for reserved, _ in results], dtype=bool),
+            recorded=numpy.array([bool(recorded) for _, recorded in results], dtype=bool),
+            failed=numpy.array([None in result for result in results], dtype=bool)
+        )
+
+    def resolve_many(self, names: list) -> list:
+        """get_by_name of many names, the uncached ones in one aggregated call, None on failure"""
+
+        return self.__lookup_many(
+            WNSCache.NAME, names, self.contract.functions.getByName, self._name_record
+        )
+
+    def reverse_many(self, addresses: list) -> list:
+        """get_by_address of many addresses, the uncached ones in one aggregated call"""
+
+        return self.__lookup_many(
+            WNSCache.ADDRESS, [i.value() for i in addresses], self.contract.functions.getByAddress,
+            self._address_record
+        )
+
+    def plan_reserve_users(self, users: list, statuses: list, target_gas: int = None) -> list:
+        """reserve_users for any number of users in the fewest transactions, see airdrop.plan"""
+
+        self.__check_lengths(users, statuses)
+        return airdrop.plan(
+            self, lambda start, end: self.contract.functions.reserveUsers(
+                users[start:end], statuses[start:end]
+            ),
+            len(users), target_gas=target_gas
+        )
+
+    def plan_multi_verified(self, users: list, statuses: list, target_gas: int = None) -> list:
+        """set_multi_verified for any number of users in the fewest transactions"""
+
+        self.__check_lengths(users, statuses)
+        return airdrop.plan(
+            self, lambda start, end: self.contract.functions.setMultiVerified(
+                users[start:end], statuses[start:end]
+            ),
+            len(users), target_gas=target_gas
+        )
+
+    def plan_multi_scammers(
+            self, users: list, addresses: list, statuses: list, target_gas: int = None
+    ) -> list:
+        """set_multi_scammers for any number of users in the fewest transactions"""
+
+        self.__check_lengths(users, addresses, statuses)
+        _addresses = [i.value() if isinstance(i, interface.Address) else i for i in addresses]
+
+        return airdrop.plan(
+            self, lambda start, end: self.contract.functions.setMultiScammers(
+                users[start:end], _addresses[start:end], statuses[start:end]
+            ),
+            len(users), target_gas=target_gas
+        )
+
+    def _build_transaction(self, method, gas: int = None) -> dict:
+        if not isinstance(self.sender, interface.Address):
+            raise ValueError("The sender must not be a zero address")
+
+        args = self._transaction_args(method)
+        params = {
             Metadata.FROM: self.sender.value(),
-            Metadata.GAS_PRICE: WNSProvider.web3.eth.gas_price
+            Metadata.GAS_PRICE: WNSProvider.gas_price()
+        }
+        if gas is not None:
+            # Already estimated, e.g. by airdrop.plan
+            params[Metadata.GAS] = gas
+
+        tx = method.buildTransaction(params)
+        self.latestTransactionDetails.update({
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
         })
-        tx[Metadata.NONCE] = WNSProvider.web3.eth.get_transaction_count(self.sender.value())
+
+        return tx
+
+    def __lookup_many(self, kind: str, keys: list, function, formatter) -> list:
+        WNSCache.refresh()
+        results = {}
+        missing = []
+
+        for key in dict.fromkeys(keys):
+            found, result = WNSCache.get(kind, key)
+            if found:
+                results[key] = result
+            else:
+                missing.append(key)
+
+        if missing:
+            with Multicall(provider=WNSProvider) as multicall:
+                for key in missing:
+                    multicall.add(function(key), formatter=formatter)
+
+            for key, result in zip(missing, multicall.results):
+                results[key] = result
+                if result is not None:
+                    WNSCache.set(kind, key, result, negative=self._is_unknown(result))
+
+        return [dict(results[key]) if results[key] is not None else None for key in keys]
+
+    @staticmethod
+    def __check_lengths(*columns):
+        if len(set(len(i) for i in columns)) > 1:
+            raise ValueError("All lists must have the same length")
+
+
+class AsyncWNSEngine(_WNSEngineBase):
+    """Asyncio twin of WNSEngine over AsyncWNSProvider, every call returns a coroutine"""
+
+    def __init__(self, sender: interface.Address = None):
+        self.sender = sender
+        self.contract = AsyncWNSProvider.contract_factory(AsyncWNSProvider.contract(), abi=wnsABI)
+        self.latestTransactionDetails = {
+            'abi': {},
+            'args': {},
+            'data': b''
+        }
+
+    async def owner(self) -> interface.Address:
+        return interface.Address(await AsyncWNSProvider.call(self.contract.functions.owner()))
+
+    async def users_count(self) -> int:
+        return await AsyncWNSProvider.call(self.contract.functions.usersCount())
+
+    async def is_reserved(self, name: str) -> bool:
+        return await AsyncWNSProvider.call(self.contract.functions.isReserved(name))
+
+    async def is_recorded(self, name: str) -> bool:
+        return await AsyncWNSProvider.call(self.contract.functions.isRecorded(name))
+
+    async def get_by_name(self, name: str) -> dict:
+        await WNSCache.async_refresh()
+        found, result = WNSCache.get(WNSCache.NAME, name, provider=AsyncWNSProvider)
+
+        if not found:
+            result = self._name_record(
+                await AsyncWNSProvider.call(self.contract.functions.getByName(name))
+            )
+            WNSCache.set(
+                WNSCache.NAME, name, result, negative=self._is_unknown(result), provider=AsyncWNSProvider
+            )
+
+        return dict(result)
+
+    async def get_by_address(self, address: interface.Address) -> dict:
+        await WNSCache.async_refresh()
+        found, result = WNSCache.get(WNSCache.ADDRESS, address.value(), provider=AsyncWNSProvider)
+
+        if not found:
+            result = self._address_record(
+                await AsyncWNSProvider.call(self.contract.functions.getByAddress(address.value()))
+            )
+            WNSCache.set(
+                WNSCache.ADDRESS, address.value(), result, negative=self._is_unknown(result),
+                provider=AsyncWNSProvider
+            )
+
+        return dict(result)
+
+    async def resolve_many(self, names: list) -> list:
+        return list(await asyncio.gather(*[self.get_by_name(name) for name in names]))
+
+    async def reverse_many(self, addresses: list) -> list:
+        return list(await asyncio.gather(*[self.get_by_address(address) for address in addresses]))
+
+    async def _build_transaction(self, method) -> dict:
+        if not isinstance(self.sender, interface.Address):
+            raise ValueError("The sender must not be a zero address")
+
+        args = self._transaction_args(method)
+        tx = await AsyncWNSProvider.build_transaction(method, self.sender)
         self.latestTransactionDetails.update({
-            'abi': abi, 'args': args, 'data': tx[Metadata.DATA]
+            'abi': method.abi, 'args': args, 'data': tx[Metadata.DATA]
         })
 
         return tx
 
 
-__all__ = ['WNSEngine']
+__all__ = ['ZERO_ADDRESS', 'Availability', 'WNSEngine', 'AsyncWNSEngine']
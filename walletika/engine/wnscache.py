@@ -0,0 +1,173 @@
+from .provider import WNSProvider, AsyncWNSProvider
+from ..abis import wnsABI
+from web3._utils.events import get_event_data
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+import asyncio
+import time
+import typing
+import requests
+import threading
+
+
+_events = {
+    bytes(event_abi_to_log_topic(abi)): abi for abi in wnsABI if abi.get('type') == 'event'
+}
+
+
+def decode_log(log) -> typing.Optional[typing.Any]:
+    """Decode a log of the WNS contract as web3 does, None when it is not a WNS event"""
+
+    topics = [HexBytes(i) for i in log['topics']]
+    abi = _events.get(bytes(topics[0])) if topics else None
+
+    if abi is None:
+        return None
+
+    return get_event_data(WNSProvider.web3.codec, abi, dict(log, topics=topics))
+
+
+class _WNSCache(object):
+    """
+    Results of `getByName` and `getByAddress` for `ttl` seconds, and the results of the
+    unknown names and addresses for `negative_ttl` seconds
+    The new blocks are checked for WNS events at most once per `check_interval` seconds, the
+    entries of the names and addresses which the events touch are dropped
+    """
+
+    NAME = 'name'
+    ADDRESS = 'address'
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0, check_interval: float = 3.0):
+        self.ttl = ttl
+        self.negativeTTL = negative_ttl
+        self.checkInterval = check_interval
+
+        self.__lock = threading.Lock()
+        self.__entries = {
+            # (WNS contract, kind, key): (expiry time, result)
+        }
+        self.__latestBlocks = {
+            # WNS contract: the latest checked block
+        }
+        self.__checkedAt = {
+            # WNS contract: monotonic time
+        }
+
+    def get(self, kind: str, key: str, provider=WNSProvider) -> tuple:
+        """Returns (found, result)"""
+
+        entry_key = (provider.contract().value(), kind, key)
+
+        with self.__lock:
+            entry = self.__entries.get(entry_key)
+            if entry is None:
+                return False, None
+
+            expiry, result = entry
+            if expiry < time.monotonic():
+                del self.__entries[entry_key]
+                return False, None
+
+        return True, result
+
+    def set(
+            self, kind: str, key: str, result: typing.Any, negative: bool = False, provider=WNSProvider
+    ):
+        expiry = time.monotonic() + (self.negativeTTL if negative else self.ttl)
+
+        with self.__lock:
+            self.__entries[(provider.contract().value(), kind, key)] = (expiry, result)
+
+    def invalidate(self, kind: str = None, key: str = None, provider=WNSProvider):
+        """Drop one entry, or all of them when no kind is given"""
+
+        with self.__lock:
+            if kind is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop((provider.contract().value(), kind, key), None)
+
+    def refresh(self, force: bool = False):
+        """Drop the entries which the WNS events of the blocks since the last check touch"""
+
+        contract = WNSProvider.contract().value()
+        due, latest_block = self.__due(contract, force)
+        if not due:
+            return
+
+        block_number = WNSProvider.web3.eth.block_number
+        logs = []
+        if latest_block is not None and block_number > latest_block:
+            try:
+                logs = WNSProvider.web3.eth.get_logs({
+                    'address': contract, 'fromBlock': latest_block + 1, 'toBlock': block_number
+                })
+            except (ValueError, requests.exceptions.Timeout):
+                # Too many blocks since the last check
+                logs = None
+
+        self.__apply(WNSProvider, block_number, latest_block, logs)
+
+    async def async_refresh(self, force: bool = False):
+        """refresh over AsyncWNSProvider"""
+
+        contract = AsyncWNSProvider.contract().value()
+        due, latest_block = self.__due(contract, force)
+        if not due:
+            return
+
+        block_number = await AsyncWNSProvider.web3.eth.block_number
+        logs = []
+        if latest_block is not None and block_number > latest_block:
+            try:
+                logs = await AsyncWNSProvider.web3.eth.get_logs({
+                    'address': contract, 'fromBlock': latest_block + 1, 'toBlock': block_number
+                })
+            except (ValueError, asyncio.TimeoutError):
+                logs = None
+
+        self.__apply(AsyncWNSProvider, block_number, latest_block, logs)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__latestBlocks.clear()
+            self.__checkedAt.clear()
+
+    def __due(self, contract: str, force: bool) -> tuple:
+        """(whether to check the new blocks now, the latest checked block)"""
+
+        now = time.monotonic()
+
+        with self.__lock:
+            checked_at = self.__checkedAt.get(contract)
+            if not force and checked_at is not None and now - checked_at < self.checkInterval:
+                return False, None
+            self.__checkedAt[contract] = now
+
+            return True, self.__latestBlocks.get(contract)
+
+    def __apply(self, provider, block_number: int, latest_block: typing.Optional[int], logs: list):
+        """Drop the entries which the logs touch, all of them when the logs could not be read"""
+
+        if logs is None:
+            self.invalidate()
+
+        for log in logs or []:
+            event = decode_log(log)
+            if event is None:
+                continue
+
+            for name, value in event.args.items():
+                if name == 'username':
+                    self.invalidate(self.NAME, value, provider=provider)
+                elif isinstance(value, str):
+                    self.invalidate(self.ADDRESS, value, provider=provider)
+
+        with self.__lock:
+            self.__latestBlocks[provider.contract().value()] = max(block_number, latest_block or 0)
+
+
+WNSCache = _WNSCache()
+__all__ = ['decode_log', 'WNSCache']
@@ -0,0 +1,246 @@
+from .provider import WNSProvider
+from .multicall import Multicall
+from .logscanner import LogScanner
+from .wnscache import decode_log
+from .wns import ZERO_ADDRESS
+from ..abis import wnsABI
+from ..tools import interface
+from ..data import wnsregistry
+from web3 import Web3
+import typing
+import threading
+
+
+# The events which change the records, `reserveUsers` has no event
+MIRRORED_EVENTS = ('NewRecord', 'TransferUsername', 'Verified', 'Scammer')
+
+
+class WNSMirror(object):
+    """
+    Local copy of the WNS registry of `WNSProvider.contract()`, synced from the contract events
+    and stored in data/wnsregistry with the latest synced block, one row per name, owner,
+    scammer address and reservation whose value dict is changed in place
+    Lookups are answered from memory. Reservations have no event, so `is_reserved` reads a name
+    from the contract once and every sync reads the known reservations again
+    """
+
+    BLOCK = 'block'
+    NAMES = 'names'
+    OWNERS = 'owners'
+    SCAMMERS = 'scammers'
+    RESERVED = 'reserved'
+
+    def __init__(self, chunk: int = 2000, concurrency: int = 4):
+        self.scanner = LogScanner(provider=WNSProvider, chunk=chunk, concurrency=concurrency)
+        self.contract = WNSProvider.web3.eth.contract(address=WNSProvider.contract().value(), abi=wnsABI)
+
+        self.__lock = threading.RLock()
+        self.__rpc = WNSProvider.interface.rpc
+        self.__changed = False
+        self.__rows = self.__load()
+
+        if '' not in self.__rows[self.BLOCK]:
+            # Stored by the first sync
+            self.__add(self.BLOCK, '', {'block': None})
+
+    def block_number(self) -> typing.Optional[int]:
+        """The latest synced block, None before the first sync"""
+
+        return self.__rows[self.BLOCK][''].get('block')
+
+    def users_count(self) -> int:
+        return len(self.__rows[self.NAMES])
+
+    def sync(self, from_block: int = 0, confirmations: int = 0) -> int:
+        """
+        Apply the events since the latest synced block, or since `from_block` at the first sync
+        The rows are dumped once at the end, returns the applied events count
+        """
+
+        with self.__lock:
+            block = self.__rows[self.BLOCK]['']
+            start = block['block'] + 1 if block.get('block') is not None else from_block
+            to_block = WNSProvider.web3.eth.block_number - confirmations
+            topics = [
+                Web3.toHex(Web3.keccak(text=self.__signature(name))) for name in MIRRORED_EVENTS
+            ]
+            query = {'address': self.contract.address, 'topics': [topics]}
+            count = 0
+
+            for _, end, logs in self.scanner.scan([query], start, to_block):
+                for log in logs:
+                    event = decode_log(log)
+                    if event is not None and event.event in MIRRORED_EVENTS:
+                        self.__apply(event.event, event.args)
+                        count += 1
+
+            self.__refresh_reserved()
+            if block.get('block') != max(block.get('block') or 0, to_block):
+                block['block'] = max(block.get('block') or 0, to_block)
+                self.__changed = True
+
+            if self.__changed:
+                self.__changed = False
+                wnsregistry.db.dump()
+
+            return count
+
+    def get_by_name(self, name: str) -> dict:
+        record = self.__rows[self.NAMES].get(name)
+
+        if record is None:
+            return {'address': interface.Address(ZERO_ADDRESS), 'isVerified': False, 'isScammer': False}
+
+        return {
+            'address': interface.Address(record['address']),
+            'isVerified': record['isVerified'],
+            'isScammer': record['isScammer']
+        }
+
+    def get_by_address(self, address: interface.Address) -> dict:
+        username = self.__rows[self.OWNERS].get(address.value(), {}).get('username', '')
+        record = self.__rows[self.NAMES].get(username)
+        scammer = self.__rows[self.SCAMMERS].get(address.value())
+
+        return {
+            'username': username,
+            'isVerified': record['isVerified'] if record else False,
+            'isScammer': scammer['state'] if scammer else record['isScammer'] if record else False
+        }
+
+    def is_recorded(self, name: str) -> bool:
+        return name in self.__rows[self.NAMES]
+
+    def is_reserved(self, name: str) -> bool:
+        with self.__lock:
+            if name not in self.__rows[self.RESERVED]:
+                # Stored by the next sync
+                state = self.contract.functions.isReserved(name).call()
+                self.__set(self.RESERVED, name, state=state)
+
+        return self.__rows[self.RESERVED][name]['state']
+
+    def is_scammer(self, address: interface.Address) -> bool:
+        return self.get_by_address(address)['isScammer']
+
+    def cross_check(self, names: list) -> list:
+        """
+        Compare the mirrored records of `names` with the contract in one aggregated call,
+        returns the names whose records differ
+        """
+
+        with Multicall(provider=WNSProvider) as multicall:
+            for name in names:
+                multicall.add(self.contract.functions.getByName(name))
+                multicall.add(self.contract.functions.isRecorded(name))
+
+        result = []
+        for index, name in enumerate(names):
+            record, recorded = multicall.results[index * 2:index * 2 + 2]
+            local = self.get_by_name(name)
+
+            if record is None or recorded is None:
+                continue
+
+            if (
+                    recorded != self.is_recorded(name) or
+                    (record[0], record[1], record[2]) !=
+                    (local['address'].value(), local['isVerified'], local['isScammer'])
+            ):
+                result.append(name)
+
+        return result
+
+    def __apply(self, event: str, args):
+        names = self.__rows[self.NAMES]
+        owners = self.__rows[self.OWNERS]
+        username = args['username']
+
+        if event == 'NewRecord':
+            self.__set(self.NAMES, username, **self.__new_record(args['owner']))
+            self.__set(self.OWNERS, args['owner'], username=username)
+
+        elif event == 'TransferUsername':
+            if username not in names:
+                self.__set(self.NAMES, username, **self.__new_record(args['owner']))
+            if owners.get(args['owner'], {}).get('username') == username:
+                self.__set(self.OWNERS, args['owner'], username='')
+            self.__set(self.NAMES, username, address=args['newOwner'])
+            self.__set(self.OWNERS, args['newOwner'], username=username)
+
+        elif event == 'Verified':
+            if username in names:
+                self.__set(self.NAMES, username, isVerified=args['state'])
+
+        elif event == 'Scammer':
+            if username in names:
+                self.__set(self.NAMES, username, isScammer=args['state'])
+            self.__set(self.SCAMMERS, args['addr'], state=args['state'])
+
+    def __refresh_reserved(self):
+        reserved = list(self.__rows[self.RESERVED])
+        if not reserved:
+            return
+
+        with Multicall(provider=WNSProvider) as multicall:
+            for name in reserved:
+                multicall.add(self.contract.functions.isReserved(name))
+
+        for name, state in zip(reserved, multicall.results):
+            if state is not None:
+                self.__set(self.RESERVED, name, state=state)
+
+    def __set(self, kind: str, key: str, **fields):
+        """Change the fields of a row in place, or add the row"""
+
+        value = self.__rows[kind].get(key)
+
+        if value is None:
+            self.__add(kind, key, fields)
+        elif any(value.get(name) != field for name, field in fields.items()):
+            value.update(fields)
+            self.__changed = True
+
+    def __add(self, kind: str, key: str, value: dict):
+        self.__rows[kind][key] = value
+        wnsregistry.db.insert(
+            row_index=wnsregistry.db.count_row(), rpc=self.__rpc, contract=self.contract.address,
+            kind=kind, key=key, value=value
+        )
+        self.__changed = True
+
+    def __load(self) -> dict:
+        rows = {
+            self.BLOCK: {
+                # '': {'block': int}
+            },
+            self.NAMES: {
+                # username: {'address': str, 'isVerified': bool, 'isScammer': bool}
+            },
+            self.OWNERS: {
+                # address: {'username': str}, empty after the name is transferred
+            },
+            self.SCAMMERS: {
+                # address: {'state': bool}
+            },
+            self.RESERVED: {
+                # username: {'state': bool}
+            }
+        }
+
+        for _, row in wnsregistry.db.select(rpc=self.__rpc, contract=self.contract.address):
+            rows[row['kind']][row['key']] = row['value']
+
+        return rows
+
+    @staticmethod
+    def __new_record(address: str) -> dict:
+        return {'address': address, 'isVerified': False, 'isScammer': False}
+
+    @staticmethod
+    def __signature(name: str) -> str:
+        abi = [i for i in wnsABI if i.get('type') == 'event' and i['name'] == name][0]
+        return '{}({})'.format(name, ','.join(i['type'] for i in abi['inputs']))
+
+
+__all__ = ['MIRRORED_EVENTS', 'WNSMirror']
@@ -1,29 +1,110 @@
 from web3 import Web3
 import re
+import math
+import numpy
 import typing
+import decimal
+import weakref
 import webbrowser
 
 
 class Network(object):
-    def __init__(self, rpc: str, name: str, chain_id: int, symbol: str, explorer: str):
+    # Default of the networks which are stored before supporting backup endpoints
+    backupRPCs = ()
+
+    def __init__(
+            self, rpc: str, name: str, chain_id: int, symbol: str, explorer: str,
+            backup_rpcs: list = None
+    ):
         self.rpc = rpc
         self.name = name
         self.chainID = chain_id
         self.symbol = symbol
         self.explorer = explorer
+        self.backupRPCs = list(backup_rpcs or [])
+
+    def endpoints(self) -> list:
+        return [self.rpc] + [i for i in self.backupRPCs if i != self.rpc]
 
 
 _currentNetwork: Network
 
 
+_addressPattern = re.compile('^0x([a-f0-9]{40})$')
+
+# Default value of Address, only the unpickling of old objects creates one without a value
+_unpickling = object()
+
+
 class Address(object):
-    def __init__(self, value: str):
-        value = value.lower()
+    """
+    Equal addresses share one immutable instance, while any of them is in use
+    The checksum is calculated once per address
+    """
+
+    __slots__ = ('__value', '__weakref__')
+    __instances = weakref.WeakValueDictionary()
 
-        if not re.compile('^0x([A-Fa-f0-9]{40})$').match(value):
+    def __new__(cls, value: str = _unpickling):
+        if value is _unpickling:
+            # Unpickling of the objects which were stored before interning, see __setstate__
+            return object.__new__(cls)
+
+        if not isinstance(value, str):
             raise ValueError("this address is wrong")
 
-        self.__value = Web3.toChecksumAddress(value)
+        key = value.lower()
+        instance = cls.__instances.get(key)
+
+        if instance is None:
+            if not _addressPattern.match(key):
+                raise ValueError("this address is wrong")
+
+            instance = object.__new__(cls)
+            object.__setattr__(instance, '_Address__value', Web3.toChecksumAddress(key))
+            cls.__instances[key] = instance
+
+        return instance
+
+    def __init__(self, value: str = _unpickling):
+        if value is _unpickling:
+            raise TypeError("Address() missing the value")
+
+    @classmethod
+    def many(cls, values: list) -> list:
+        """Addresses of many values, every distinct value is converted once"""
+
+        made = {}
+        result = []
+
+        for value in values:
+            if value not in made:
+                made[value] = cls(value)
+            result.append(made[value])
+
+        return result
+
+    def __setattr__(self, name: str, value: typing.Any):
+        raise AttributeError("Address is immutable")
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Address):
+            return self.__value == other.__value
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.__value)
+
+    def __reduce__(self) -> tuple:
+        return Address, (self.__value,)
+
+    def __setstate__(self, state: typing.Any):
+        # Old pickles hold the attributes as a dict
+        if isinstance(state, tuple):
+            state = state[1]
+
+        object.__setattr__(self, '_Address__value', state['_Address__value'])
 
     def value(self) -> str:
         return self.__value
@@ -56,51 +137,213 @@ class TXHash(object):
         return url
 
 
+def _ether_string(value: int, decimals: int, currency_format: bool, length: int) -> str:
+    """Ether string of `value` wei, with at most `length` fraction digits and no trailing zeros"""
+
+    integer, remainder = divmod(abs(value), 10 ** decimals)
+
+    if value > 0:
+        fraction = str(remainder).rjust(decimals, '0')[:length].rstrip('0') or '0'
+        if currency_format:
+            return '{:,}.{}'.format(integer, fraction)
+        else:
+            return '{}.{}'.format(integer, fraction)
+
+    # in case integer = 0
+    return str(-integer)
+
+
 class WeiAmount(object):
+    """
+    The ether representation is calculated on demand by integer division, so it is exact,
+    and the formatted string is cached
+    """
+
+    __slots__ = ('__value', '__decimals', '__ether', '__string')
+
     def __init__(self, value: int, decimals: int):
         self.__value = value
-        self.__ether = float(Web3.fromWei(self.__value, str(decimals)))
-        self.__int, self.__decimals = self.__display_float(self.__ether).split('.')
+        self.__decimals = decimals
+        self.__ether = None
+        self.__string = None
+
+    def __reduce__(self) -> tuple:
+        return WeiAmount, (self.__value, self.__decimals)
+
+    def __setstate__(self, state: typing.Any):
+        # Old pickles hold the attributes as a dict, with the ether value instead of the decimals
+        if isinstance(state, tuple):
+            state = state[1]
+
+        value = state['_WeiAmount__value']
+        decimals = self.__old_decimals(value, state.get('_WeiAmount__ether'))
+        self.__init__(value=value, decimals=decimals)
+
+    @staticmethod
+    def __old_decimals(value: int, ether: float) -> int:
+        """
+        The decimals whose ether value is the stored one, as the old class calculated it.
+        A zero amount is the same in any decimals, so it is restored as 18 and the arrays
+        accept it with any decimals
+        """
+
+        if value and ether:
+            for decimals in range(1, 30):
+                if value / 10 ** decimals == ether:
+                    return decimals
+
+            return round(math.log10(value / ether))
+
+        return 18
 
     def value(self) -> int:
         return self.__value
 
+    def decimals(self) -> int:
+        return self.__decimals
+
     def to_string(self) -> str:
         return str(self.__value)
 
     def to_ether(self) -> float:
+        if self.__ether is None:
+            # True division of integers is rounded correctly
+            self.__ether = self.__value / 10 ** self.__decimals
+
         return self.__ether
 
     def to_ether_string(self, currency_format: bool = True, length: int = 8) -> str:
-        if self.__ether > 0:
-            if currency_format:
-                return '{:,}.{}'.format(int(self.__int), self.__decimals[:length])
-            else:
-                return '{}.{}'.format(self.__int, self.__decimals[:length])
+        if currency_format and length == 8:
+            if self.__string is None:
+                self.__string = _ether_string(self.__value, self.__decimals, True, 8)
+            return self.__string
 
-        # in case integer = 0
-        return self.__int
+        return _ether_string(self.__value, self.__decimals, currency_format, length)
 
-    @staticmethod
-    def __display_float(value: float) -> str:
-        # format numbers > 1.
-        if str(value).find('+') > -1:
-            return '{:.1f}'.format(value)
 
-        # format numbers > 1e-05
-        e_idx = str(value).find('e')
-        if e_idx == -1:
-            return str(value)
+class WeiAmountArray(object):
+    """
+    Many amounts of the same decimals as one NumPy array of Python integers, so 256-bit
+    values stay exact. Sums, comparisons, scaling and formatting work on the whole array
+    """
+
+    def __init__(self, values: typing.Iterable, decimals: int):
+        self.__values = numpy.array(
+            [i.value() if isinstance(i, WeiAmount) else int(i) for i in values], dtype=object
+        )
+        self.__decimals = decimals
+
+    @classmethod
+    def from_amounts(cls, amounts: list, decimals: int = None) -> 'WeiAmountArray':
+        """
+        A zero amount is the same in any decimals, so only the others must match
+        :exception ValueError: when the amounts have different decimals
+        """
+
+        if decimals is None:
+            nonzero = [i for i in amounts if i.value()] or amounts
+            decimals = nonzero[0].decimals() if nonzero else 18
+
+        if any(i.decimals() != decimals and i.value() for i in amounts):
+            raise ValueError("All amounts must have the same decimals")
+
+        return cls(amounts, decimals)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __iter__(self) -> typing.Iterator[WeiAmount]:
+        for value in self.__values:
+            yield WeiAmount(value=value, decimals=self.__decimals)
+
+    def __getitem__(self, index) -> typing.Union[WeiAmount, 'WeiAmountArray']:
+        result = self.__values[index]
+
+        if isinstance(result, numpy.ndarray):
+            return WeiAmountArray(result, self.__decimals)
+
+        return WeiAmount(value=result, decimals=self.__decimals)
+
+    def __add__(self, other) -> 'WeiAmountArray':
+        return WeiAmountArray(self.__values + self.__other(other), self.__decimals)
+
+    def __sub__(self, other) -> 'WeiAmountArray':
+        return WeiAmountArray(self.__values - self.__other(other), self.__decimals)
+
+    def __eq__(self, other) -> numpy.ndarray:
+        return (self.__values == self.__other(other)).astype(bool)
 
-        # format numbers < 1e-05
-        shift = e_idx
-        if str(value).find('.') > -1:
-            shift -= 1
+    def __ne__(self, other) -> numpy.ndarray:
+        return (self.__values != self.__other(other)).astype(bool)
 
-        decimal_points = -int(str(value)[str(value).find('-'):]) - 1 + shift
-        float_format = '{:.' + str(decimal_points) + 'f}'
+    def __lt__(self, other) -> numpy.ndarray:
+        return (self.__values < self.__other(other)).astype(bool)
 
-        return float_format.format(value)
+    def __le__(self, other) -> numpy.ndarray:
+        return (self.__values <= self.__other(other)).astype(bool)
+
+    def __gt__(self, other) -> numpy.ndarray:
+        return (self.__values > self.__other(other)).astype(bool)
+
+    def __ge__(self, other) -> numpy.ndarray:
+        return (self.__values >= self.__other(other)).astype(bool)
+
+    __hash__ = None
+
+    def values(self) -> numpy.ndarray:
+        return self.__values
+
+    def decimals(self) -> int:
+        return self.__decimals
+
+    def to_list(self) -> list:
+        return [int(i) for i in self.__values]
+
+    def sum(self) -> WeiAmount:
+        return WeiAmount(value=int(self.__values.sum()) if len(self) else 0, decimals=self.__decimals)
+
+    def scale(
+            self, price: typing.Union[str, int, float, decimal.Decimal], decimals: int = None
+    ) -> 'WeiAmountArray':
+        """
+        Multiply every amount by `price` exactly, rounded down to wei, e.g. token amounts
+        by a token price to quote amounts of `decimals`
+        """
+
+        numerator, denominator = decimal.Decimal(str(price)).as_integer_ratio()
+        if decimals is None:
+            decimals = self.__decimals
+
+        numerator *= 10 ** max(decimals - self.__decimals, 0)
+        denominator *= 10 ** max(self.__decimals - decimals, 0)
+
+        return WeiAmountArray(self.__values * numerator // denominator, decimals)
+
+    def to_ether(self) -> numpy.ndarray:
+        return (self.__values / 10 ** self.__decimals).astype(numpy.float64)
+
+    def to_ether_string(self, currency_format: bool = True, length: int = 8) -> list:
+        """WeiAmount.to_ether_string of every amount"""
+
+        return [
+            _ether_string(int(value), self.__decimals, currency_format, length)
+            for value in self.__values
+        ]
+
+    def __other(self, other) -> typing.Union[numpy.ndarray, int]:
+        """:exception ValueError"""
+
+        if isinstance(other, WeiAmountArray):
+            if other.decimals() != self.__decimals:
+                raise ValueError("The amounts must have the same decimals")
+            return other.values()
+
+        if isinstance(other, WeiAmount):
+            if other.decimals() != self.__decimals and other.value():
+                raise ValueError("The amounts must have the same decimals")
+            return other.value()
+
+        return other
 
 
 class EtherAmount(object):
@@ -178,10 +421,16 @@ class Stake(object):
     LIVE = 'live'
     ENDED = 'ended'
 
+    # Sources of the stored pools, the feed deletes only its own ones
+    FEED = 'feed'
+    DISCOVERY = 'discovery'
+    # Pools which were stored before the source was recorded came from the feed
+    source = FEED
+
     def __init__(
             self, contract: Address, stake_token: Token, reward_token: Token,
             stake_website: str, reward_website: str,
-            start_block: int, end_block: int, start_time: int, end_time: int
+            start_block: int, end_block: int, start_time: int, end_time: int, source: str = FEED
     ):
         self.contract = contract
         self.stakeToken = stake_token
@@ -192,6 +441,7 @@ class Stake(object):
         self.endBlock = end_block
         self.startTime = start_time
         self.endTime = end_time
+        self.source = source
 
     def status(self, current_block: int) -> str:
         result = Stake.LIVE
@@ -217,6 +467,6 @@ class Stake(object):
 
 
 __all__ = [
-    'Network', 'Address', 'TXHash', 'WeiAmount', 'EtherAmount',
+    'Network', 'Address', 'TXHash', 'WeiAmount', 'WeiAmountArray', 'EtherAmount',
     'Wallet', 'Token', 'Transaction', 'AddressBook', 'Stake'
 ]